@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useAppContext } from '../contexts/AppContext';
 import {
   Lesson,
@@ -275,6 +275,7 @@ const LessonPractice: React.FC<{
   const [isFinished, setIsFinished] = useState(false);
   const [exerciseResults, setExerciseResults] = useState<ExerciseResultData[]>([]);
   const [isSaving, setIsSaving] = useState(false);
+  const exerciseStartedAt = useRef(Date.now());
 
   if (lesson.exercises.length === 0) {
     return (
@@ -309,7 +310,9 @@ const LessonPractice: React.FC<{
       is_correct: isCorrect,
       user_answer: userAnswer,
       correct_answer: getCorrectAnswer(currentExercise),
+      answer_latency_ms: Date.now() - exerciseStartedAt.current,
     };
+    exerciseStartedAt.current = Date.now();
     
     setExerciseResults(prev => [...prev, result]);
     
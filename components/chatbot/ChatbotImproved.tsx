@@ -3,7 +3,6 @@ import {
   apiGetConversationModes,
   apiSendChatMessage,
   apiEndChatSession,
-  apiUpdateChallengeProgress,
 } from '../../services/api';
 import { useAppContext } from '../../contexts/AppContext';
 import { ConversationMode, ChatMessage, SessionAnalysis } from '../../types';
@@ -77,13 +76,6 @@ export const ChatbotImproved: React.FC = () => {
           corrections: response.has_corrections ? response.corrections : undefined,
         };
         setMessages((prev) => [...prev, botMessage]);
-
-        // Actualizar desafío de chatbot
-        try {
-          await apiUpdateChallengeProgress('CHATBOT', 1);
-        } catch (error) {
-          console.log('Error actualizando desafío:', error);
-        }
       } catch (error: any) {
         const errorMessage: Message = {
           text: 'Lo siento, tuve un problema para procesar tu mensaje.',
@@ -0,0 +1,139 @@
+# api/achievements.py
+
+"""
+Catálogo de logros.
+
+Cada logro es una regla "contador >= umbral". Cuando un contador cambia
+(lecciones completadas, racha, flashcards, mensajes de chat, XP) se llama
+a check_achievements(user, contador, valor) y sólo se revisan las reglas
+de ese contador. Como se compara con >=, un salto que pasa de largo un
+umbral (por ejemplo de 4 a 6 lecciones) igual desbloquea el logro.
+
+Para agregar un logro alcanza con sumar una línea a CATALOG.
+"""
+
+from collections import defaultdict, namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+
+from .models import Achievement, Flashcard, UserConversationLevel, UserProgress, UserStreak
+
+
+Rule = namedtuple('Rule', ['achievement_type', 'counter', 'threshold', 'title', 'description', 'icon'])
+
+CATALOG = [
+    Rule('first_lesson', 'lessons', 1, 'Primera Lección', '¡Completaste tu primera lección!', '🎓'),
+    Rule('five_lessons', 'lessons', 5, 'Estudiante Dedicado', '¡Completaste 5 lecciones!', '📚'),
+    Rule('ten_lessons', 'lessons', 10, 'Maestro del Guaraní', '¡Completaste 10 lecciones!', '🏆'),
+    Rule('week_streak', 'streak', 7, 'Racha Semanal', '¡7 días seguidos practicando!', '🔥'),
+    Rule('month_streak', 'streak', 30, 'Racha Mensual', '¡30 días seguidos practicando!', '🌟'),
+    Rule('ten_flashcards', 'flashcards', 10, 'Coleccionista', '¡Creaste 10 flashcards!', '🗂️'),
+    Rule('fifty_flashcards', 'flashcards', 50, 'Bibliotecario', '¡Creaste 50 flashcards!', '📇'),
+    Rule('first_chat', 'chat_messages', 1, 'Primera Charla', '¡Le escribiste a Arami por primera vez!', '💬'),
+    Rule('hundred_chats', 'chat_messages', 100, 'Conversador', '¡100 mensajes en Guaraní con Arami!', '🗣️'),
+    Rule('xp_500', 'xp', 500, 'Medio Millar', '¡Llegaste a 500 XP!', '⭐'),
+    Rule('xp_2000', 'xp', 2000, 'Experto', '¡Llegaste a 2000 XP!', '💎'),
+]
+
+RULES_BY_COUNTER = defaultdict(list)
+for _rule in CATALOG:
+    RULES_BY_COUNTER[_rule.counter].append(_rule)
+
+
+def _streak(user):
+    streak = getattr(user, 'streak', None)
+    return streak.current_streak if streak else 0
+
+
+def _chat_messages(user):
+    level = getattr(user, 'conversation_level', None)
+    return level.total_messages if level else 0
+
+
+# Valor actual de cada contador, para cuando quien llama no lo tiene a mano
+COUNTERS = {
+    'lessons': lambda user: UserProgress.objects.filter(user=user, completed=True).count(),
+    'streak': _streak,
+    'flashcards': lambda user: Flashcard.objects.filter(user=user).count(),
+    'chat_messages': _chat_messages,
+    'xp': lambda user: user.total_xp,
+}
+
+
+def _grouped_count(queryset):
+    return dict(queryset.values('user_id').annotate(n=Count('id')).values_list('user_id', 'n'))
+
+
+# Mismos contadores para un rango de usuarios (first_id, last_id], con una
+# consulta agregada por contador; los usa el comando backfill_achievements
+BULK_COUNTERS = {
+    'lessons': lambda first_id, last_id: _grouped_count(
+        UserProgress.objects.filter(user_id__gt=first_id, user_id__lte=last_id, completed=True)
+    ),
+    'streak': lambda first_id, last_id: dict(
+        UserStreak.objects.filter(user_id__gt=first_id, user_id__lte=last_id)
+        .values_list('user_id', 'current_streak')
+    ),
+    'flashcards': lambda first_id, last_id: _grouped_count(
+        Flashcard.objects.filter(user_id__gt=first_id, user_id__lte=last_id)
+    ),
+    'chat_messages': lambda first_id, last_id: dict(
+        UserConversationLevel.objects.filter(user_id__gt=first_id, user_id__lte=last_id)
+        .values_list('user_id', 'total_messages')
+    ),
+    'xp': lambda first_id, last_id: dict(
+        get_user_model().objects.filter(id__gt=first_id, id__lte=last_id)
+        .values_list('id', 'total_xp')
+    ),
+}
+
+
+def build_achievement(user_id, rule):
+    return Achievement(
+        user_id=user_id,
+        achievement_type=rule.achievement_type,
+        title=rule.title,
+        description=rule.description,
+        icon=rule.icon
+    )
+
+
+def check_achievements(user, counter, value=None):
+    """Desbloquear los logros de un contador cuyo umbral ya se alcanzó.
+
+    Devuelve los logros nuevos. Sin reglas alcanzadas no hace consultas.
+    """
+    rules = RULES_BY_COUNTER[counter]
+    if value is None:
+        value = COUNTERS[counter](user)
+
+    reached = {rule.achievement_type: rule for rule in rules if value >= rule.threshold}
+    if not reached:
+        return []
+
+    user_id = getattr(user, 'pk', user)
+    unlocked = set(
+        Achievement.objects.filter(
+            user_id=user_id,
+            achievement_type__in=reached
+        ).values_list('achievement_type', flat=True)
+    )
+    new = [
+        build_achievement(user_id, rule)
+        for achievement_type, rule in reached.items()
+        if achievement_type not in unlocked
+    ]
+    if new:
+        # Otra request pudo desbloquearlo recién: la restricción única lo resuelve
+        Achievement.objects.bulk_create(new, ignore_conflicts=True)
+    return new
+
+
+def check_all_achievements(user):
+    """Revisar todos los contadores (para reparar o al crear un logro nuevo)"""
+    return [
+        achievement
+        for counter in RULES_BY_COUNTER
+        for achievement in check_achievements(user, counter)
+    ]
@@ -1,3 +1,24 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ConversationMode, ExerciseStats, LLMCall
+
+
+@admin.register(ConversationMode)
+class ConversationModeAdmin(admin.ModelAdmin):
+    list_display = ('name', 'icon', 'difficulty_level')
+
+
+@admin.register(LLMCall)
+class LLMCallAdmin(admin.ModelAdmin):
+    list_display = ('created_at', 'purpose', 'model', 'mode', 'latency_ms', 'cache_hit', 'error')
+    list_filter = ('purpose', 'model', 'cache_hit')
+
+
+@admin.register(ExerciseStats)
+class ExerciseStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        'lesson_id', 'exercise_id', 'exercise_type', 'attempts', 'p_correct',
+        'discrimination', 'median_latency_ms', 'updated_at'
+    )
+    list_filter = ('lesson_id', 'exercise_type')
+    ordering = ('lesson_id', 'exercise_id')
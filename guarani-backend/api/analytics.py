@@ -0,0 +1,135 @@
+# api/analytics.py
+
+"""
+Análisis de puntos débiles del usuario.
+
+Todo sale de dos consultas sobre exercise_results: una agrupada por tipo
+de ejercicio con conteos condicionales (incluida la dirección de las
+traducciones, guardada al escribir el resultado) y otra con ROW_NUMBER() para los últimos intentos de cada
+tipo. El resultado queda en caché por usuario junto con una versión (último
+id y cantidad de resultados) que se vuelve a leer en cada pedido con una
+consulta sobre el índice del usuario: la caché "default" es local a cada
+proceso y la invalidación de signals.py sólo alcanza al que guardó el
+resultado, así que los demás workers detectan el cambio por la versión.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, F, Max, Q, Window
+from django.db.models.functions import RowNumber
+
+from .models import ExerciseResult
+
+
+EXERCISE_TYPES = [
+    ('MULTIPLE_CHOICE', 'Opción Múltiple', '✅'),
+    ('TRANSLATION', 'Traducción', '🔄'),
+    ('FILL_IN_THE_BLANK', 'Completar Espacios', '✍️'),
+]
+
+TRANSLATION_DIRECTIONS = [
+    ('ES_TO_GN', 'Español → Guaraní', '🇪🇸→🇵🇾'),
+    ('GN_TO_ES', 'Guaraní → Español', '🇵🇾→🇪🇸'),
+]
+
+RECENT_ATTEMPTS = 5
+
+def _cache_key(user_id):
+    return f'analytics:weakness:{user_id}'
+
+
+def invalidate_weakness_analysis(user_id):
+    cache.delete(_cache_key(user_id))
+
+
+def _accuracy(correct, total):
+    return int((correct / total) * 100) if total > 0 else 0
+
+
+def compute_weakness_analysis(user):
+    results = ExerciseResult.objects.filter(user=user)
+
+    # 1) Conteos por tipo y por dirección de traducción en una sola pasada
+    correct = Q(is_correct=True)
+    by_direction = {}
+    for direction, _, _ in TRANSLATION_DIRECTIONS:
+        by_direction[f'{direction}_total'] = Count('id', filter=Q(direction=direction))
+        by_direction[f'{direction}_correct'] = Count('id', filter=Q(direction=direction) & correct)
+    totals = {
+        row['exercise_type']: row
+        for row in results.values('exercise_type').annotate(
+            total=Count('id'),
+            correct=Count('id', filter=correct),
+            **by_direction
+        )
+    }
+
+    # 2) Últimos intentos de cada tipo con una función de ventana
+    recent = {}
+    ranked = results.annotate(
+        position=Window(
+            RowNumber(),
+            partition_by=[F('exercise_type')],
+            order_by=[F('created_at').desc(), F('id').desc()]
+        )
+    ).filter(position__lte=RECENT_ATTEMPTS).order_by('exercise_type', 'position')
+    for row in ranked.values('exercise_type', 'exercise_id', 'is_correct', 'created_at'):
+        ex_type = row.pop('exercise_type')
+        recent.setdefault(ex_type, []).append(row)
+
+    stats = []
+    for ex_type, display_name, icon in EXERCISE_TYPES:
+        row = totals.get(ex_type)
+        if not row:
+            continue
+        stats.append({
+            'type': ex_type,
+            'display_name': display_name,
+            'icon': icon,
+            'total_attempts': row['total'],
+            'correct_answers': row['correct'],
+            'accuracy': _accuracy(row['correct'], row['total']),
+            'recent_attempts': recent.get(ex_type, []),
+        })
+
+    # Ordenar por peor rendimiento primero
+    stats.sort(key=lambda x: x['accuracy'])
+
+    translation_breakdown = []
+    row = totals.get('TRANSLATION')
+    if row:
+        for direction, display_name, icon in TRANSLATION_DIRECTIONS:
+            total, correct_count = row[f'{direction}_total'], row[f'{direction}_correct']
+            if total:
+                translation_breakdown.append({
+                    'type': direction,
+                    'display_name': display_name,
+                    'icon': icon,
+                    'total_attempts': total,
+                    'correct_answers': correct_count,
+                    'accuracy': _accuracy(correct_count, total),
+                })
+
+    return {
+        'overall_stats': stats,
+        'translation_breakdown': translation_breakdown,
+        'total_exercises_completed': sum(row['total'] for row in totals.values()),
+    }
+
+
+def _version(user):
+    """(último id, cantidad) de los resultados del usuario"""
+    row = ExerciseResult.objects.filter(user=user).aggregate(last_id=Max('id'), count=Count('id'))
+    return row['last_id'], row['count']
+
+
+def get_weakness_analysis(user):
+    """Análisis en caché hasta el próximo resultado de ejercicio del usuario"""
+    key = _cache_key(user.pk)
+    version = _version(user)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    analysis = compute_weakness_analysis(user)
+    cache.set(key, (version, analysis), getattr(settings, 'WEAKNESS_ANALYSIS_CACHE_SECONDS', 3600))
+    return analysis
@@ -0,0 +1,131 @@
+# api/chat.py
+
+"""
+Pasos de un turno del chatbot, compartidos por ChatbotView (HTTP) y el
+canal WebSocket (api/consumers.py).
+"""
+
+from django.conf import settings
+from django.db.models import F
+from django.utils import timezone
+
+from .chat_context import build_chat_context
+from .grammar import analyze_grammar, precheck_grammar, save_corrections
+from .models import ChatSession, ChatMessage, DailyChallenge, UserChallengeProgress, UserConversationLevel
+from .search import index_messages
+from .tasks import submit, analyze_message_grammar, update_session_summary
+
+
+def get_or_start_session(user, session_id, mode, difficulty_level):
+    """Sesión activa del usuario o una nueva si no existe"""
+    if session_id:
+        try:
+            return ChatSession.objects.get(
+                id=session_id,
+                user=user,
+                ended_at__isnull=True
+            )
+        except (ChatSession.DoesNotExist, ValueError):
+            pass
+
+    return ChatSession.start(
+        user,
+        mode_id=mode.id if mode else None,
+        difficulty_level=difficulty_level
+    )
+
+
+def get_session_history(session):
+    """Turnos recientes + resumen de los viejos, dentro del presupuesto de tokens"""
+    history, evicted = build_chat_context(session)
+    request_summary(session, evicted)
+    return history
+
+
+def request_summary(session, evicted):
+    """Encolar el plegado del resumen cuando se juntan suficientes turnos"""
+    if evicted >= getattr(settings, 'CHAT_SUMMARY_BATCH_TURNS', 4):
+        submit(update_session_summary, session.id)
+        return True
+    return False
+
+
+def update_challenge(user):
+    """Sumar el turno al desafío diario de chatbot, si hoy hay uno activo"""
+    challenge = DailyChallenge.objects.filter(
+        date=timezone.now().date(),
+        challenge_type='CHATBOT',
+        is_active=True
+    ).first()
+    if challenge is None:
+        return None
+
+    progress, _ = UserChallengeProgress.objects.get_or_create(user=user, challenge=challenge)
+    UserChallengeProgress.objects.filter(pk=progress.pk).update(current_value=F('current_value') + 1)
+    progress.refresh_from_db(fields=['current_value'])
+    progress.challenge = challenge
+    progress.check_completion()
+    return progress
+
+
+def record_turn(user, session, message, bot_response, model,
+                defer_grammar=False, schedule=True):
+    """Guardar el turno, analizar la gramática y actualizar estadísticas.
+
+    Con defer_grammar el análisis que necesita al LLM queda pendiente: si
+    schedule es True se encola en el worker, si no lo corre quien llama
+    (el WebSocket lo hace después de mandar la respuesta).
+    Devuelve (chat_message, corrections).
+    """
+    # Análisis local (sin red): resuelve los casos claros
+    precheck = precheck_grammar(message)
+    defer_grammar = defer_grammar and precheck['needs_review']
+
+    if defer_grammar:
+        # Responder ya y analizar la gramática en segundo plano
+        chat_message = ChatMessage.objects.create(
+            session=session,
+            user=user,
+            message=message,
+            response=bot_response,
+            detected_language=precheck['language'],
+            word_count=len(message.split()),
+            grammar_status='pending'
+        )
+        corrections = []
+        if schedule:
+            submit(analyze_message_grammar, chat_message.id)
+    else:
+        # Analizar mensaje del usuario (detección de errores)
+        grammar_analysis = analyze_grammar(message, model, precheck, user_id=user.id)
+        corrections = grammar_analysis.get('corrections', [])
+
+        # Guardar mensaje
+        chat_message = ChatMessage.objects.create(
+            session=session,
+            user=user,
+            message=message,
+            response=bot_response,
+            detected_language=grammar_analysis.get('language', 'es'),
+            word_count=len(message.split()),
+            grammar_corrections=corrections
+        )
+
+        # Guardar correcciones detalladas
+        save_corrections(chat_message, corrections)
+
+    # Actualizar estadísticas de sesión
+    session.record_message(chat_message, corrections)
+
+    # Agregar al índice de búsqueda del historial
+    index_messages([chat_message])
+
+    # Actualizar nivel de conversación del usuario
+    if not defer_grammar:
+        level, _ = UserConversationLevel.objects.get_or_create(user=user)
+        level.record_message(chat_message)
+
+    # Actualizar desafío de chatbot
+    update_challenge(user)
+
+    return chat_message, corrections
@@ -0,0 +1,172 @@
+# api/chat_context.py
+
+"""
+Contexto del chatbot con presupuesto de tokens.
+
+Se mandan a Gemini los turnos más recientes que entren en el presupuesto
+(CHAT_CONTEXT_TOKEN_BUDGET) y los turnos más viejos se van resumiendo en
+ChatSession.context_summary. El resumen se actualiza de a tandas en segundo
+plano, así el tamaño del prompt queda acotado sin importar cuánto dure la
+sesión.
+"""
+
+from django.conf import settings
+
+from .ledger import track
+from .models import ChatSession
+
+
+SUMMARY_PREFIX = 'Resumen de la conversación hasta ahora:'
+
+
+def estimate_tokens(text):
+    """Aproximación barata: ~4 caracteres por token"""
+    return len(text or '') // 4 + 1
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def select_turns(session):
+    """Turnos más recientes que entran en el presupuesto (del más viejo al más nuevo).
+
+    Devuelve (turns, evicted): evicted son los turnos sin resumir que no
+    entraron en el presupuesto y deberían plegarse en el resumen.
+    """
+    budget = _setting('CHAT_CONTEXT_TOKEN_BUDGET', 2000)
+    max_turns = _setting('CHAT_CONTEXT_MAX_TURNS', 50)
+
+    messages = session.messages.order_by('-created_at', '-id')
+    if session.summarized_message_id:
+        messages = messages.filter(id__gt=session.summarized_message_id)
+    recent = list(messages.only('id', 'message', 'response')[:max_turns])
+
+    used = estimate_tokens(session.context_summary) if session.context_summary else 0
+    kept = []
+    for msg in recent:
+        cost = estimate_tokens(msg.message) + estimate_tokens(msg.response)
+        if kept and used + cost > budget:
+            break
+        kept.append(msg)
+        used += cost
+
+    turns = [(msg.message, msg.response) for msg in reversed(kept)]
+    return turns, len(recent) - len(kept)
+
+
+def to_history(summary, turns):
+    """Formato de historial que espera start_chat()"""
+    history = []
+    if summary:
+        history.append({
+            'role': 'user',
+            'parts': [f"{SUMMARY_PREFIX}\n{summary}"]
+        })
+        history.append({
+            'role': 'model',
+            'parts': ['Entendido, sigo desde ahí.']
+        })
+
+    for message, response in turns:
+        history.append({
+            'role': 'user',
+            'parts': [message]
+        })
+        history.append({
+            'role': 'model',
+            'parts': [response]
+        })
+
+    return history
+
+
+def build_chat_context(session):
+    """Historial para start_chat() y cantidad de turnos que quedaron afuera"""
+    turns, evicted = select_turns(session)
+    return to_history(session.context_summary, turns), evicted
+
+
+class ResidentChatContext:
+    """Contexto que vive en memoria mientras dura una conexión WebSocket.
+
+    Se carga una vez de la base y después sólo se agregan turnos; los que
+    se salen del presupuesto se cuentan para plegarlos en el resumen.
+    """
+
+    def __init__(self, session=None):
+        self.summary = ''
+        self.turns = []
+        self.evicted = 0
+        if session is not None:
+            self.summary = session.context_summary
+            self.turns, self.evicted = select_turns(session)
+
+    def history(self):
+        return to_history(self.summary, self.turns)
+
+    def add_turn(self, message, response):
+        """Agregar un turno y descartar los viejos que no entran"""
+        budget = _setting('CHAT_CONTEXT_TOKEN_BUDGET', 2000)
+        self.turns.append((message, response))
+
+        used = estimate_tokens(self.summary) if self.summary else 0
+        used += sum(estimate_tokens(m) + estimate_tokens(r) for m, r in self.turns)
+        while len(self.turns) > 1 and used > budget:
+            old_message, old_response = self.turns.pop(0)
+            used -= estimate_tokens(old_message) + estimate_tokens(old_response)
+            self.evicted += 1
+
+
+def summarize_turns(previous_summary, messages, model, user_id=None):
+    """Plegar turnos viejos en el resumen anterior"""
+    max_chars = _setting('CHAT_SUMMARY_MAX_CHARS', 1200)
+    transcript = '\n'.join(
+        f"Usuario: {msg.message}\nArami: {msg.response}" for msg in messages
+    )
+
+    try:
+        prompt = f"""Actualiza el resumen de una conversación de práctica de Guaraní.
+Conserva el vocabulario practicado, los errores frecuentes del usuario y el tema actual.
+Responde SOLO con el resumen, en menos de {max_chars // 6} palabras.
+
+Resumen anterior:
+{previous_summary or '(vacío)'}
+
+Turnos nuevos:
+{transcript}
+"""
+        with track('summary', model, user_id=user_id) as call:
+            response = call.response = model.generate_content(prompt)
+        summary = response.text.strip()
+    except Exception as e:
+        print(f"Error summarizing chat: {e}")
+        # Resumen extractivo: quedarnos con el final de la transcripción
+        summary = f"{previous_summary}\n{transcript}".strip()
+
+    return summary[-max_chars:]
+
+
+def fold_session_summary(session_id, model):
+    """Resumir los turnos que quedaron fuera del presupuesto"""
+    session = ChatSession.objects.get(id=session_id)
+    history, evicted = build_chat_context(session)
+    if evicted == 0:
+        return False
+
+    messages = session.messages.order_by('created_at', 'id')
+    if session.summarized_message_id:
+        messages = messages.filter(id__gt=session.summarized_message_id)
+    to_fold = list(messages.only('id', 'message', 'response')[:evicted])
+
+    summary = summarize_turns(session.context_summary, to_fold, model, session.user_id)
+
+    # Compare-and-set: si otro worker ya plegó estos turnos, no pisarlo
+    updated = ChatSession.objects.filter(
+        id=session.id,
+        summarized_message_id=session.summarized_message_id
+    ).update(
+        context_summary=summary,
+        summarized_message_id=to_fold[-1].id
+    )
+    return updated == 1
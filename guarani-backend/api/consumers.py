@@ -0,0 +1,241 @@
+# api/consumers.py
+
+"""
+Canal WebSocket del chatbot (ws/chat/).
+
+A diferencia de ChatbotView, la conexión mantiene en memoria al usuario,
+la sesión, el modo, el modelo de Gemini y el contexto reciente mientras
+dure, y manda la respuesta en partes a medida que llega. HTTP
+(POST /api/chatbot/) sigue funcionando igual como alternativa.
+
+Protocolo (JSON):
+  cliente -> {"message": "..."}
+  servidor -> {"type": "session.ready", "session_id": ...}
+              {"type": "reply.delta", "text": "..."}
+              {"type": "reply.done", "session_id": ..., "message": {...}}
+              {"type": "corrections", "message_id": ..., "grammar_status": ..., "corrections": [...]}
+              {"type": "error", "error": "..."}
+
+La autenticación usa el mismo access token JWT que la API, enviado como
+?token=... porque los navegadores no permiten headers en WebSockets.
+"""
+
+import asyncio
+import json
+import logging
+from urllib.parse import parse_qs
+
+from asgiref.sync import sync_to_async
+
+from .chat import get_or_start_session, record_turn, request_summary
+from .chat_context import ResidentChatContext
+from .ledger import record, track
+from .llm import get_chat_model, get_mode
+from .models import ChatMessage, ChatSession
+from .response_cache import opener_key, get_reply, add_reply
+from .serializers import ChatMessageSerializer, GrammarCorrectionSerializer
+from .tasks import analyze_message_grammar
+
+
+CLOSE_UNAUTHORIZED = 4401
+
+logger = logging.getLogger(__name__)
+
+
+@sync_to_async
+def authenticate(token):
+    """Usuario del access token o None"""
+    from rest_framework_simplejwt.authentication import JWTAuthentication
+    from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed
+
+    if not token:
+        return None
+    auth = JWTAuthentication()
+    try:
+        return auth.get_user(auth.get_validated_token(token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+class ChatConnection:
+    """Estado residente de una conexión"""
+
+    def __init__(self, user, params):
+        self.user = user
+        self.session_id = params.get('session_id')
+        self.mode_id = params.get('mode_id')
+        self.difficulty_level = params.get('difficulty_level', 'beginner')
+        self.session = None
+        self.mode = None
+        self.model = None
+        self.context = None
+        self.summary_requested = False
+
+    def open(self):
+        """Cargar modo, modelo, sesión y contexto una sola vez"""
+        self.mode = get_mode(self.mode_id)
+        self.model = get_chat_model(self.mode, self.difficulty_level)
+        if self.session_id:
+            self.session = ChatSession.objects.filter(
+                id=self.session_id,
+                user=self.user,
+                ended_at__isnull=True
+            ).first()
+        self.context = ResidentChatContext(self.session)
+
+    def ensure_session(self):
+        if self.session is None:
+            self.session = get_or_start_session(
+                self.user, None, self.mode, self.difficulty_level
+            )
+        elif self.summary_requested:
+            # El worker pudo haber actualizado el resumen
+            self.context.summary = ChatSession.objects.filter(
+                id=self.session.id
+            ).values_list('context_summary', flat=True).first() or ''
+            self.summary_requested = False
+        return self.session
+
+    def stream_reply(self, message, on_chunk):
+        """Generar la respuesta y pasar cada parte a on_chunk"""
+        history = self.context.history()
+        cache_key = opener_key(self.mode, self.difficulty_level, message, history)
+        cached = get_reply(cache_key)
+        if cached is not None:
+            record('chat', self.model, user_id=self.user.id, mode=self.mode, cache_hit=True)
+            on_chunk(cached)
+            return cached
+
+        chat = self.model.start_chat(history=history)
+        parts = []
+        with track('chat', self.model, user_id=self.user.id, mode=self.mode) as call:
+            for chunk in chat.send_message(message, stream=True):
+                # El uso de tokens viene en la última parte
+                call.response = chunk
+                text = getattr(chunk, 'text', '')
+                if text:
+                    parts.append(text)
+                    on_chunk(text)
+        bot_response = ''.join(parts).strip()
+        add_reply(cache_key, bot_response)
+        return bot_response
+
+    def finish_turn(self, message, bot_response):
+        chat_message, corrections = record_turn(
+            self.user,
+            self.session,
+            message,
+            bot_response,
+            self.model,
+            defer_grammar=True,
+            schedule=False
+        )
+        self.context.add_turn(message, bot_response)
+        if request_summary(self.session, self.context.evicted):
+            self.context.evicted = 0
+            self.summary_requested = True
+        return chat_message
+
+    def analyze(self, message_id):
+        """Correr el análisis pendiente y devolver el mensaje actualizado"""
+        analyze_message_grammar(message_id)
+        return ChatMessage.objects.prefetch_related('corrections').get(id=message_id)
+
+
+class ChatSocket:
+    """Aplicación ASGI para ws/chat/"""
+
+    async def __call__(self, scope, receive, send):
+        event = await receive()
+        if event['type'] != 'websocket.connect':
+            return
+
+        params = {
+            key: values[-1]
+            for key, values in parse_qs(scope.get('query_string', b'').decode()).items()
+        }
+        user = await authenticate(params.pop('token', None))
+        if user is None:
+            await send({'type': 'websocket.close', 'code': CLOSE_UNAUTHORIZED})
+            return
+
+        await send({'type': 'websocket.accept'})
+        connection = ChatConnection(user, params)
+        await sync_to_async(connection.open)()
+        await self.send_json(send, {
+            'type': 'session.ready',
+            'session_id': connection.session.id if connection.session else None
+        })
+
+        while True:
+            event = await receive()
+            if event['type'] == 'websocket.disconnect':
+                break
+            if event['type'] != 'websocket.receive':
+                continue
+
+            try:
+                data = json.loads(event.get('text') or event.get('bytes') or '{}')
+                message = str(data.get('message', '')).strip()
+            except (ValueError, AttributeError):
+                message = ''
+            if not message:
+                await self.send_json(send, {'type': 'error', 'error': 'Mensaje vacío'})
+                continue
+
+            try:
+                await self.handle_message(connection, message, send)
+            except Exception as e:
+                logger.exception('Error en el turno del chat por WebSocket')
+                await self.send_json(send, {'type': 'error', 'error': str(e)})
+
+    async def handle_message(self, connection, message, send):
+        session = await sync_to_async(connection.ensure_session)()
+
+        # La respuesta se genera en un hilo y las partes llegan por una cola
+        loop = asyncio.get_running_loop()
+        chunks = asyncio.Queue()
+
+        def on_chunk(text):
+            loop.call_soon_threadsafe(chunks.put_nowait, text)
+
+        reply = asyncio.ensure_future(
+            sync_to_async(connection.stream_reply, thread_sensitive=False)(message, on_chunk)
+        )
+        while not (reply.done() and chunks.empty()):
+            getter = asyncio.ensure_future(chunks.get())
+            done, _ = await asyncio.wait({getter, reply}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                await self.send_json(send, {'type': 'reply.delta', 'text': getter.result()})
+            else:
+                getter.cancel()
+        bot_response = reply.result()
+
+        chat_message = await sync_to_async(connection.finish_turn)(message, bot_response)
+        await self.send_json(send, {
+            'type': 'reply.done',
+            'session_id': session.id,
+            'message': await sync_to_async(lambda: ChatMessageSerializer(chat_message).data)()
+        })
+
+        # Las correcciones llegan después de la respuesta
+        if chat_message.grammar_status == 'pending':
+            chat_message = await sync_to_async(connection.analyze)(chat_message.id)
+        corrections = await sync_to_async(
+            lambda: GrammarCorrectionSerializer(chat_message.corrections.all(), many=True).data
+        )()
+        await self.send_json(send, {
+            'type': 'corrections',
+            'message_id': chat_message.id,
+            'grammar_status': chat_message.grammar_status,
+            'corrections': corrections,
+        })
+
+    async def send_json(self, send, data):
+        await send({
+            'type': 'websocket.send',
+            'text': json.dumps(data, ensure_ascii=False, default=str)
+        })
+
+
+chat_socket = ChatSocket()
@@ -0,0 +1,113 @@
+# api/exercises.py
+
+"""
+Datos derivados de la definición de los ejercicios de una lección.
+
+Al guardar un ExerciseResult se completan la dirección de la traducción,
+la respuesta normalizada y el ítem de vocabulario que practica el
+ejercicio, así el análisis filtra por columnas en vez de adivinar con
+LIKE sobre la respuesta correcta. Son funciones puras sobre el JSON de la
+lección: las usa ProgressView, y la migración que rellenó los resultados
+viejos guarda su propia copia.
+"""
+
+from .grammar import SPANISH_WORDS, fold_accents, has_guarani_marks, looks_guarani, normalize, tokenize
+
+
+ES_TO_GN = 'ES_TO_GN'
+GN_TO_ES = 'GN_TO_ES'
+
+MAX_ANSWER_LENGTH = 200
+
+
+def normalize_answer(text):
+    """Minúsculas, sin acentos agudos ni puntuación ("¡Iporãnte!" -> "iporãnte")"""
+    return ' '.join(fold_accents(token) for token in tokenize(text or ''))[:MAX_ANSWER_LENGTH]
+
+
+def _guarani_share(text):
+    tokens = tokenize(text or '')
+    if not tokens:
+        return 0
+    guarani = sum(
+        1 for token in tokens
+        if has_guarani_marks(token) or (looks_guarani(token) and token not in SPANISH_WORDS)
+    )
+    return guarani / len(tokens)
+
+
+def translation_direction(exercise, correct_answer=''):
+    """ES_TO_GN si hay que escribir en guaraní, GN_TO_ES si no.
+
+    La lección puede declararla con "direction"; si no, se compara qué
+    tanto parecen guaraní la respuesta y la frase a traducir. Sin
+    definición se usa la regla vieja: respuesta con tildes nasales o puso.
+    """
+    if exercise:
+        if exercise.get('direction') in (ES_TO_GN, GN_TO_ES):
+            return exercise['direction']
+        answer = exercise.get('correctAnswer', correct_answer)
+        phrase = exercise.get('phraseToTranslate', '')
+        if answer or phrase:
+            return ES_TO_GN if _guarani_share(answer) > _guarani_share(phrase) else GN_TO_ES
+    return ES_TO_GN if has_guarani_marks(normalize(correct_answer or '')) else GN_TO_ES
+
+
+def _exercise_texts(exercise):
+    texts = [
+        exercise.get('correctAnswer', ''),
+        exercise.get('phraseToTranslate', ''),
+        exercise.get('question', ''),
+        exercise.get('sentence', ''),
+    ]
+    options = exercise.get('options') or []
+    index = exercise.get('correctAnswerIndex')
+    if isinstance(index, int) and 0 <= index < len(options):
+        texts.append(options[index])
+    return texts
+
+
+def vocabulary_item_id(lesson_id, vocabulary, exercise):
+    """Ítem de vocabulario de la lección que practica el ejercicio.
+
+    Se respeta "vocabularyId" si la lección lo define; si no, es la
+    primera palabra del vocabulario que aparece en el ejercicio,
+    identificada como "<lección>:<palabra normalizada>".
+    """
+    if not exercise:
+        return ''
+    if exercise.get('vocabularyId'):
+        return str(exercise['vocabularyId'])[:100]
+
+    found = set()
+    for text in _exercise_texts(exercise):
+        tokens = tokenize(str(text))
+        found.update(fold_accents(token) for token in tokens)
+        found.add(' '.join(fold_accents(token) for token in tokens))
+
+    for item in vocabulary or []:
+        word = normalize_answer(item.get('word', ''))
+        if word and word in found:
+            return str(item.get('id') or f'{lesson_id}:{word}')[:100]
+    return ''
+
+
+def lesson_exercises(lesson):
+    """Definiciones de ejercicio de una lección, por id"""
+    return {
+        str(exercise.get('id')): exercise
+        for exercise in (lesson.exercises or [])
+        if exercise.get('id') is not None
+    }
+
+
+def result_fields(lesson_id, vocabulary, exercise, exercise_type, user_answer, correct_answer):
+    """Columnas derivadas de un ExerciseResult"""
+    return {
+        'direction': (
+            translation_direction(exercise, correct_answer)
+            if exercise_type == 'TRANSLATION' else ''
+        ),
+        'normalized_answer': normalize_answer(user_answer),
+        'vocabulary_item_id': vocabulary_item_id(lesson_id, vocabulary, exercise),
+    }
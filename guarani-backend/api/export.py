@@ -0,0 +1,132 @@
+# api/export.py
+
+"""
+Exportación del historial de aprendizaje en streaming.
+
+Las filas se leen con .iterator() (cursor del lado del servidor en
+PostgreSQL, lotes en SQLite) y se escriben a medida que salen, así la
+memoria usada no depende del tamaño de la exportación. Formatos: NDJSON
+(una fila JSON por línea) y CSV, opcionalmente comprimidos con gzip.
+
+Todas las filas salen ordenadas por id y lo incluyen: si la descarga se
+corta, se retoma pidiendo after_id=<último id recibido>.
+
+Bajo ASGI Django juntaría en memoria un iterador síncrono antes de
+mandarlo, así que ahí los bloques se entregan con async_blocks().
+"""
+
+import csv
+import json
+import zlib
+
+from asgiref.sync import sync_to_async
+
+from .models import ChatMessage, ExerciseResult, Translation
+
+
+CHUNK_SIZE = 2000
+
+EXPORTS = {
+    'chat': (
+        ChatMessage,
+        [
+            'id', 'session_id', 'session__mode__name', 'created_at', 'message',
+            'response', 'detected_language', 'word_count', 'grammar_corrections',
+        ],
+    ),
+    'translations': (
+        Translation,
+        ['id', 'created_at', 'spanish_text', 'guarani_text'],
+    ),
+    'exercises': (
+        ExerciseResult,
+        [
+            'id', 'created_at', 'lesson_id', 'exercise_id', 'exercise_type',
+            'is_correct', 'user_answer', 'correct_answer',
+        ],
+    ),
+}
+
+
+def export_rows(kind, user, date_from=None, date_to=None, after_id=None, offset=0):
+    """Encabezado y filas (tuplas) de una exportación"""
+    model, fields = EXPORTS[kind]
+    rows = model.objects.filter(user=user)
+    if date_from:
+        rows = rows.filter(created_at__date__gte=date_from)
+    if date_to:
+        rows = rows.filter(created_at__date__lte=date_to)
+    if after_id:
+        rows = rows.filter(id__gt=after_id)
+
+    rows = rows.order_by('id').values_list(*fields)
+    if offset:
+        rows = rows[offset:]
+
+    header = [field.replace('session__mode__name', 'mode') for field in fields]
+    return header, rows.iterator(chunk_size=CHUNK_SIZE)
+
+
+class Echo:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla"""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(header, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(value, ensure_ascii=False) if isinstance(value, (list, dict)) else value
+            for value in row
+        ])
+
+
+def ndjson_lines(header, rows):
+    for row in rows:
+        yield json.dumps(dict(zip(header, row)), ensure_ascii=False, default=str) + '\n'
+
+
+def encode(lines, batch_bytes=64 * 1024):
+    """Agrupar líneas en bloques de ~64 KB para no mandar una escritura por fila"""
+    buffer = []
+    size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= batch_bytes:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(wbits=31)  # 31 = formato gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+async def async_blocks(chunks):
+    """Iterador asíncrono: cada bloque se genera en el hilo síncrono de la request"""
+    chunks = iter(chunks)
+    next_block = sync_to_async(next, thread_sensitive=True)
+    while True:
+        block = await next_block(chunks, None)
+        if block is None:
+            return
+        yield block
+
+
+def stream_export(header, rows, fmt='ndjson', compress=False):
+    """Bloques de bytes listos para StreamingHttpResponse"""
+    lines = csv_lines(header, rows) if fmt == 'csv' else ndjson_lines(header, rows)
+    chunks = encode(lines)
+    return gzip_stream(chunks) if compress else chunks
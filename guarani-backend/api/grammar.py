@@ -0,0 +1,400 @@
+# api/grammar.py
+
+"""
+Análisis gramatical de los mensajes del chatbot.
+
+Antes de llamar a Gemini pasamos el mensaje por un analizador local basado
+en reglas (tokenizador, léxico de las lecciones, morfología básica y errores
+ortográficos frecuentes). Los mensajes claramente correctos o claramente
+incorrectos se resuelven acá; sólo los casos ambiguos van al LLM.
+"""
+
+import json
+import re
+import unicodedata
+
+from .ledger import track
+from .models import GrammarCorrection, Lesson
+
+
+NASAL_VOWELS = ['ã', 'ẽ', 'ĩ', 'ỹ', 'õ', 'ũ']
+
+APOSTROPHES = {'’': "'", '‘': "'", '´': "'", '`': "'", 'ʼ': "'"}
+
+TOKEN_RE = re.compile(r"[a-zñáéíóúýãẽĩõũỹ̃']+")
+
+# Letras que no existen en el alfabeto guaraní (fuera de ch, mb, nd)
+NON_GUARANI_RE = re.compile(r"[bcdfqwxz]|ll")
+
+# Palabras frecuentes que no siempre aparecen en las lecciones
+BASE_LEXICON = {
+    'che', 'nde', "ha'e", 'ñande', 'ore', 'peẽ', "ha'ekuéra",
+    'ha', 'ko', 'pe', 'upe', 'pa', 'piko', 'katu', 'avei', 'hína', 'ningo',
+    'porã', 'iporã', 'iporãnte', 'heẽ', 'nahániri', 'aguyje', 'aguyjevete',
+    "mba'éichapa", "mba'e", "mba'épa", 'réra', 'mava', 'moõ', 'araka',
+    'jajotopata', 'ndéve', 'chéve', 'peẽme', 'ára', 'pyhare',
+    'ka\'aru', 'pyhareve', 'ko\'ẽrõ', 'kuehe', 'ko\'ag̃a', 'ko\'ãga',
+    'óga', 'sy', 'túva', 'rúva', 'mitã', 'kuña', 'kuimba\'e',
+    'y', 'tembi\'u', 'mandi\'o', 'avati', 'so\'o', 'typy', 'hepy',
+    'hepykue', "hepy'ỹ", 'peteĩ', 'mokõi', 'mbohapy', 'irundy', 'po',
+}
+
+SPANISH_WORDS = {
+    'el', 'la', 'los', 'las', 'de', 'del', 'al', 'que', 'en', 'un', 'una',
+    'es', 'son', 'por', 'para', 'con', 'sin', 'no', 'se', 'me', 'te', 'mi',
+    'tu', 'su', 'yo', 'como', 'cómo', 'qué', 'hola', 'gracias', 'estoy',
+    'bien', 'está', 'cuánto', 'cuesta', 'quiero', 'soy', 'muy', 'pero',
+    'más', 'sí', 'también', 'lo', 'le', 'eso', 'esto', 'hoy', 'aquí',
+    'buenos', 'buenas', 'días', 'tardes', 'noches', 'adiós', 'favor',
+    'a', 'e', 'o', 'u', 'ni', 'si', 'ya', 'hay', 'era', 'fue', 'ser', 'ir',
+    'voy', 'vas', 'va', 'vamos', 'van', 'tengo', 'tienes', 'tiene', 'tenemos',
+    'estás', 'estamos', 'están', 'eres', 'somos', 'puedo', 'puede', 'quieres',
+    'sé', 'hace', 'hago', 'dice', 'digo', 'mañana', 'ayer', 'ahora', 'luego',
+    'siempre', 'nunca', 'mucho', 'mucha', 'poco', 'nada', 'algo', 'todo',
+    'toda', 'todos', 'otro', 'otra', 'casa', 'comer', 'agua', 'hambre',
+    'amigo', 'amiga', 'mamá', 'papá', 'nombre', 'llamo', 'años', 'aquí',
+    'allí', 'dónde', 'cuándo', 'quién', 'cuál', 'porque', 'cuando', 'donde',
+    'nos', 'les', 'ella', 'él', 'usted', 'nosotros', 'ustedes', 'ellos',
+    'este', 'esta', 'ese', 'esa', 'mío', 'tuyo', 'hasta', 'desde', 'sobre',
+    'entre', 'gusta', 'muchas', 'perdón', 'disculpa',
+    # También son palabras guaraníes: en los dos conjuntos cuentan como neutras
+    'y', 'ha', 'pe', 'po', 'he', 'has', 'han', 'hemos',
+}
+
+# Errores ortográficos frecuentes -> forma correcta
+COMMON_MISSPELLINGS = {
+    'mbaechapa': "mba'éichapa",
+    'mbaeichapa': "mba'éichapa",
+    "mba'echapa": "mba'éichapa",
+    'aguije': 'aguyje',
+    'aguyie': 'aguyje',
+    'iporante': 'iporãnte',
+    'ipora': 'iporã',
+    'pora': 'porã',
+    'mokoi': 'mokõi',
+    'pete': 'peteĩ',
+    'petei': 'peteĩ',
+    'nahaniri': 'nahániri',
+    'mbae': "mba'e",
+    'hee': 'heẽ',
+}
+
+# Prefijos personales del verbo y pronombre que los exige
+PERSON_PREFIXES = {
+    '1s': 'a', '2s': 're', '3': 'o', '1pi': 'ja', '1pe': 'ro', '2p': 'pe',
+}
+PRONOUN_PERSON = {
+    'che': '1s', 'nde': '2s', "ha'e": '3', 'ñande': '1pi',
+    'ore': '1pe', 'peẽ': '2p', "ha'ekuéra": '3',
+}
+
+# Raíces verbales frecuentes (areales y aireales, estas últimas con "i")
+VERB_STEMS = {
+    'iko', 'guata', 'karu', "mba'apo", 'ikuaa', 'hecha', 'japo', "ñe'ẽ",
+    'hendu', "mbo'e", 'ke', "pu'ã", 'jeroky', 'purahéi', 'u', 'juhu',
+    'hai', 'ñani', 'ime', 'pota', 'jogua', 'ha\'u', 'monda',
+}
+
+# Verbos irregulares: forma conjugada -> (persona, lema)
+IRREGULAR_VERBS = {
+    'aha': ('1s', 'ho'), 'reho': ('2s', 'ho'), 'oho': ('3', 'ho'),
+    'jaha': ('1pi', 'ho'), 'roho': ('1pe', 'ho'), 'peho': ('2p', 'ho'),
+}
+IRREGULAR_FORMS = {
+    (person, lemma): form for form, (person, lemma) in IRREGULAR_VERBS.items()
+}
+
+
+def normalize(text):
+    """Minúsculas, NFC y apóstrofos unificados (el puso siempre es ')"""
+    text = unicodedata.normalize('NFC', text.lower())
+    for variant, puso in APOSTROPHES.items():
+        text = text.replace(variant, puso)
+    return text
+
+
+def tokenize(text):
+    """Separar un texto en palabras normalizadas"""
+    return [token.strip("'") for token in TOKEN_RE.findall(normalize(text)) if token.strip("'")]
+
+
+def _strip_marks(token, marks):
+    decomposed = unicodedata.normalize('NFD', token)
+    return unicodedata.normalize('NFC', ''.join(c for c in decomposed if c not in marks))
+
+
+def fold_accents(token):
+    """Quitar acentos agudos (se mantienen tildes nasales)"""
+    return _strip_marks(token, {'́'})
+
+
+def fold_all(token):
+    """Quitar acentos, tildes nasales y puso (para detectar errores de tildes)"""
+    return _strip_marks(token, {'́', '̃'}).replace("'", '')
+
+
+def looks_guarani(token):
+    """La palabra sólo usa letras del alfabeto guaraní"""
+    stripped = fold_all(token).replace('ch', '').replace('mb', '').replace('nd', '')
+    return not NON_GUARANI_RE.search(stripped)
+
+
+def has_guarani_marks(token):
+    return "'" in token or any(char in token for char in NASAL_VOWELS) or '̃' in token
+
+
+class GuaraniChecker:
+    """Analizador local basado en reglas"""
+
+    def __init__(self, lexicon=(), spanish_words=()):
+        self.lexicon = {fold_accents(word) for word in BASE_LEXICON}
+        self.lexicon.update(fold_accents(word) for word in lexicon)
+        self.spanish_words = set(SPANISH_WORDS) | set(spanish_words)
+        self.verb_stems = {fold_accents(stem) for stem in VERB_STEMS}
+
+        # Forma sin tildes -> forma correcta, para detectar tildes faltantes
+        self.folded_lexicon = {}
+        for word in self.lexicon:
+            self.folded_lexicon.setdefault(fold_all(word), word)
+
+    # ---------- morfología ----------
+
+    def parse_verb(self, token):
+        """Devuelve (persona, raíz, negado, bien_negado) o None"""
+        token = fold_accents(token)
+        if token in IRREGULAR_VERBS:
+            person, stem = IRREGULAR_VERBS[token]
+            return person, stem, False, False
+
+        parsed = self._parse_affirmative(token)
+        if parsed:
+            return parsed[0], parsed[1], False, False
+
+        # Negación: nd(a|e|o)-...-i  (n- ante nasales)
+        for prefix in ('nd', 'n'):
+            if not token.startswith(prefix):
+                continue
+            core = token[len(prefix):]
+            for suffix in ('', 'ri', 'i', 'ĩ'):
+                if not core.endswith(suffix):
+                    continue
+                body = core[:len(core) - len(suffix)]
+                for candidate in (body, body[1:]):
+                    parsed = candidate and self._parse_affirmative(candidate)
+                    if parsed:
+                        return parsed[0], parsed[1], True, suffix != ''
+        return None
+
+    def _parse_affirmative(self, token):
+        if token in IRREGULAR_VERBS:
+            return IRREGULAR_VERBS[token]
+        for person, prefix in PERSON_PREFIXES.items():
+            if token.startswith(prefix) and token[len(prefix):] in self.verb_stems:
+                return person, token[len(prefix):]
+        return None
+
+    def conjugate(self, person, stem):
+        if (person, stem) in IRREGULAR_FORMS:
+            return IRREGULAR_FORMS[(person, stem)]
+        if stem == 'ho':
+            return None
+        return PERSON_PREFIXES[person] + stem
+
+    # ---------- análisis ----------
+
+    def check(self, text):
+        """Analizar un mensaje.
+
+        Devuelve {'language', 'corrections', 'needs_review'}; needs_review
+        indica que el mensaje tiene partes en Guaraní que el analizador no
+        reconoce y conviene consultar al LLM.
+        """
+        tokens = tokenize(text)
+        corrections = []
+        gn_hits = es_hits = unknown = 0
+        previous = None
+
+        for token in tokens:
+            folded = fold_accents(token)
+            verb = self.parse_verb(token)
+            in_lexicon = folded in self.lexicon
+            is_spanish = token in self.spanish_words
+
+            if in_lexicon and is_spanish:
+                pass  # ambigua ("y", "pe"...)
+            elif in_lexicon or verb:
+                gn_hits += 1
+            elif is_spanish:
+                es_hits += 1
+            elif folded in COMMON_MISSPELLINGS or fold_all(token) in self.folded_lexicon:
+                gn_hits += 1
+                correct = COMMON_MISSPELLINGS.get(folded) or self.folded_lexicon[fold_all(token)]
+                corrections.append({
+                    'original': token,
+                    'corrected': correct,
+                    'type': 'spelling',
+                    'explanation': f'Se escribe "{correct}" (revisa tildes nasales y puso).',
+                    'severity': 'low',
+                })
+            elif not looks_guarani(token):
+                es_hits += 1
+            elif has_guarani_marks(token):
+                gn_hits += 1
+                unknown += 1
+            else:
+                unknown += 1
+
+            if verb:
+                corrections.extend(self._check_verb(token, verb, previous))
+            previous = token
+
+        # Sin evidencia de Guaraní (palabras conocidas, tildes nasales o
+        # puso) las palabras desconocidas se toman como español
+        if gn_hits and es_hits:
+            language = 'mixed'
+        elif gn_hits:
+            language = 'gn'
+        else:
+            language = 'es'
+
+        return {
+            'language': language,
+            'corrections': corrections,
+            'needs_review': language != 'es' and unknown > 0,
+        }
+
+    def _check_verb(self, token, verb, previous):
+        person, stem, negated, suffix_ok = verb
+        corrections = []
+
+        if negated and not suffix_ok:
+            corrections.append({
+                'original': token,
+                'corrected': token + ('ri' if token.endswith('i') else 'i'),
+                'type': 'verb',
+                'explanation': 'La negación en Guaraní rodea al verbo: nd(a)-...-i. Falta la "-i" final.',
+                'severity': 'medium',
+            })
+
+        expected = PRONOUN_PERSON.get(previous)
+        if expected and expected != person and not negated:
+            corrected = self.conjugate(expected, stem)
+            if corrected:
+                corrections.append({
+                    'original': f'{previous} {token}',
+                    'corrected': f'{previous} {corrected}',
+                    'type': 'verb',
+                    'explanation': f'Con "{previous}" el verbo lleva el prefijo "{PERSON_PREFIXES[expected]}-".',
+                    'severity': 'medium',
+                })
+        return corrections
+
+
+_checker = None
+
+
+def build_lexicon():
+    """Palabras guaraníes y españolas tomadas de las lecciones"""
+    guarani, spanish = set(), set()
+    for lesson in Lesson.objects.only('vocabulary', 'grammar', 'exercises'):
+        texts = []
+        for item in lesson.vocabulary or []:
+            texts += [item.get('word', ''), item.get('example', '')]
+            spanish.update(tokenize(item.get('translation', '')))
+        for item in lesson.grammar or []:
+            texts.append(item.get('example', ''))
+        for exercise in lesson.exercises or []:
+            texts.append(exercise.get('correctAnswer', ''))
+        for text in texts:
+            guarani.update(
+                token for token in tokenize(str(text))
+                if looks_guarani(token) and token not in SPANISH_WORDS
+            )
+    return guarani, spanish - guarani
+
+
+def get_checker():
+    """Analizador compartido, construido una vez por proceso"""
+    global _checker
+    if _checker is None:
+        guarani, spanish = build_lexicon()
+        _checker = GuaraniChecker(guarani, spanish)
+    return _checker
+
+
+def invalidate_checker():
+    """Descartar el léxico (se llama al editar lecciones)"""
+    global _checker
+    _checker = None
+
+
+def precheck_grammar(message):
+    """Análisis local, sin llamadas de red"""
+    return get_checker().check(message)
+
+
+def analyze_grammar(message, model, precheck=None, user_id=None, fallback=True):
+    """Analizar gramática y detectar errores.
+
+    Si el LLM falla se devuelven las correcciones locales; con
+    fallback=False se propaga el error (el worker marca el mensaje como
+    fallido).
+    """
+    local = precheck or precheck_grammar(message)
+
+    if not local['needs_review']:
+        return {'corrections': local['corrections'], 'language': local['language']}
+
+    try:
+        analysis_prompt = f"""Analiza el siguiente texto en Guaraní y detecta errores gramaticales.
+Proporciona la respuesta en formato JSON:
+
+Texto: "{message}"
+
+Formato de respuesta:
+{{
+  "corrections": [
+    {{
+      "original": "texto con error",
+      "corrected": "texto corregido",
+      "type": "verb|article|preposition|spelling|other",
+      "explanation": "explicación del error",
+      "severity": "low|medium|high"
+    }}
+  ]
+}}
+
+Si no hay errores, devuelve: {{"corrections": []}}
+"""
+
+        with track('grammar', model, user_id=user_id) as call:
+            response = call.response = model.generate_content(analysis_prompt)
+
+        # Extraer JSON de la respuesta
+        response_text = response.text.strip()
+        if '```json' in response_text:
+            response_text = response_text.split('```json')[1].split('```')[0]
+        elif '```' in response_text:
+            response_text = response_text.split('```')[1].split('```')[0]
+
+        return {**json.loads(response_text), 'language': local['language']}
+    except Exception as e:
+        if not fallback:
+            raise
+        print(f"Error analyzing grammar: {e}")
+        return {'corrections': local['corrections'], 'language': local['language']}
+
+
+def save_corrections(chat_message, corrections):
+    """Guardar correcciones detalladas de un mensaje"""
+    return GrammarCorrection.objects.bulk_create([
+        GrammarCorrection(
+            message=chat_message,
+            original_text=correction.get('original', ''),
+            corrected_text=correction.get('corrected', ''),
+            error_type=correction.get('type', 'general'),
+            explanation=correction.get('explanation', ''),
+            severity=correction.get('severity', 'medium')
+        )
+        for correction in corrections
+    ])
@@ -0,0 +1,178 @@
+# api/item_stats.py
+
+"""
+Estadísticas de dificultad de cada ejercicio entre todos los usuarios.
+
+update_exercise_stats() lee exercise_results desde la marca de agua (el
+mayor last_result_id de exercise_stats) en lotes por id y suma cada lote a
+las filas de ExerciseStats: intentos, aciertos, respuestas incorrectas
+frecuentes (sketch top-k), histograma de latencia y los momentos para la
+discriminación. Nunca vuelve a leer resultados ya procesados.
+
+Dos corridas superpuestas no cuentan dos veces: con las filas bloqueadas
+se saltean los resultados con id <= last_result_id de su fila. Límite
+conocido: la marca avanza por id, así que en Postgres un resultado cuya
+transacción confirme después de uno con id mayor ya procesado queda
+afuera (en SQLite las escrituras son seriales y no pasa).
+
+La discriminación es la correlación punto-biserial entre acertar el
+ejercicio y la precisión general del usuario al momento de procesarlo:
+cerca de 0 (o negativa) indica un ejercicio ambiguo.
+"""
+
+import math
+from bisect import bisect_left
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import ExerciseResult, ExerciseStats
+from .sketches import topk_add
+
+
+# Límites superiores (ms) de los baldes del histograma de latencia
+LATENCY_BUCKETS = [1000, 2000, 3000, 5000, 7500, 10000, 15000, 20000, 30000, 60000]
+LATENCY_OVERFLOW = 'max'
+
+MIN_ATTEMPTS_FOR_DISCRIMINATION = 10
+
+
+def latency_bucket(latency_ms):
+    index = bisect_left(LATENCY_BUCKETS, latency_ms)
+    return str(LATENCY_BUCKETS[index]) if index < len(LATENCY_BUCKETS) else LATENCY_OVERFLOW
+
+
+def median_latency(histogram):
+    """Límite superior del balde que contiene la mediana"""
+    total = sum(histogram.values())
+    if not total:
+        return None
+    seen = 0
+    for bound in LATENCY_BUCKETS:
+        seen += histogram.get(str(bound), 0)
+        if seen * 2 >= total:
+            return bound
+    return LATENCY_BUCKETS[-1]
+
+
+def discrimination(stats):
+    n, x = stats.attempts, stats.correct
+    if n < MIN_ATTEMPTS_FOR_DISCRIMINATION:
+        return None
+    a, a2, xa = stats.ability_sum, stats.ability_sq_sum, stats.correct_ability_sum
+    denominator = (n * x - x * x) * (n * a2 - a * a)
+    if denominator <= 0:
+        return None
+    return round((n * xa - x * a) / math.sqrt(denominator), 3)
+
+
+def high_water_mark():
+    return ExerciseStats.objects.aggregate(mark=Max('last_result_id'))['mark'] or 0
+
+
+def _abilities(user_ids):
+    """Precisión general de cada usuario (una consulta agrupada)"""
+    rows = ExerciseResult.objects.filter(user_id__in=user_ids).values('user_id').annotate(
+        total=Count('id'),
+        correct=Count('id', filter=Q(is_correct=True))
+    )
+    return {row['user_id']: row['correct'] / row['total'] for row in rows}
+
+
+def _apply(stats, result, ability):
+    stats.exercise_type = result['exercise_type'] or stats.exercise_type
+    stats.attempts += 1
+    stats.ability_sum += ability
+    stats.ability_sq_sum += ability * ability
+    if result['is_correct']:
+        stats.correct += 1
+        stats.correct_ability_sum += ability
+    elif result['normalized_answer']:
+        topk_add(
+            stats.wrong_answers,
+            [result['normalized_answer']],
+            getattr(settings, 'EXERCISE_STATS_TOP_WRONG_ANSWERS', 10)
+        )
+    if result['answer_latency_ms'] is not None:
+        bucket = latency_bucket(result['answer_latency_ms'])
+        stats.latency_histogram[bucket] = stats.latency_histogram.get(bucket, 0) + 1
+
+
+def process_batch(after_id, batch_size):
+    """Sumar el siguiente lote de resultados; devuelve (procesados, último id)"""
+    results = list(
+        ExerciseResult.objects.filter(id__gt=after_id).order_by('id').values(
+            'id', 'user_id', 'lesson_id', 'exercise_id', 'exercise_type',
+            'is_correct', 'normalized_answer', 'answer_latency_ms'
+        )[:batch_size]
+    )
+    if not results:
+        return 0, after_id
+
+    last_id = results[-1]['id']
+    abilities = _abilities({result['user_id'] for result in results})
+    keys = {(result['lesson_id'], result['exercise_id']) for result in results}
+
+    try:
+        _save_batch(results, keys, abilities, last_id)
+    except IntegrityError:
+        # Otra corrida creó las mismas filas: reintentar con ellas bloqueadas
+        _save_batch(results, keys, abilities, last_id)
+
+    return len(results), last_id
+
+
+def _save_batch(results, keys, abilities, last_id):
+    with transaction.atomic():
+        existing = {
+            (stats.lesson_id, stats.exercise_id): stats
+            for stats in ExerciseStats.objects.select_for_update().filter(
+                lesson_id__in={lesson_id for lesson_id, _ in keys},
+                exercise_id__in={exercise_id for _, exercise_id in keys}
+            )
+            if (stats.lesson_id, stats.exercise_id) in keys
+        }
+        new = {}
+        touched = {}
+        for result in results:
+            key = (result['lesson_id'], result['exercise_id'])
+            stats = existing.get(key)
+            if stats is not None and result['id'] <= stats.last_result_id:
+                # Ya lo sumó una corrida superpuesta
+                continue
+            if stats is None:
+                stats = new.get(key)
+            if stats is None:
+                stats = new[key] = ExerciseStats(
+                    lesson_id=key[0], exercise_id=key[1], wrong_answers={}, latency_histogram={}
+                )
+            _apply(stats, result, abilities.get(result['user_id'], 0))
+            touched[key] = stats
+
+        now = timezone.now()
+        for stats in touched.values():
+            stats.discrimination = discrimination(stats)
+            stats.median_latency_ms = median_latency(stats.latency_histogram)
+            stats.last_result_id = last_id
+            stats.updated_at = now
+
+        ExerciseStats.objects.bulk_update([touched[key] for key in touched if key in existing], [
+            'exercise_type', 'attempts', 'correct', 'ability_sum', 'ability_sq_sum',
+            'correct_ability_sum', 'discrimination', 'wrong_answers', 'latency_histogram',
+            'median_latency_ms', 'last_result_id', 'updated_at'
+        ])
+        ExerciseStats.objects.bulk_create(new.values())
+
+
+def update_exercise_stats(batch_size=None):
+    """Procesar todos los resultados nuevos desde la marca de agua"""
+    batch_size = batch_size or getattr(settings, 'EXERCISE_STATS_BATCH_SIZE', 5000)
+    mark = high_water_mark()
+    total = 0
+    while True:
+        processed, mark = process_batch(mark, batch_size)
+        if not processed:
+            return total, mark
+        total += processed
@@ -0,0 +1,156 @@
+# api/ledger.py
+
+"""
+Registro de llamadas al LLM (latencia, tokens, caché, errores).
+
+Cada llamada a Gemini se mide con track() y queda en un buffer en memoria;
+el buffer se guarda con un solo bulk_create cuando junta LLM_LEDGER_BATCH_SIZE
+filas (en el pool de tareas) o, con un temporizador, LLM_LEDGER_FLUSH_SECONDS
+después de la primera fila aunque el proceso no reciba más llamadas (en el
+hilo del temporizador, que cierra su conexión al terminar); siempre fuera
+del camino de la request. Los agregados
+(p50/p95/p99, costo por función) los calcula el comando llm_usage.
+"""
+
+import atexit
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+from .models import LLMCall
+from .tasks import submit
+
+
+_lock = threading.Lock()
+_buffer = []
+_timer = None
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def model_name(model):
+    """'models/gemini-2.5-flash' -> 'gemini-2.5-flash'"""
+    from .llm import DEFAULT_MODEL
+    name = getattr(model, 'model_name', None) or DEFAULT_MODEL
+    return name.split('/')[-1]
+
+
+def usage(response):
+    """(prompt_tokens, response_tokens) de una respuesta de Gemini"""
+    metadata = getattr(response, 'usage_metadata', None)
+    if metadata is None:
+        return 0, 0
+    return (
+        getattr(metadata, 'prompt_token_count', 0) or 0,
+        getattr(metadata, 'candidates_token_count', 0) or 0,
+    )
+
+
+class CallRecord:
+    """Datos de una llamada en curso; quien llama asigna .response"""
+
+    def __init__(self, purpose, model, user_id=None, mode=None):
+        self.purpose = purpose
+        self.model = model_name(model)
+        self.user_id = user_id
+        self.mode = getattr(mode, 'name', '') or ''
+        self.response = None
+
+
+def record(purpose, model, user_id=None, mode=None, latency_ms=0,
+           prompt_tokens=0, response_tokens=0, cache_hit=False, error=''):
+    """Agregar una llamada al buffer"""
+    global _timer
+    row = LLMCall(
+        user_id=user_id,
+        purpose=purpose,
+        model=model if isinstance(model, str) else model_name(model),
+        mode=getattr(mode, 'name', '') or '',
+        latency_ms=latency_ms,
+        prompt_tokens=prompt_tokens,
+        response_tokens=response_tokens,
+        cache_hit=cache_hit,
+        error=error[:100],
+        created_at=timezone.now()
+    )
+    with _lock:
+        _buffer.append(row)
+        if _timer is None:
+            # La primera fila del buffer programa el guardado por tiempo
+            _timer = threading.Timer(_setting('LLM_LEDGER_FLUSH_SECONDS', 10), _flush_on_timer)
+            _timer.daemon = True
+            _timer.start()
+        due = len(_buffer) >= _setting('LLM_LEDGER_BATCH_SIZE', 50)
+    if due:
+        submit(flush)
+
+
+@contextmanager
+def track(purpose, model, user_id=None, mode=None):
+    """Medir una llamada: with track('chat', model) as call: call.response = ..."""
+    call = CallRecord(purpose, model, user_id, mode)
+    start = time.perf_counter()
+    error = ''
+    try:
+        yield call
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        prompt_tokens, response_tokens = usage(call.response)
+        record(
+            purpose,
+            call.model,
+            user_id=user_id,
+            mode=mode,
+            latency_ms=int((time.perf_counter() - start) * 1000),
+            prompt_tokens=prompt_tokens,
+            response_tokens=response_tokens,
+            error=error
+        )
+
+
+def take():
+    """Vaciar el buffer y devolver las filas pendientes"""
+    global _buffer, _timer
+    with _lock:
+        rows, _buffer = _buffer, []
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    return rows
+
+
+def flush():
+    """Guardar las filas pendientes con un solo INSERT"""
+    rows = take()
+    if rows:
+        LLMCall.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def _flush_on_timer():
+    """Guardar desde el hilo del temporizador (no hay transacción que esperar)"""
+    try:
+        flush()
+    except Exception as e:
+        print(f"Error guardando el registro de llamadas LLM: {e}")
+    finally:
+        # El hilo termina acá: su conexión no debe quedar abierta
+        connections.close_all()
+
+
+def _flush_at_exit():
+    try:
+        flush()
+    except Exception as e:
+        print(f"Error guardando el registro de llamadas LLM: {e}")
+
+
+atexit.register(_flush_at_exit)
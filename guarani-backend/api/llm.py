@@ -0,0 +1,172 @@
+# api/llm.py
+
+"""
+Clientes de Gemini reutilizables.
+
+Los modos de conversación casi nunca cambian, así que los cargamos una vez
+por proceso como registros inmutables y mantenemos un GenerativeModel ya
+construido por (modo, nivel). Así cada mensaje del chatbot no consulta
+ConversationMode ni arma el system instruction ni un cliente nuevo.
+
+Cuando un modo cambia (comando create_conversation_modes, admin, etc.) la
+señal post_save llama a invalidate_modes(), que además deja una marca de
+versión en la caché de Django para que otros procesos que compartan esa
+caché descarten sus copias en la próxima request.
+"""
+
+import threading
+import time
+from collections import namedtuple
+
+import google.generativeai as genai
+from django.core.cache import cache
+
+from .models import ConversationMode
+
+
+DEFAULT_MODEL = 'gemini-2.5-flash'
+
+MODES_VERSION_KEY = 'llm:conversation_modes:version'
+
+ModeRecord = namedtuple(
+    'ModeRecord',
+    ['id', 'name', 'display_name', 'icon', 'system_prompt', 'difficulty_level']
+)
+
+BASE_INSTRUCTION = """Eres Arami, una tutora amigable y alentadora de idioma Guaraní.
+Tu objetivo es ayudar al usuario a practicar Guaraní de manera conversacional."""
+
+# Ajustar según nivel
+LEVEL_INSTRUCTIONS = {
+    'beginner': """
+- Usa frases simples y cortas
+- Proporciona traducciones frecuentes
+- Sé muy alentador con cada intento
+- Introduce vocabulario básico gradualmente
+""",
+    'intermediate': """
+- Usa frases de complejidad media
+- Proporciona traducciones solo cuando sea necesario
+- Introduce modismos y expresiones comunes
+- Correcciones suaves pero claras
+""",
+    'advanced': """
+- Usa lenguaje natural y complejo
+- Pocas traducciones, enfócate en Guaraní
+- Introduce cultura y contexto profundo
+- Correcciones directas pero constructivas
+"""
+}
+
+
+_lock = threading.Lock()
+_version = None
+_modes = None
+_chat_models = {}
+_models = {}
+
+
+def _ensure_fresh():
+    """Descartar la caché local si otro proceso invalidó los modos"""
+    global _version, _modes
+    version = cache.get(MODES_VERSION_KEY, 0)
+    if version != _version:
+        with _lock:
+            _version = version
+            _modes = None
+            _chat_models.clear()
+
+
+def invalidate_modes():
+    """Descartar modos y modelos construidos (en todos los procesos)"""
+    global _version, _modes
+    cache.set(MODES_VERSION_KEY, time.time_ns(), None)
+    with _lock:
+        _version = None
+        _modes = None
+        _chat_models.clear()
+
+
+def modes_version():
+    """Versión actual de los modos (cambia con cada invalidate_modes)"""
+    _ensure_fresh()
+    return _version
+
+
+def get_modes():
+    """Todos los modos como {id: ModeRecord}"""
+    global _modes
+    _ensure_fresh()
+    modes = _modes
+    if modes is None:
+        modes = {
+            mode.id: ModeRecord(
+                id=mode.id,
+                name=mode.name,
+                display_name=mode.get_name_display(),
+                icon=mode.icon,
+                system_prompt=mode.system_prompt,
+                difficulty_level=mode.difficulty_level,
+            )
+            for mode in ConversationMode.objects.all()
+        }
+        _modes = modes
+    return modes
+
+
+def get_mode(mode_id):
+    """ModeRecord del modo o None si no existe"""
+    if not mode_id:
+        return None
+    try:
+        return get_modes().get(int(mode_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def normalize_level(difficulty_level):
+    return difficulty_level if difficulty_level in LEVEL_INSTRUCTIONS else 'beginner'
+
+
+def build_system_instruction(mode, difficulty_level):
+    """Construir instrucciones del sistema según modo y nivel"""
+    instruction = BASE_INSTRUCTION + LEVEL_INSTRUCTIONS[normalize_level(difficulty_level)]
+
+    # Agregar contexto del modo
+    if mode:
+        instruction += f"\n\nMODO ACTUAL: {mode.display_name}\n{mode.system_prompt}"
+
+    return instruction
+
+
+def get_chat_model(mode, difficulty_level):
+    """GenerativeModel del chatbot para (modo, nivel), construido una sola vez"""
+    _ensure_fresh()
+    key = (mode.id if mode else None, normalize_level(difficulty_level))
+    model = _chat_models.get(key)
+    if model is None:
+        with _lock:
+            model = _chat_models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(
+                    DEFAULT_MODEL,
+                    system_instruction=build_system_instruction(mode, difficulty_level)
+                )
+                _chat_models[key] = model
+    return model
+
+
+def get_model(model_name=DEFAULT_MODEL):
+    """GenerativeModel sin system instruction (traducción, análisis)"""
+    model = _models.get(model_name)
+    if model is None:
+        with _lock:
+            model = _models.setdefault(model_name, genai.GenerativeModel(model_name))
+    return model
+
+
+def reset_models():
+    """Olvidar todos los clientes construidos (tests, cambio de API key)"""
+    with _lock:
+        _chat_models.clear()
+        _models.clear()
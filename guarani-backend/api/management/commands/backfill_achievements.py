@@ -0,0 +1,69 @@
+# api/management/commands/backfill_achievements.py
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max
+
+from api.achievements import BULK_COUNTERS, CATALOG, build_achievement
+from api.models import Achievement
+
+
+class Command(BaseCommand):
+    help = 'Otorgar los logros del catálogo a todos los usuarios que ya los cumplen (por tandas)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--after-id', type=int, default=0, help='Retomar después de este usuario')
+        parser.add_argument('--only', nargs='+', metavar='TIPO', help='Sólo estos tipos de logro')
+        parser.add_argument('--dry-run', action='store_true', help='Contar sin insertar')
+
+    def handle(self, *args, **options):
+        rules = CATALOG
+        if options['only']:
+            rules = [rule for rule in CATALOG if rule.achievement_type in options['only']]
+            unknown = set(options['only']) - {rule.achievement_type for rule in rules}
+            if unknown:
+                raise CommandError(f"Logros desconocidos: {', '.join(sorted(unknown))}")
+        counters = {rule.counter for rule in rules}
+        types = [rule.achievement_type for rule in rules]
+
+        User = get_user_model()
+        max_id = User.objects.aggregate(max_id=Max('id'))['max_id'] or 0
+        last_id = options['after_id']
+        total = 0
+
+        while last_id < max_id:
+            # Límite superior de la tanda por id (rango, no IN con miles de ids)
+            ids = list(
+                User.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:options['batch_size']]
+            )
+            if not ids:
+                break
+            first_id, last_id = last_id, ids[-1]
+
+            # Una consulta agregada por contador para toda la tanda
+            values = {counter: BULK_COUNTERS[counter](first_id, last_id) for counter in counters}
+            unlocked = set(
+                Achievement.objects.filter(
+                    user_id__gt=first_id,
+                    user_id__lte=last_id,
+                    achievement_type__in=types
+                ).values_list('user_id', 'achievement_type')
+            )
+
+            new = [
+                build_achievement(user_id, rule)
+                for rule in rules
+                for user_id, value in values[rule.counter].items()
+                if value >= rule.threshold and (user_id, rule.achievement_type) not in unlocked
+            ]
+            if new and not options['dry_run']:
+                Achievement.objects.bulk_create(new, batch_size=1000, ignore_conflicts=True)
+
+            total += len(new)
+            self.stdout.write(f"  hasta el usuario {last_id}: {len(new)} logros")
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(f"{prefix}✅ {total} logros otorgados"))
@@ -0,0 +1,35 @@
+# api/management/commands/index_chat_messages.py
+
+from django.core.management.base import BaseCommand
+
+from api.models import ChatMessage
+from api.search import index_messages
+
+
+class Command(BaseCommand):
+    help = 'Indexar el historial de chat existente para la búsqueda (se puede retomar con --after-id)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--after-id', type=int, default=0, help='Retomar desde este mensaje')
+
+    def handle(self, *args, **options):
+        last_id = options['after_id']
+        total = 0
+
+        while True:
+            batch = list(
+                ChatMessage.objects
+                .filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'user_id', 'message', 'response')[:options['batch_size']]
+            )
+            if not batch:
+                break
+
+            index_messages(batch)
+            last_id = batch[-1].id
+            total += len(batch)
+            self.stdout.write(f"  {total} mensajes indexados (último id {last_id})")
+
+        self.stdout.write(self.style.SUCCESS(f"✅ {total} mensajes indexados"))
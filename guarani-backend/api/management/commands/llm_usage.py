@@ -0,0 +1,84 @@
+# api/management/commands/llm_usage.py
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from api import ledger
+from api.models import LLMCall
+
+
+def percentile(queryset, count, fraction):
+    """Latencia en el percentil pedido (un solo valor por consulta)"""
+    index = min(count - 1, int(count * fraction))
+    return queryset.order_by('latency_ms').values_list('latency_ms', flat=True)[index]
+
+
+def cost(model, prompt_tokens, response_tokens):
+    """Costo estimado en USD según LLM_PRICING"""
+    pricing = getattr(settings, 'LLM_PRICING', {}).get(model)
+    if not pricing:
+        return 0.0
+    return (
+        prompt_tokens * pricing['input'] + response_tokens * pricing['output']
+    ) / 1_000_000
+
+
+class Command(BaseCommand):
+    help = 'Latencia (p50/p95/p99), tokens y costo de las llamadas al LLM por función'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help='Días hacia atrás (default 7)')
+        parser.add_argument(
+            '--by',
+            choices=['purpose', 'mode', 'user'],
+            default='purpose',
+            help='Agrupar por función, modo o usuario'
+        )
+
+    def handle(self, *args, **options):
+        # Incluir lo que este proceso tenga en el buffer
+        ledger.flush()
+
+        since = timezone.now() - timedelta(days=options['days'])
+        group = {'purpose': 'purpose', 'mode': 'mode', 'user': 'user_id'}[options['by']]
+        calls = LLMCall.objects.filter(created_at__gte=since)
+
+        rows = (
+            calls.values(group, 'model')
+            .annotate(
+                total=Count('id'),
+                hits=Count('id', filter=Q(cache_hit=True)),
+                errors=Count('id', filter=~Q(error='')),
+                prompt_tokens=Sum('prompt_tokens'),
+                response_tokens=Sum('response_tokens'),
+            )
+            .order_by(group, 'model')
+        )
+
+        self.stdout.write(
+            f"{options['by']:<16} {'modelo':<20} {'llamadas':>8} {'caché':>6} {'errores':>7} "
+            f"{'p50':>7} {'p95':>7} {'p99':>7} {'tokens':>10} {'USD':>9}"
+        )
+        total_cost = 0.0
+        for row in rows:
+            # Los percentiles sólo tienen sentido para llamadas reales
+            real = calls.filter(**{group: row[group]}, model=row['model'], cache_hit=False)
+            real_count = row['total'] - row['hits']
+            if real_count:
+                p50, p95, p99 = (percentile(real, real_count, f) for f in (0.50, 0.95, 0.99))
+            else:
+                p50 = p95 = p99 = 0
+
+            row_cost = cost(row['model'], row['prompt_tokens'] or 0, row['response_tokens'] or 0)
+            total_cost += row_cost
+            tokens = (row['prompt_tokens'] or 0) + (row['response_tokens'] or 0)
+            self.stdout.write(
+                f"{str(row[group] or '-'):<16} {row['model']:<20} {row['total']:>8} {row['hits']:>6} "
+                f"{row['errors']:>7} {p50:>5}ms {p95:>5}ms {p99:>5}ms {tokens:>10} {row_cost:>9.4f}"
+            )
+
+        self.stdout.write(self.style.SUCCESS(f"Costo total estimado: {total_cost:.4f} USD"))
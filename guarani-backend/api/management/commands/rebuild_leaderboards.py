@@ -0,0 +1,37 @@
+# api/management/commands/rebuild_leaderboards.py
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from api.models import LeaderboardEntry, XPEvent
+
+
+class Command(BaseCommand):
+    help = 'Recalcular las tablas de posiciones actuales desde el registro XPEvent'
+
+    def handle(self, *args, **kwargs):
+        for period, start in LeaderboardEntry.period_starts().items():
+            events = XPEvent.objects.all()
+            if period != 'all':
+                # El saldo inicial sólo cuenta para el histórico
+                events = events.filter(created_at__date__gte=start).exclude(source='opening')
+
+            with transaction.atomic():
+                # Bloquear las filas del período antes de leer los totales:
+                # un LeaderboardEntry.add concurrente espera al reemplazo
+                current = LeaderboardEntry.objects.filter(period=period, period_start=start)
+                list(current.select_for_update().values_list('id', flat=True))
+
+                totals = events.values('user_id').annotate(xp=Sum('amount')).values_list('user_id', 'xp')
+                entries = [
+                    LeaderboardEntry(period=period, period_start=start, user_id=user_id, xp=xp)
+                    for user_id, xp in totals
+                ]
+
+                current.delete()
+                LeaderboardEntry.objects.bulk_create(entries, batch_size=1000)
+
+            self.stdout.write(
+                self.style.SUCCESS(f'✓ {period} ({start}): {len(entries)} usuarios')
+            )
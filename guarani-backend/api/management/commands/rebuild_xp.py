@@ -0,0 +1,72 @@
+# api/management/commands/rebuild_xp.py
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Sum
+
+from api.models import Mascot, XPEvent
+
+
+class Command(BaseCommand):
+    help = 'Reconstruir total_xp y nivel de usuarios y mascotas a partir del registro XPEvent'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Sólo informar diferencias')
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        batch_size = options['batch_size']
+
+        # Un solo GROUP BY sobre el registro
+        totals = dict(
+            XPEvent.objects.values('user_id')
+            .annotate(total=Sum('amount'))
+            .values_list('user_id', 'total')
+        )
+
+        users_fixed = 0
+        mascots_fixed = 0
+        last_id = 0
+        while True:
+            users = list(
+                User.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'total_xp', 'level')[:batch_size]
+            )
+            if not users:
+                break
+            last_id = users[-1].id
+            ids = [user.id for user in users]
+
+            changed_users = []
+            for user in users:
+                total_xp = totals.get(user.id, 0)
+                level = Mascot.level_for_xp(total_xp)[0]
+                if (user.total_xp, user.level) != (total_xp, level):
+                    user.total_xp, user.level = total_xp, level
+                    changed_users.append(user)
+
+            changed_mascots = []
+            for mascot in Mascot.objects.filter(user_id__in=ids).only(
+                'id', 'user_id', 'total_xp', 'level', 'current_xp'
+            ):
+                total_xp = totals.get(mascot.user_id, 0)
+                level, current_xp = Mascot.level_for_xp(total_xp)
+                if (mascot.total_xp, mascot.level, mascot.current_xp) != (total_xp, level, current_xp):
+                    mascot.total_xp, mascot.level, mascot.current_xp = total_xp, level, current_xp
+                    changed_mascots.append(mascot)
+
+            if not options['dry_run']:
+                with transaction.atomic():
+                    User.objects.bulk_update(changed_users, ['total_xp', 'level'])
+                    Mascot.objects.bulk_update(changed_mascots, ['total_xp', 'level', 'current_xp'])
+
+            users_fixed += len(changed_users)
+            mascots_fixed += len(changed_mascots)
+
+        prefix = '[dry-run] ' if options['dry_run'] else ''
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix}✅ {users_fixed} usuarios y {mascots_fixed} mascotas corregidos"
+        ))
@@ -0,0 +1,18 @@
+# api/management/commands/update_exercise_stats.py
+
+from django.core.management.base import BaseCommand
+
+from api.item_stats import update_exercise_stats
+
+
+class Command(BaseCommand):
+    help = 'Sumar los resultados de ejercicios nuevos a las estadísticas por ejercicio (correr periódicamente)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None)
+
+    def handle(self, *args, **options):
+        processed, mark = update_exercise_stats(options['batch_size'])
+        self.stdout.write(
+            self.style.SUCCESS(f'✓ {processed} resultados procesados (marca: {mark})')
+        )
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_conversationmode_chatsession_chatmessage_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatmessage',
+            name='grammar_status',
+            field=models.CharField(choices=[('pending', 'Pendiente'), ('done', 'Analizado'), ('failed', 'Fallido')], default='done', max_length=10),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_chatmessage_grammar_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='context_summary',
+            field=models.TextField(blank=True, default=''),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='summarized_message_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+    ]
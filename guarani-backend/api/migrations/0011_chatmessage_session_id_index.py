@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:43
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_chatsession_context_summary'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatmessage',
+            index=models.Index(fields=['session', 'id'], name='chat_messag_session_97f3b9_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:44
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_chatmessage_session_id_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='chatsession',
+            index=models.Index(fields=['user', '-started_at'], name='chat_sessio_user_id_bf73d7_idx'),
+        ),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:45
+
+from collections import Counter
+
+from django.db import migrations, models
+
+
+TOP_WORDS = 50
+FIELDS = ['word_frequencies', 'error_breakdown', 'words_used', 'grammar_errors']
+
+
+def backfill_aggregates(apps, schema_editor):
+    """Calcular los agregados de las sesiones existentes"""
+    ChatSession = apps.get_model('api', 'ChatSession')
+    ChatMessage = apps.get_model('api', 'ChatMessage')
+    GrammarCorrection = apps.get_model('api', 'GrammarCorrection')
+
+    batch = []
+    for session in ChatSession.objects.only('id').iterator(chunk_size=500):
+        words = Counter()
+        words_used = 0
+        messages = ChatMessage.objects.filter(session_id=session.id)
+        for text, word_count in messages.values_list('message', 'word_count'):
+            words.update(text.lower().split())
+            words_used += word_count
+        errors = Counter(
+            GrammarCorrection.objects.filter(
+                message__session_id=session.id
+            ).values_list('error_type', flat=True)
+        )
+        session.word_frequencies = dict(words.most_common(TOP_WORDS))
+        session.error_breakdown = dict(errors)
+        session.words_used = words_used
+        session.grammar_errors = sum(errors.values())
+        batch.append(session)
+        if len(batch) >= 500:
+            ChatSession.objects.bulk_update(batch, FIELDS)
+            batch = []
+    if batch:
+        ChatSession.objects.bulk_update(batch, FIELDS)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_chatsession_user_started_at_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='chatsession',
+            name='error_breakdown',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='chatsession',
+            name='word_frequencies',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_aggregates, migrations.RunPython.noop),
+    ]
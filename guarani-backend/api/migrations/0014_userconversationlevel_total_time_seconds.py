@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:46
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_totals(apps, schema_editor):
+    """Recalcular los totales (antes se recalculaban en cada GET)"""
+    ChatSession = apps.get_model('api', 'ChatSession')
+    UserConversationLevel = apps.get_model('api', 'UserConversationLevel')
+
+    totals = {
+        row['user_id']: row
+        for row in ChatSession.objects.values('user_id').annotate(
+            sessions=Count('id'),
+            messages=Sum('message_count'),
+            seconds=Sum('duration_seconds'),
+        )
+    }
+    levels = list(UserConversationLevel.objects.all())
+    for level in levels:
+        row = totals.get(level.user_id)
+        if row:
+            level.total_sessions = row['sessions']
+            level.total_messages = row['messages'] or 0
+            level.total_time_seconds = row['seconds'] or 0
+            level.total_time_minutes = level.total_time_seconds // 60
+    UserConversationLevel.objects.bulk_update(
+        levels,
+        ['total_sessions', 'total_messages', 'total_time_seconds', 'total_time_minutes'],
+        batch_size=500
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_chatsession_running_aggregates'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userconversationlevel',
+            name='total_time_seconds',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_totals, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:54
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_userconversationlevel_total_time_seconds'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LLMCall',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('purpose', models.CharField(choices=[('chat', 'Chatbot'), ('translate', 'Traducción'), ('grammar', 'Análisis gramatical'), ('summary', 'Resumen de contexto')], max_length=20)),
+                ('model', models.CharField(max_length=50)),
+                ('mode', models.CharField(blank=True, default='', max_length=50)),
+                ('latency_ms', models.IntegerField(default=0)),
+                ('prompt_tokens', models.IntegerField(default=0)),
+                ('response_tokens', models.IntegerField(default=0)),
+                ('cache_hit', models.BooleanField(default=False)),
+                ('error', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField()),
+                ('user', models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'llm_calls',
+                'indexes': [models.Index(fields=['purpose', 'created_at'], name='llm_calls_purpose_f9c043_idx'), models.Index(fields=['created_at'], name='llm_calls_created_915d56_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.7 on 2026-10-19 17:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_llmcall'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChatSearchTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64)),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='api.chatmessage')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'chat_search_terms',
+                'constraints': [models.UniqueConstraint(fields=('user', 'term', 'message'), name='chat_search_term_unique')],
+            },
+        ),
+    ]
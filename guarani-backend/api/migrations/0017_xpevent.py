@@ -0,0 +1,77 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:00
+
+import math
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def level_for_xp(total_xp):
+    """Copia de Mascot.level_for_xp al momento de esta migración"""
+    steps = max(0, total_xp) // 50
+    level = (1 + math.isqrt(1 + 4 * steps)) // 2
+    return level, total_xp - 50 * level * (level - 1)
+
+
+def seed_opening_balances(apps, schema_editor):
+    """Un evento de saldo inicial por usuario con XP.
+
+    User.total_xp sólo sumaba desafíos y Mascot.total_xp todo lo demás
+    también, así que se toma el mayor de los dos. Después usuario y
+    mascota quedan con ese mismo saldo (lo que haría rebuild_xp).
+    """
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Mascot = apps.get_model('api', 'Mascot')
+    XPEvent = apps.get_model('api', 'XPEvent')
+
+    balances = dict(User.objects.filter(total_xp__gt=0).values_list('id', 'total_xp'))
+    for user_id, total_xp in Mascot.objects.filter(total_xp__gt=0).values_list('user_id', 'total_xp'):
+        balances[user_id] = max(balances.get(user_id, 0), total_xp)
+
+    XPEvent.objects.bulk_create(
+        [
+            XPEvent(user_id=user_id, amount=amount, source='opening')
+            for user_id, amount in balances.items()
+        ],
+        batch_size=1000
+    )
+
+    users = list(User.objects.filter(id__in=balances).only('id', 'total_xp', 'level'))
+    for user in users:
+        user.total_xp = balances[user.id]
+        user.level = level_for_xp(user.total_xp)[0]
+    User.objects.bulk_update(users, ['total_xp', 'level'], batch_size=1000)
+
+    mascots = list(Mascot.objects.filter(user_id__in=balances).only('id', 'user_id', 'total_xp', 'level', 'current_xp'))
+    for mascot in mascots:
+        mascot.total_xp = balances[mascot.user_id]
+        mascot.level, mascot.current_xp = level_for_xp(mascot.total_xp)
+    Mascot.objects.bulk_update(mascots, ['total_xp', 'level', 'current_xp'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_chatsearchterm'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='XPEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.IntegerField()),
+                ('source', models.CharField(choices=[('lesson', 'Lección'), ('challenge', 'Desafío'), ('manual', 'Manual'), ('opening', 'Saldo inicial')], max_length=20)),
+                ('reference', models.CharField(blank=True, default='', max_length=100)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='xp_events', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'xp_events',
+                'indexes': [models.Index(fields=['user', 'created_at'], name='xp_events_user_id_be9667_idx')],
+            },
+        ),
+        migrations.RunPython(seed_opening_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:02
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_last_interaction(apps, schema_editor):
+    """Los estados guardados hasta ahora datan de la última interacción"""
+    Mascot = apps.get_model('api', 'Mascot')
+    Mascot.objects.update(state_changed_at=F('last_interaction'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_xpevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mascot',
+            name='state_changed_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AlterField(
+            model_name='mascot',
+            name='last_interaction',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(copy_last_interaction, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0018_mascot_derived_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LeaderboardEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('weekly', 'Semanal'), ('monthly', 'Mensual'), ('all', 'Histórico')], max_length=10)),
+                ('period_start', models.DateField()),
+                ('xp', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='leaderboard_entries', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'leaderboard_entries',
+                'indexes': [models.Index(fields=['period', 'period_start', '-xp', 'user'], name='leaderboard_period_6ca72d_idx')],
+                'unique_together': {('period', 'period_start', 'user')},
+            },
+        ),
+    ]
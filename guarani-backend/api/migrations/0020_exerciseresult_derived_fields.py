@@ -0,0 +1,247 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:10
+
+import re
+import unicodedata
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+# Copia de api.grammar y api.exercises al momento de esta migración: las
+# migraciones no importan código de la app, que puede cambiar después.
+
+NASAL_VOWELS = ['ã', 'ẽ', 'ĩ', 'ỹ', 'õ', 'ũ']
+
+APOSTROPHES = {'’': "'", '‘': "'", '´': "'", '`': "'", 'ʼ': "'"}
+
+TOKEN_RE = re.compile(r"[a-zñáéíóúýãẽĩõũỹ̃']+")
+
+# Letras que no existen en el alfabeto guaraní (fuera de ch, mb, nd)
+NON_GUARANI_RE = re.compile(r"[bcdfqwxz]|ll")
+
+SPANISH_WORDS = {
+    'el', 'la', 'los', 'las', 'de', 'del', 'al', 'que', 'en', 'un', 'una',
+    'es', 'son', 'por', 'para', 'con', 'sin', 'no', 'se', 'me', 'te', 'mi',
+    'tu', 'su', 'yo', 'como', 'cómo', 'qué', 'hola', 'gracias', 'estoy',
+    'bien', 'está', 'cuánto', 'cuesta', 'quiero', 'soy', 'muy', 'pero',
+    'más', 'sí', 'también', 'lo', 'le', 'eso', 'esto', 'hoy', 'aquí',
+    'buenos', 'buenas', 'días', 'tardes', 'noches', 'adiós', 'favor',
+    'a', 'e', 'o', 'u', 'ni', 'si', 'ya', 'hay', 'era', 'fue', 'ser', 'ir',
+    'voy', 'vas', 'va', 'vamos', 'van', 'tengo', 'tienes', 'tiene', 'tenemos',
+    'estás', 'estamos', 'están', 'eres', 'somos', 'puedo', 'puede', 'quieres',
+    'sé', 'hace', 'hago', 'dice', 'digo', 'mañana', 'ayer', 'ahora', 'luego',
+    'siempre', 'nunca', 'mucho', 'mucha', 'poco', 'nada', 'algo', 'todo',
+    'toda', 'todos', 'otro', 'otra', 'casa', 'comer', 'agua', 'hambre',
+    'amigo', 'amiga', 'mamá', 'papá', 'nombre', 'llamo', 'años', 'aquí',
+    'allí', 'dónde', 'cuándo', 'quién', 'cuál', 'porque', 'cuando', 'donde',
+    'nos', 'les', 'ella', 'él', 'usted', 'nosotros', 'ustedes', 'ellos',
+    'este', 'esta', 'ese', 'esa', 'mío', 'tuyo', 'hasta', 'desde', 'sobre',
+    'entre', 'gusta', 'muchas', 'perdón', 'disculpa',
+}
+
+
+def normalize(text):
+    """Minúsculas, NFC y apóstrofos unificados (el puso siempre es ')"""
+    text = unicodedata.normalize('NFC', text.lower())
+    for variant, puso in APOSTROPHES.items():
+        text = text.replace(variant, puso)
+    return text
+
+
+def tokenize(text):
+    """Separar un texto en palabras normalizadas"""
+    return [token.strip("'") for token in TOKEN_RE.findall(normalize(text)) if token.strip("'")]
+
+
+def _strip_marks(token, marks):
+    decomposed = unicodedata.normalize('NFD', token)
+    return unicodedata.normalize('NFC', ''.join(c for c in decomposed if c not in marks))
+
+
+def fold_accents(token):
+    """Quitar acentos agudos (se mantienen tildes nasales)"""
+    return _strip_marks(token, {'́'})
+
+
+def fold_all(token):
+    """Quitar acentos, tildes nasales y puso (para detectar errores de tildes)"""
+    return _strip_marks(token, {'́', '̃'}).replace("'", '')
+
+
+def looks_guarani(token):
+    """La palabra sólo usa letras del alfabeto guaraní"""
+    stripped = fold_all(token).replace('ch', '').replace('mb', '').replace('nd', '')
+    return not NON_GUARANI_RE.search(stripped)
+
+
+def has_guarani_marks(token):
+    return "'" in token or any(char in token for char in NASAL_VOWELS) or '̃' in token
+
+
+ES_TO_GN = 'ES_TO_GN'
+GN_TO_ES = 'GN_TO_ES'
+
+MAX_ANSWER_LENGTH = 200
+
+
+def normalize_answer(text):
+    """Minúsculas, sin acentos agudos ni puntuación ("¡Iporãnte!" -> "iporãnte")"""
+    return ' '.join(fold_accents(token) for token in tokenize(text or ''))[:MAX_ANSWER_LENGTH]
+
+
+def _guarani_share(text):
+    tokens = tokenize(text or '')
+    if not tokens:
+        return 0
+    guarani = sum(
+        1 for token in tokens
+        if has_guarani_marks(token) or (looks_guarani(token) and token not in SPANISH_WORDS)
+    )
+    return guarani / len(tokens)
+
+
+def translation_direction(exercise, correct_answer=''):
+    """ES_TO_GN si hay que escribir en guaraní, GN_TO_ES si no.
+
+    La lección puede declararla con "direction"; si no, se compara qué
+    tanto parecen guaraní la respuesta y la frase a traducir. Sin
+    definición se usa la regla vieja: respuesta con tildes nasales o puso.
+    """
+    if exercise:
+        if exercise.get('direction') in (ES_TO_GN, GN_TO_ES):
+            return exercise['direction']
+        answer = exercise.get('correctAnswer', correct_answer)
+        phrase = exercise.get('phraseToTranslate', '')
+        if answer or phrase:
+            return ES_TO_GN if _guarani_share(answer) > _guarani_share(phrase) else GN_TO_ES
+    return ES_TO_GN if has_guarani_marks(normalize(correct_answer or '')) else GN_TO_ES
+
+
+def _exercise_texts(exercise):
+    texts = [
+        exercise.get('correctAnswer', ''),
+        exercise.get('phraseToTranslate', ''),
+        exercise.get('question', ''),
+        exercise.get('sentence', ''),
+    ]
+    options = exercise.get('options') or []
+    index = exercise.get('correctAnswerIndex')
+    if isinstance(index, int) and 0 <= index < len(options):
+        texts.append(options[index])
+    return texts
+
+
+def vocabulary_item_id(lesson_id, vocabulary, exercise):
+    """Ítem de vocabulario de la lección que practica el ejercicio.
+
+    Se respeta "vocabularyId" si la lección lo define; si no, es la
+    primera palabra del vocabulario que aparece en el ejercicio,
+    identificada como "<lección>:<palabra normalizada>".
+    """
+    if not exercise:
+        return ''
+    if exercise.get('vocabularyId'):
+        return str(exercise['vocabularyId'])[:100]
+
+    found = set()
+    for text in _exercise_texts(exercise):
+        tokens = tokenize(str(text))
+        found.update(fold_accents(token) for token in tokens)
+        found.add(' '.join(fold_accents(token) for token in tokens))
+
+    for item in vocabulary or []:
+        word = normalize_answer(item.get('word', ''))
+        if word and word in found:
+            return str(item.get('id') or f'{lesson_id}:{word}')[:100]
+    return ''
+
+
+def lesson_exercises(lesson):
+    """Definiciones de ejercicio de una lección, por id"""
+    return {
+        str(exercise.get('id')): exercise
+        for exercise in (lesson.exercises or [])
+        if exercise.get('id') is not None
+    }
+
+
+def result_fields(lesson_id, vocabulary, exercise, exercise_type, user_answer, correct_answer):
+    """Columnas derivadas de un ExerciseResult"""
+    return {
+        'direction': (
+            translation_direction(exercise, correct_answer)
+            if exercise_type == 'TRANSLATION' else ''
+        ),
+        'normalized_answer': normalize_answer(user_answer),
+        'vocabulary_item_id': vocabulary_item_id(lesson_id, vocabulary, exercise),
+    }
+
+
+def backfill_derived_fields(apps, schema_editor):
+    """Completar dirección, respuesta normalizada y vocabulario por lotes de id"""
+    Lesson = apps.get_model('api', 'Lesson')
+    ExerciseResult = apps.get_model('api', 'ExerciseResult')
+
+    lessons = {
+        lesson.id: (lesson_exercises(lesson), lesson.vocabulary)
+        for lesson in Lesson.objects.only('exercises', 'vocabulary')
+    }
+
+    last_id = 0
+    while True:
+        batch = list(
+            ExerciseResult.objects.filter(id__gt=last_id).order_by('id').only(
+                'id', 'lesson_id', 'exercise_id', 'exercise_type', 'user_answer', 'correct_answer'
+            )[:BATCH_SIZE]
+        )
+        if not batch:
+            break
+        for result in batch:
+            exercises, vocabulary = lessons.get(result.lesson_id, ({}, []))
+            fields = result_fields(
+                result.lesson_id, vocabulary, exercises.get(result.exercise_id),
+                result.exercise_type, result.user_answer, result.correct_answer
+            )
+            for name, value in fields.items():
+                setattr(result, name, value)
+        ExerciseResult.objects.bulk_update(batch, ['direction', 'normalized_answer', 'vocabulary_item_id'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0019_leaderboardentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='exerciseresult',
+            name='answer_latency_ms',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='exerciseresult',
+            name='direction',
+            field=models.CharField(blank=True, choices=[('ES_TO_GN', 'Español → Guaraní'), ('GN_TO_ES', 'Guaraní → Español')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='exerciseresult',
+            name='normalized_answer',
+            field=models.CharField(blank=True, default='', max_length=200),
+        ),
+        migrations.AddField(
+            model_name='exerciseresult',
+            name='vocabulary_item_id',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddIndex(
+            model_name='exerciseresult',
+            index=models.Index(fields=['user', 'exercise_type', 'direction'], name='exercise_re_user_id_afa95c_idx'),
+        ),
+        migrations.RunPython(backfill_derived_fields, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0020_exerciseresult_derived_fields'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExerciseStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lesson_id', models.CharField(max_length=100)),
+                ('exercise_id', models.CharField(max_length=100)),
+                ('exercise_type', models.CharField(blank=True, default='', max_length=20)),
+                ('attempts', models.IntegerField(default=0)),
+                ('correct', models.IntegerField(default=0)),
+                ('ability_sum', models.FloatField(default=0)),
+                ('ability_sq_sum', models.FloatField(default=0)),
+                ('correct_ability_sum', models.FloatField(default=0)),
+                ('discrimination', models.FloatField(blank=True, null=True)),
+                ('wrong_answers', models.JSONField(blank=True, default=dict)),
+                ('latency_histogram', models.JSONField(blank=True, default=dict)),
+                ('median_latency_ms', models.IntegerField(blank=True, null=True)),
+                ('last_result_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'exercise_stats',
+                'unique_together': {('lesson_id', 'exercise_id')},
+            },
+        ),
+    ]
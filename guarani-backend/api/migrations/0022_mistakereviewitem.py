@@ -0,0 +1,83 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+BATCH_SIZE = 1000
+
+
+def build_queue(apps, schema_editor):
+    """Reproducir el historial de exercise_results en orden de id"""
+    ExerciseResult = apps.get_model('api', 'ExerciseResult')
+    MistakeReviewItem = apps.get_model('api', 'MistakeReviewItem')
+    decay = getattr(settings, 'MISTAKE_REVIEW_DECAY', 0.5)
+    clear_after = getattr(settings, 'MISTAKE_REVIEW_CLEAR_AFTER', 2)
+
+    queue = {}
+    last_id = 0
+    while True:
+        batch = list(ExerciseResult.objects.filter(id__gt=last_id).order_by('id')[:BATCH_SIZE])
+        if not batch:
+            break
+        for result in batch:
+            key = (result.user_id, result.lesson_id, result.exercise_id)
+            item = queue.get(key)
+            if result.is_correct:
+                if item:
+                    item.correct_streak += 1
+                    item.priority *= decay
+                    if item.correct_streak >= clear_after:
+                        del queue[key]
+                continue
+            if item is None:
+                item = queue[key] = MistakeReviewItem(
+                    user_id=result.user_id, lesson_id=result.lesson_id, exercise_id=result.exercise_id
+                )
+            item.exercise_type = result.exercise_type
+            item.vocabulary_item_id = result.vocabulary_item_id
+            item.last_wrong_answer = result.user_answer
+            item.correct_answer = result.correct_answer
+            item.last_mistake_at = result.created_at
+            item.mistakes += 1
+            item.correct_streak = 0
+            item.priority += 1
+        last_id = batch[-1].id
+
+    MistakeReviewItem.objects.bulk_create(queue.values(), batch_size=BATCH_SIZE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0021_exercisestats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MistakeReviewItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lesson_id', models.CharField(max_length=100)),
+                ('exercise_id', models.CharField(max_length=100)),
+                ('exercise_type', models.CharField(blank=True, default='', max_length=20)),
+                ('vocabulary_item_id', models.CharField(blank=True, default='', max_length=100)),
+                ('last_wrong_answer', models.TextField(blank=True, default='')),
+                ('correct_answer', models.TextField(blank=True, default='')),
+                ('mistakes', models.IntegerField(default=0)),
+                ('correct_streak', models.IntegerField(default=0)),
+                ('priority', models.FloatField(default=0)),
+                ('last_mistake_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mistake_reviews', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'mistake_review_items',
+                'indexes': [models.Index(fields=['user', '-priority', '-last_mistake_at'], name='mistake_rev_user_id_4dc0f7_idx')],
+                'unique_together': {('user', 'lesson_id', 'exercise_id')},
+            },
+        ),
+        migrations.RunPython(build_queue, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-19 18:18
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0022_mistakereviewitem'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='flashcard',
+            name='due_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='ease_factor',
+            field=models.FloatField(default=2.5),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='interval_days',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='flashcard',
+            name='repetitions',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='flashcard',
+            index=models.Index(fields=['user', 'due_at'], name='flashcards_user_id_16e32e_idx'),
+        ),
+    ]
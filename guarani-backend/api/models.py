@@ -1,5 +1,9 @@
+import math
+from datetime import date, timedelta
+
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 class Lesson(models.Model):
     id = models.CharField(max_length=100, primary_key=True)
@@ -80,32 +84,54 @@ class Mascot(models.Model):
         ],
         default='normal'
     )
-    last_interaction = models.DateTimeField(auto_now=True)
+    # Sólo cambian con interacciones reales (XP, edición), no al consultar
+    last_interaction = models.DateTimeField(default=timezone.now)
+    state_changed_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    SLEEP_AFTER = timedelta(days=2)
+    # Estados de un evento (subir de nivel, terminar lección) que se ven por un rato
+    EVENT_STATES = ('evolving', 'celebrating')
+    EVENT_STATE_DURATION = timedelta(hours=6)
+    
     class Meta:
         db_table = 'mascots'
     
     def __str__(self):
         return f"{self.user.username}'s {self.name} (Nivel {self.level})"
     
+    def current_state(self, now=None):
+        """Estado que se muestra, derivado del guardado y del tiempo (sin escribir)"""
+        now = now or timezone.now()
+        if now - self.last_interaction > self.SLEEP_AFTER:
+            return 'sleeping'
+        if self.state == 'sleeping':
+            return 'happy'
+        if self.state in self.EVENT_STATES and now - self.state_changed_at > self.EVENT_STATE_DURATION:
+            return 'happy'
+        return self.state
+    
     def xp_for_next_level(self):
         """XP necesaria para el siguiente nivel"""
         return 100 * self.level  # Nivel 1->2: 100 XP, Nivel 2->3: 200 XP, etc.
     
-    def add_xp(self, amount):
-        """Agregar XP y manejar subida de nivel"""
-        self.current_xp += amount
-        self.total_xp += amount
-        
-        leveled_up = False
-        while self.current_xp >= self.xp_for_next_level():
-            self.current_xp -= self.xp_for_next_level()
-            self.level += 1
-            leveled_up = True
-            self.state = 'evolving'
+    @staticmethod
+    def level_for_xp(total_xp):
+        """(nivel, xp dentro del nivel) para un total de XP, sin iterar.
         
-        self.save()
+        Llegar al nivel L cuesta 100 + 200 + ... + 100(L-1) = 50·L·(L-1),
+        así que L es el mayor entero con L·(L-1) <= total_xp // 50.
+        """
+        steps = max(0, total_xp) // 50
+        level = (1 + math.isqrt(1 + 4 * steps)) // 2
+        return level, total_xp - 50 * level * (level - 1)
+    
+    def add_xp(self, amount, source='manual', reference=''):
+        """Agregar XP (queda en el registro XPEvent) y devolver si subió de nivel"""
+        leveled_up = XPEvent.award(self.user, amount, source, reference)
+        self.refresh_from_db(fields=[
+            'level', 'current_xp', 'total_xp', 'state', 'last_interaction', 'state_changed_at'
+        ])
         return leveled_up
     
     def get_evolution_stage(self):
@@ -122,6 +148,144 @@ class Mascot(models.Model):
             return 'master'
 
 
+class XPEvent(models.Model):
+    """Registro de XP ganada (sólo se agregan filas).
+    
+    Los saldos de User y Mascot se actualizan con UPDATE atómicos a partir
+    de cada evento y se pueden reconstruir con el comando rebuild_xp.
+    """
+    SOURCES = [
+        ('lesson', 'Lección'),
+        ('challenge', 'Desafío'),
+        ('manual', 'Manual'),
+        ('opening', 'Saldo inicial'),
+    ]
+    
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='xp_events'
+    )
+    amount = models.IntegerField()
+    source = models.CharField(max_length=20, choices=SOURCES)
+    reference = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        db_table = 'xp_events'
+        indexes = [
+            models.Index(fields=['user', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} +{self.amount} ({self.source})"
+    
+    @classmethod
+    def award(cls, user, amount, source, reference=''):
+        """Registrar XP y sumarla a User y Mascot sin read-modify-write.
+        
+        Devuelve True si la mascota subió de nivel.
+        """
+        from django.contrib.auth import get_user_model
+        from django.db import transaction
+        from django.db.models import F
+        
+        user_id = getattr(user, 'pk', user)
+        with transaction.atomic():
+            cls.objects.create(user_id=user_id, amount=amount, source=source, reference=str(reference)[:100])
+            
+            users = get_user_model().objects.filter(pk=user_id)
+            users.update(total_xp=F('total_xp') + amount)
+            
+            Mascot.objects.get_or_create(user_id=user_id)
+            mascots = Mascot.objects.filter(user_id=user_id)
+            mascots.update(total_xp=F('total_xp') + amount, last_interaction=timezone.now())
+            
+            # Nivel derivado del total; compare-and-set sobre el total leído
+            # para que una actualización concurrente más nueva no se pise
+            user_total = users.values_list('total_xp', flat=True).get()
+            users.filter(total_xp=user_total).update(level=Mascot.level_for_xp(user_total)[0])
+            
+            total_xp, previous_level = mascots.values_list('total_xp', 'level').get()
+            level, current_xp = Mascot.level_for_xp(total_xp)
+            leveled_up = level > previous_level
+            changes = {'level': level, 'current_xp': current_xp}
+            if leveled_up:
+                changes['state'] = 'evolving'
+                changes['state_changed_at'] = timezone.now()
+            mascots.filter(total_xp=total_xp).update(**changes)
+            
+            LeaderboardEntry.add(user_id, amount)
+        
+        from .achievements import check_achievements
+        check_achievements(user_id, 'xp', user_total)
+        
+        if isinstance(user, models.Model):
+            user.total_xp = user_total
+            user.level = Mascot.level_for_xp(user_total)[0]
+        return leveled_up
+
+
+class LeaderboardEntry(models.Model):
+    """XP acumulada por usuario en cada período (tabla de posiciones precalculada).
+    
+    Se actualiza con cada XPEvent; el índice (period, period_start, -xp, user)
+    resuelve el top N y la posición de un usuario sin ordenar la tabla.
+    """
+    PERIODS = [
+        ('weekly', 'Semanal'),
+        ('monthly', 'Mensual'),
+        ('all', 'Histórico'),
+    ]
+    ALL_TIME_START = date(1970, 1, 1)
+    
+    period = models.CharField(max_length=10, choices=PERIODS)
+    period_start = models.DateField()
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='leaderboard_entries'
+    )
+    xp = models.IntegerField(default=0)
+    
+    class Meta:
+        db_table = 'leaderboard_entries'
+        unique_together = ('period', 'period_start', 'user')
+        indexes = [
+            models.Index(fields=['period', 'period_start', '-xp', 'user']),
+        ]
+    
+    def __str__(self):
+        return f"{self.period} {self.period_start} {self.user_id}: {self.xp}"
+    
+    @classmethod
+    def period_starts(cls, day=None):
+        """{período: fecha de inicio} para el día dado (semana desde el lunes)"""
+        day = day or timezone.localdate()
+        return {
+            'weekly': day - timedelta(days=day.weekday()),
+            'monthly': day.replace(day=1),
+            'all': cls.ALL_TIME_START,
+        }
+    
+    @classmethod
+    def add(cls, user_id, amount, day=None):
+        """Sumar XP a los tres períodos actuales con UPDATE atómicos"""
+        from django.db.models import F
+        
+        for period, start in cls.period_starts(day).items():
+            updated = cls.objects.filter(
+                period=period, period_start=start, user_id=user_id
+            ).update(xp=F('xp') + amount)
+            if not updated:
+                entry, created = cls.objects.get_or_create(
+                    period=period, period_start=start, user_id=user_id,
+                    defaults={'xp': amount}
+                )
+                if not created:
+                    cls.objects.filter(id=entry.id).update(xp=F('xp') + amount)
+
+
 class Achievement(models.Model):
     """Logros desbloqueables"""
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='achievements')
@@ -149,6 +313,10 @@ class ExerciseResult(models.Model):
         ('TRANSLATION', 'Traducción'),
         ('FILL_IN_THE_BLANK', 'Completar Espacios'),
     ]
+    DIRECTIONS = [
+        ('ES_TO_GN', 'Español → Guaraní'),
+        ('GN_TO_ES', 'Guaraní → Español'),
+    ]
     
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL, 
@@ -161,6 +329,11 @@ class ExerciseResult(models.Model):
     is_correct = models.BooleanField()
     user_answer = models.TextField(blank=True)  # Respuesta del usuario
     correct_answer = models.TextField(blank=True)  # Respuesta correcta
+    # Derivados de la definición del ejercicio al guardar (ver exercises.py)
+    direction = models.CharField(max_length=10, choices=DIRECTIONS, blank=True, default='')
+    normalized_answer = models.CharField(max_length=200, blank=True, default='')
+    vocabulary_item_id = models.CharField(max_length=100, blank=True, default='')
+    answer_latency_ms = models.PositiveIntegerField(null=True, blank=True)
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -169,11 +342,124 @@ class ExerciseResult(models.Model):
         indexes = [
             models.Index(fields=['user', 'exercise_type']),
             models.Index(fields=['user', 'lesson_id']),
+            models.Index(fields=['user', 'exercise_type', 'direction']),
         ]
     
     def __str__(self):
         return f"{self.user.username} - {self.exercise_type} - {'✓' if self.is_correct else '✗'}"
 
+class ExerciseStats(models.Model):
+    """Estadísticas de cada ejercicio entre todos los usuarios.
+    
+    Las calcula el comando update_exercise_stats en forma incremental
+    (ver api/item_stats.py): last_result_id es la marca hasta la que se
+    procesó exercise_results. Se guardan sumas en vez de promedios para
+    poder seguir acumulando sin releer los resultados viejos.
+    """
+    lesson_id = models.CharField(max_length=100)
+    exercise_id = models.CharField(max_length=100)
+    exercise_type = models.CharField(max_length=20, blank=True, default='')
+    attempts = models.IntegerField(default=0)
+    correct = models.IntegerField(default=0)
+    
+    # Momentos para la discriminación (correlación punto-biserial entre
+    # acertar el ejercicio y la precisión general del usuario)
+    ability_sum = models.FloatField(default=0)
+    ability_sq_sum = models.FloatField(default=0)
+    correct_ability_sum = models.FloatField(default=0)
+    discrimination = models.FloatField(null=True, blank=True)
+    
+    wrong_answers = models.JSONField(default=dict, blank=True)  # Top-k de respuestas incorrectas
+    latency_histogram = models.JSONField(default=dict, blank=True)  # {límite en ms: conteo}
+    median_latency_ms = models.IntegerField(null=True, blank=True)
+    
+    last_result_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        db_table = 'exercise_stats'
+        unique_together = ('lesson_id', 'exercise_id')
+    
+    def __str__(self):
+        return f"{self.lesson_id}/{self.exercise_id}: {self.p_correct:.0%} de {self.attempts}"
+    
+    @property
+    def p_correct(self):
+        return self.correct / self.attempts if self.attempts else 0
+
+
+class MistakeReviewItem(models.Model):
+    """Cola de repaso de errores: un ejercicio fallado por usuario.
+    
+    Se actualiza con cada ExerciseResult (ver signals.py): un error suma
+    prioridad y un acierto posterior la reduce a la mitad; después de
+    CLEAR_AFTER aciertos seguidos el ejercicio sale de la cola. El índice
+    (user, -priority, -last_mistake_at) deja la cola ordenada para leerla
+    con un solo rango.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='mistake_reviews'
+    )
+    lesson_id = models.CharField(max_length=100)
+    exercise_id = models.CharField(max_length=100)
+    exercise_type = models.CharField(max_length=20, blank=True, default='')
+    vocabulary_item_id = models.CharField(max_length=100, blank=True, default='')
+    last_wrong_answer = models.TextField(blank=True, default='')
+    correct_answer = models.TextField(blank=True, default='')
+    mistakes = models.IntegerField(default=0)
+    correct_streak = models.IntegerField(default=0)
+    priority = models.FloatField(default=0)
+    last_mistake_at = models.DateTimeField(default=timezone.now)
+    
+    class Meta:
+        db_table = 'mistake_review_items'
+        unique_together = ('user', 'lesson_id', 'exercise_id')
+        indexes = [
+            models.Index(fields=['user', '-priority', '-last_mistake_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user_id} - {self.lesson_id}/{self.exercise_id} ({self.priority:.2f})"
+    
+    @classmethod
+    def record(cls, result):
+        """Actualizar la cola con un resultado recién guardado (UPDATE atómicos)"""
+        from django.db.models import F
+        
+        items = cls.objects.filter(
+            user_id=result.user_id, lesson_id=result.lesson_id, exercise_id=result.exercise_id
+        )
+        if result.is_correct:
+            if items.update(correct_streak=F('correct_streak') + 1, priority=F('priority') * cls.decay()):
+                items.filter(correct_streak__gte=cls.clear_after()).delete()
+            return
+        
+        changes = {
+            'exercise_type': result.exercise_type,
+            'vocabulary_item_id': result.vocabulary_item_id,
+            'last_wrong_answer': result.user_answer,
+            'correct_answer': result.correct_answer,
+            'last_mistake_at': result.created_at,
+        }
+        if not items.update(mistakes=F('mistakes') + 1, correct_streak=0, priority=F('priority') + 1, **changes):
+            item, created = cls.objects.get_or_create(
+                user_id=result.user_id, lesson_id=result.lesson_id, exercise_id=result.exercise_id,
+                defaults={'mistakes': 1, 'priority': 1, **changes}
+            )
+            if not created:
+                items.update(mistakes=F('mistakes') + 1, correct_streak=0, priority=F('priority') + 1, **changes)
+    
+    @staticmethod
+    def decay():
+        return getattr(settings, 'MISTAKE_REVIEW_DECAY', 0.5)
+    
+    @staticmethod
+    def clear_after():
+        return getattr(settings, 'MISTAKE_REVIEW_CLEAR_AFTER', 2)
+
+
 # api/models.py (AGREGAR AL FINAL)
 
 class Flashcard(models.Model):
@@ -192,6 +478,13 @@ class Flashcard(models.Model):
     times_reviewed = models.IntegerField(default=0)
     times_correct = models.IntegerField(default=0)
     last_reviewed = models.DateTimeField(null=True, blank=True)
+    
+    # Repetición espaciada SM-2 (ver api/srs.py)
+    repetitions = models.IntegerField(default=0)
+    interval_days = models.IntegerField(default=0)
+    ease_factor = models.FloatField(default=2.5)
+    due_at = models.DateTimeField(default=timezone.now)
+    
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
@@ -199,6 +492,9 @@ class Flashcard(models.Model):
         db_table = 'flashcards'
         ordering = ['-created_at']
         unique_together = ('user', 'spanish_word', 'guarani_word')
+        indexes = [
+            models.Index(fields=['user', 'due_at']),
+        ]
     
     def __str__(self):
         return f"{self.spanish_word} → {self.guarani_word}"
@@ -208,6 +504,21 @@ class Flashcard(models.Model):
         if self.times_reviewed == 0:
             return 0
         return int((self.times_correct / self.times_reviewed) * 100)
+    
+    def review(self, grade, reviewed_at=None):
+        """Aplicar una revisión (calificación 0-5) y reprogramar la tarjeta; no guarda"""
+        from .srs import PASSING_GRADE, next_due, sm2
+        
+        reviewed_at = reviewed_at or timezone.now()
+        self.repetitions, self.interval_days, self.ease_factor = sm2(
+            self.repetitions, self.interval_days, self.ease_factor, grade
+        )
+        self.due_at = next_due(reviewed_at, self.interval_days)
+        self.times_reviewed += 1
+        if grade >= PASSING_GRADE:
+            self.times_correct += 1
+        self.last_reviewed = reviewed_at
+        return self
 
 # api/models.py (AGREGAR al final)
 
@@ -327,15 +638,10 @@ class UserChallengeProgress(models.Model):
             self.completed = True
             self.completed_at = timezone.now()
             
-            # Dar recompensa en XP
-            self.user.total_xp += self.challenge.xp_reward
-            self.user.save()
-            
-            # Actualizar mascota
-            mascot, _ = Mascot.objects.get_or_create(user=self.user)
-            mascot.add_xp(self.challenge.xp_reward)
-            
             self.save()
+            
+            # Dar recompensa en XP (usuario y mascota)
+            XPEvent.award(self.user, self.challenge.xp_reward, 'challenge', self.challenge_id)
             return True
         return False
 
@@ -416,7 +722,9 @@ class ActivityLog(models.Model):
         
         # Actualizar racha
         streak, _ = UserStreak.objects.get_or_create(user=user)
-        streak.update_streak()
+        if streak.update_streak():
+            from .achievements import check_achievements
+            check_achievements(user, 'streak', streak.current_streak)
 
 # api/models.py (AGREGAR al final)
 
@@ -471,20 +779,88 @@ class ChatSession(models.Model):
     grammar_errors = models.IntegerField(default=0)
     pronunciation_score = models.IntegerField(default=0)
     
+    # Agregados que se actualizan con cada mensaje
+    word_frequencies = models.JSONField(default=dict, blank=True)
+    error_breakdown = models.JSONField(default=dict, blank=True)
+    
+    # Contexto resumido para el chatbot (ver api/chat_context.py)
+    context_summary = models.TextField(blank=True, default='')
+    summarized_message_id = models.BigIntegerField(null=True, blank=True)
+    
     class Meta:
         db_table = 'chat_sessions'
         ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['user', '-started_at']),
+        ]
     
     def __str__(self):
         return f"{self.user.username} - {self.started_at.date()}"
     
+    @classmethod
+    def start(cls, user, mode_id=None, difficulty_level='beginner'):
+        """Crear una sesión y contarla en las estadísticas del usuario"""
+        session = cls.objects.create(
+            user=user,
+            mode_id=mode_id,
+            difficulty_level=difficulty_level
+        )
+        UserConversationLevel.increment(user, total_sessions=1)
+        return session
+    
     def end_session(self):
         """Finalizar sesión y calcular duración"""
         from django.utils import timezone
         self.ended_at = timezone.now()
         delta = self.ended_at - self.started_at
         self.duration_seconds = int(delta.total_seconds())
-        self.save()
+        # Sólo estas columnas: los agregados los escriben record_message/record_corrections
+        self.save(update_fields=['ended_at', 'duration_seconds'])
+        UserConversationLevel.increment(self.user_id, total_time_seconds=self.duration_seconds)
+    
+    def record_message(self, message, corrections=()):
+        """Sumar un mensaje (y sus correcciones) a los agregados de la sesión"""
+        from django.db import transaction
+        from .sketches import topk_add
+        
+        with transaction.atomic():
+            session = ChatSession.objects.select_for_update().get(pk=self.pk)
+            session.message_count += 1
+            session.words_used += message.word_count
+            topk_add(
+                session.word_frequencies,
+                message.message.lower().split(),
+                getattr(settings, 'CHAT_SESSION_TOP_WORDS', 50)
+            )
+            session._add_corrections(corrections)
+            session.save(update_fields=[
+                'message_count', 'words_used', 'word_frequencies',
+                'grammar_errors', 'error_breakdown'
+            ])
+        self._copy_aggregates(session)
+    
+    def record_corrections(self, corrections):
+        """Sumar correcciones que llegaron después (análisis diferido)"""
+        from django.db import transaction
+        
+        if not corrections:
+            return
+        with transaction.atomic():
+            session = ChatSession.objects.select_for_update().get(pk=self.pk)
+            session._add_corrections(corrections)
+            session.save(update_fields=['grammar_errors', 'error_breakdown'])
+        self._copy_aggregates(session)
+    
+    def _add_corrections(self, corrections):
+        self.grammar_errors += len(corrections)
+        for correction in corrections:
+            error_type = correction.get('type', 'general')
+            self.error_breakdown[error_type] = self.error_breakdown.get(error_type, 0) + 1
+    
+    def _copy_aggregates(self, session):
+        for field in ('message_count', 'words_used', 'word_frequencies',
+                      'grammar_errors', 'error_breakdown'):
+            setattr(self, field, getattr(session, field))
 
 
 class ChatMessage(models.Model):
@@ -508,6 +884,15 @@ class ChatMessage(models.Model):
     # Análisis del mensaje
     detected_language = models.CharField(max_length=10, default='es')
     grammar_corrections = models.JSONField(default=list, blank=True)
+    grammar_status = models.CharField(
+        max_length=10,
+        choices=[
+            ('pending', 'Pendiente'),
+            ('done', 'Analizado'),
+            ('failed', 'Fallido'),
+        ],
+        default='done'
+    )
     word_count = models.IntegerField(default=0)
     sentiment = models.CharField(max_length=20, default='neutral')
     
@@ -516,6 +901,9 @@ class ChatMessage(models.Model):
     class Meta:
         db_table = 'chat_messages'
         ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['session', 'id']),
+        ]
     
     def __str__(self):
         return f"{self.user.username}: {self.message[:50]}"
@@ -545,6 +933,34 @@ class GrammarCorrection(models.Model):
         return f"{self.error_type}: {self.original_text[:30]}"
 
 
+class ChatSearchTerm(models.Model):
+    """Índice invertido de palabras del historial de chat (ver api/search.py)"""
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    term = models.CharField(max_length=64)
+    message = models.ForeignKey(
+        ChatMessage,
+        on_delete=models.CASCADE,
+        related_name='search_terms'
+    )
+    
+    class Meta:
+        db_table = 'chat_search_terms'
+        # También sirve de índice para buscar (user, term) -> mensajes
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'term', 'message'],
+                name='chat_search_term_unique'
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.term} -> {self.message_id}"
+
+
 class ConversationChallenge(models.Model):
     """Desafíos específicos de conversación"""
     CHALLENGE_TYPES = [
@@ -594,6 +1010,7 @@ class UserConversationLevel(models.Model):
     total_sessions = models.IntegerField(default=0)
     total_messages = models.IntegerField(default=0)
     total_time_minutes = models.IntegerField(default=0)
+    total_time_seconds = models.IntegerField(default=0)
     vocabulary_size = models.IntegerField(default=0)
     
     # Evaluación por habilidad
@@ -608,6 +1025,42 @@ class UserConversationLevel(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.get_current_level_display()}"
     
+    @classmethod
+    def increment(cls, user, total_sessions=0, total_time_seconds=0):
+        """Sumar a los totales con UPDATE atómico (sin leer la fila)"""
+        from django.db.models import F
+        
+        user_id = getattr(user, 'pk', user)
+        seconds = F('total_time_seconds') + total_time_seconds
+        updated = cls.objects.filter(user_id=user_id).update(
+            total_sessions=F('total_sessions') + total_sessions,
+            total_time_seconds=seconds,
+            total_time_minutes=seconds / 60
+        )
+        if not updated:
+            cls.objects.get_or_create(user_id=user_id)
+            cls.increment(user_id, total_sessions, total_time_seconds)
+    
+    def record_message(self, message):
+        """Actualizar nivel con un mensaje ya analizado (UPDATE atómico)"""
+        from django.db.models import F, Value
+        from django.db.models.functions import Least
+        
+        changes = {
+            'total_messages': F('total_messages') + 1,
+            # Incrementar vocabulario
+            'vocabulary_size': F('vocabulary_size') + max(0, message.word_count - 2),
+        }
+        # Incrementar score si no tiene errores
+        if len(message.grammar_corrections) == 0:
+            changes['grammar_score'] = Least(F('grammar_score') + 0.5, Value(100.0))
+        
+        UserConversationLevel.objects.filter(pk=self.pk).update(**changes)
+        self.refresh_from_db(fields=['total_messages', 'vocabulary_size', 'grammar_score'])
+        
+        from .achievements import check_achievements
+        check_achievements(self.user_id, 'chat_messages', self.total_messages)
+    
     def calculate_overall_score(self):
         """Calcular puntaje general"""
         return (
@@ -615,4 +1068,43 @@ class UserConversationLevel(models.Model):
             self.vocabulary_score * 0.25 +
             self.fluency_score * 0.25 +
             self.comprehension_score * 0.2
-        )
\ No newline at end of file
+        )
+
+class LLMCall(models.Model):
+    """Registro compacto de cada llamada a Gemini (ver api/ledger.py)"""
+    PURPOSES = [
+        ('chat', 'Chatbot'),
+        ('translate', 'Traducción'),
+        ('grammar', 'Análisis gramatical'),
+        ('summary', 'Resumen de contexto'),
+    ]
+    
+    # Sin constraint en la base: el registro no debe frenar el borrado de usuarios
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        db_constraint=False,
+        related_name='+'
+    )
+    purpose = models.CharField(max_length=20, choices=PURPOSES)
+    model = models.CharField(max_length=50)
+    mode = models.CharField(max_length=50, blank=True, default='')
+    latency_ms = models.IntegerField(default=0)
+    prompt_tokens = models.IntegerField(default=0)
+    response_tokens = models.IntegerField(default=0)
+    cache_hit = models.BooleanField(default=False)
+    error = models.CharField(max_length=100, blank=True, default='')
+    # Momento de la llamada, no del guardado en lote
+    created_at = models.DateTimeField()
+    
+    class Meta:
+        db_table = 'llm_calls'
+        indexes = [
+            models.Index(fields=['purpose', 'created_at']),
+            models.Index(fields=['created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.purpose} {self.model} {self.latency_ms}ms"
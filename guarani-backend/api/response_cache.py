@@ -0,0 +1,96 @@
+# api/response_cache.py
+
+"""
+Caché de respuestas para los primeros turnos del chatbot.
+
+En los modos guionados (saludos, mercado, restaurante) casi todas las
+sesiones de principiantes arrancan igual: "Mba'éichapa", "hola", "¿cuánto
+cuesta?". Para esos turnos guardamos las respuestas de Gemini por
+(modo, nivel, mensaje normalizado, huella del contexto) y las reutilizamos
+sin llamar al LLM.
+
+Cada clave guarda un grupo de hasta CHAT_RESPONSE_CACHE_VARIANTS respuestas
+distintas: mientras el grupo no está completo se sigue llamando a Gemini y
+se agrega la respuesta nueva; una vez completo se elige una al azar, así
+los alumnos no ven siempre la misma. El TTL y el desalojo los maneja el
+alias de caché 'chat_responses' (ver CACHES en settings).
+"""
+
+import hashlib
+import random
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .chat_context import SUMMARY_PREFIX
+from .grammar import fold_accents, tokenize
+from .llm import modes_version, normalize_level
+
+
+CACHE_ALIAS = 'chat_responses'
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def normalize_message(message):
+    """Minúsculas, sin acentos agudos ni puntuación ("¿Cuánto cuesta?" -> "cuanto cuesta")"""
+    return ' '.join(fold_accents(token) for token in tokenize(message))
+
+
+def context_fingerprint(history):
+    """Huella corta de los mensajes anteriores del usuario.
+
+    Las respuestas del modelo no entran en la huella: varían por el grupo
+    de variantes y multiplicarían las claves sin cambiar el contexto.
+    """
+    previous = [
+        normalize_message(item['parts'][0])
+        for item in history
+        if item['role'] == 'user'
+    ]
+    return hashlib.sha1('|'.join(previous).encode()).hexdigest()[:12]
+
+
+def opener_key(mode, difficulty_level, message, history):
+    """Clave de caché del turno o None si el turno no se cachea"""
+    if mode is None or mode.name not in _setting('CHAT_RESPONSE_CACHE_MODES', ()):
+        return None
+
+    # Sólo los primeros turnos y nunca con resumen de por medio
+    user_turns = sum(1 for item in history if item['role'] == 'user')
+    if user_turns >= _setting('CHAT_RESPONSE_CACHE_MAX_TURNS', 2):
+        return None
+    if history and history[0]['parts'][0].startswith(SUMMARY_PREFIX):
+        return None
+
+    normalized = normalize_message(message)
+    if not normalized:
+        return None
+
+    digest = hashlib.sha1(normalized.encode()).hexdigest()[:16]
+    return (
+        f"chat:opener:{modes_version()}:{mode.id}:{normalize_level(difficulty_level)}:"
+        f"{context_fingerprint(history)}:{digest}"
+    )
+
+
+def get_reply(key):
+    """Una respuesta del grupo si ya está completo, si no None"""
+    if key is None:
+        return None
+    pool = caches[CACHE_ALIAS].get(key)
+    if pool and len(pool) >= _setting('CHAT_RESPONSE_CACHE_VARIANTS', 3):
+        return random.choice(pool)
+    return None
+
+
+def add_reply(key, reply):
+    """Agregar una respuesta nueva al grupo de variantes"""
+    if key is None or not reply:
+        return
+    cache = caches[CACHE_ALIAS]
+    pool = cache.get(key) or []
+    if reply not in pool and len(pool) < _setting('CHAT_RESPONSE_CACHE_VARIANTS', 3):
+        cache.set(key, pool + [reply])
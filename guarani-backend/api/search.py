@@ -0,0 +1,110 @@
+# api/search.py
+
+"""
+Búsqueda en el historial de chat de cada usuario.
+
+Cada mensaje guardado agrega sus palabras (del usuario y de Arami) a un
+índice invertido, ChatSearchTerm(user, term, message). Buscar es entonces
+una consulta por (user, term) sobre ese índice, que no depende de cuántos
+mensajes haya en total ni de escanear textos.
+
+Las palabras se normalizan igual al indexar y al buscar: minúsculas, sin
+acentos, sin tildes nasales y sin puso, así "mbaeichapa" encuentra
+"Mba'éichapa" y "ñ" encuentra la letra ñ en una explicación.
+"""
+
+import re
+
+from django.db.models import Count
+
+from .grammar import fold_all, normalize, tokenize
+from .models import ChatMessage, ChatSearchTerm
+
+
+MAX_TERM_LENGTH = 64
+
+# Palabras en el texto original (incluye puso y tildes combinadas)
+WORD_RE = re.compile(r"[\w'’‘´`ʼ̃]+")
+
+
+def fold_term(token):
+    return fold_all(normalize(token)).strip("'")[:MAX_TERM_LENGTH]
+
+
+def search_terms(text):
+    """Términos normalizados (sin repetir) de un texto"""
+    return {term for term in (fold_term(token) for token in tokenize(text or '')) if term}
+
+
+def index_messages(messages):
+    """Agregar mensajes al índice (un solo INSERT)"""
+    rows = [
+        ChatSearchTerm(user_id=message.user_id, term=term, message_id=message.id)
+        for message in messages
+        for term in search_terms(f"{message.message} {message.response}")
+    ]
+    ChatSearchTerm.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+    return len(rows)
+
+
+def search_messages(user, query, limit=20, before=None):
+    """Mensajes del usuario que contienen todas las palabras, del más nuevo al más viejo"""
+    terms = search_terms(query)
+    if not terms:
+        return [], terms
+
+    matches = ChatSearchTerm.objects.filter(user=user, term__in=terms)
+    if before:
+        matches = matches.filter(message_id__lt=before)
+    message_ids = list(
+        matches.values('message_id')
+        .annotate(found=Count('term'))
+        .filter(found=len(terms))
+        .order_by('-message_id')
+        .values_list('message_id', flat=True)[:limit]
+    )
+
+    messages = (
+        ChatMessage.objects
+        .filter(id__in=message_ids)
+        .select_related('session__mode')
+        .order_by('-id')
+    )
+    return list(messages), terms
+
+
+def snippet(text, terms, width=60):
+    """Fragmento alrededor de la primera coincidencia y posiciones a resaltar.
+
+    Devuelve (snippet, highlights) donde highlights son pares [inicio, fin]
+    relativos al fragmento, o (None, []) si el texto no contiene los términos.
+    """
+    spans = [
+        (match.start(), match.end())
+        for match in WORD_RE.finditer(text)
+        if fold_term(match.group()) in terms
+    ]
+    if not spans:
+        return None, []
+
+    first_start, first_end = spans[0]
+    start = max(0, first_start - width)
+    end = min(len(text), first_end + width)
+
+    # No cortar palabras a la mitad
+    if start > 0:
+        space = text.find(' ', start, first_start)
+        start = space + 1 if space != -1 else start
+    if end < len(text):
+        space = text.rfind(' ', first_end, end)
+        end = space if space != -1 else end
+
+    prefix = '…' if start > 0 else ''
+    suffix = '…' if end < len(text) else ''
+    offset = len(prefix) - start
+    highlights = [
+        [span_start + offset, span_end + offset]
+        for span_start, span_end in spans
+        if span_start >= start and span_end <= end
+    ]
+    return f"{prefix}{text[start:end]}{suffix}", highlights
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import (
     Lesson, UserProgress, Translation, ChatHistory, Mascot, 
-    Achievement, ExerciseResult, Flashcard,
+    Achievement, ExerciseResult, Flashcard, MistakeReviewItem,
     UserStreak, DailyChallenge, UserChallengeProgress,
     ActivityLog, StudySession,
     ConversationMode, ChatSession, ChatMessage, GrammarCorrection,
@@ -69,7 +69,7 @@ class ChatMessageSerializer(serializers.ModelSerializer):
         model = ChatMessage
         fields = (
             'id', 'message', 'response', 'is_user_message',
-            'detected_language', 'grammar_corrections', 'word_count',
+            'detected_language', 'grammar_corrections', 'grammar_status', 'word_count',
             'sentiment', 'created_at', 'corrections'
         )
         read_only_fields = ('id', 'created_at')
@@ -90,6 +90,24 @@ class ChatSessionSerializer(serializers.ModelSerializer):
         )
 
 
+class ChatSessionSummarySerializer(serializers.ModelSerializer):
+    """Sesión sin transcripción (para listados)"""
+    mode_name = serializers.CharField(source='mode.get_name_display', read_only=True)
+    mode_icon = serializers.CharField(source='mode.icon', read_only=True)
+    correction_count = serializers.IntegerField(read_only=True)
+    first_message = serializers.CharField(read_only=True)
+    last_message = serializers.CharField(read_only=True)
+    
+    class Meta:
+        model = ChatSession
+        fields = (
+            'id', 'mode', 'mode_name', 'mode_icon', 'started_at', 'ended_at',
+            'duration_seconds', 'message_count', 'difficulty_level',
+            'words_used', 'grammar_errors', 'correction_count',
+            'first_message', 'last_message'
+        )
+
+
 class ConversationChallengeSerializer(serializers.ModelSerializer):
     mode_name = serializers.CharField(source='mode.get_name_display', read_only=True)
     
@@ -118,6 +136,7 @@ class UserConversationLevelSerializer(serializers.ModelSerializer):
 # ==================== MASCOT ====================
 
 class MascotSerializer(serializers.ModelSerializer):
+    state = serializers.SerializerMethodField()
     xp_for_next_level = serializers.SerializerMethodField()
     evolution_stage = serializers.SerializerMethodField()
     xp_percentage = serializers.SerializerMethodField()
@@ -129,6 +148,9 @@ class MascotSerializer(serializers.ModelSerializer):
                   'last_interaction', 'created_at')
         read_only_fields = ('id', 'created_at')
     
+    def get_state(self, obj):
+        return obj.current_state()
+    
     def get_xp_for_next_level(self, obj):
         return obj.xp_for_next_level()
     
@@ -156,9 +178,13 @@ class FlashcardSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'spanish_word', 'guarani_word', 'example', 'notes',
             'deck_name', 'is_favorite', 'times_reviewed', 'times_correct',
-            'accuracy', 'last_reviewed', 'created_at', 'updated_at'
+            'accuracy', 'last_reviewed', 'repetitions', 'interval_days',
+            'ease_factor', 'due_at', 'created_at', 'updated_at'
+        )
+        read_only_fields = (
+            'id', 'created_at', 'updated_at', 'accuracy',
+            'repetitions', 'interval_days', 'ease_factor', 'due_at'
         )
-        read_only_fields = ('id', 'created_at', 'updated_at', 'accuracy')
     
     def get_accuracy(self, obj):
         return obj.accuracy()
@@ -167,7 +193,8 @@ class FlashcardSerializer(serializers.ModelSerializer):
 class FlashcardReviewSerializer(serializers.Serializer):
     """Para registrar una revisión de flashcard"""
     flashcard_id = serializers.IntegerField()
-    is_correct = serializers.BooleanField()
+    is_correct = serializers.BooleanField(required=False)
+    grade = serializers.IntegerField(min_value=0, max_value=5, required=False)  # SM-2
 
 
 # ==================== STREAK & CHALLENGES ====================
@@ -204,6 +231,18 @@ class UserChallengeProgressSerializer(serializers.ModelSerializer):
         return min(int((obj.current_value / obj.challenge.target_value) * 100), 100)
 
 
+# ==================== REVIEW ====================
+
+class MistakeReviewItemSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = MistakeReviewItem
+        fields = (
+            'id', 'lesson_id', 'exercise_id', 'exercise_type', 'vocabulary_item_id',
+            'last_wrong_answer', 'correct_answer', 'mistakes', 'correct_streak',
+            'priority', 'last_mistake_at'
+        )
+
+
 # ==================== STATS ====================
 
 class ActivityLogSerializer(serializers.ModelSerializer):
@@ -0,0 +1,34 @@
+# api/signals.py
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from .models import Lesson, ConversationMode, ExerciseResult, MistakeReviewItem
+
+
+@receiver([post_save, post_delete], sender=Lesson)
+def lesson_changed(sender, **kwargs):
+    """El léxico del analizador gramatical sale de las lecciones"""
+    from .grammar import invalidate_checker
+    invalidate_checker()
+
+
+@receiver([post_save, post_delete], sender=ConversationMode)
+def conversation_mode_changed(sender, **kwargs):
+    """Los modos y sus modelos de Gemini están en caché (api/llm.py)"""
+    from .llm import invalidate_modes
+    invalidate_modes()
+
+
+@receiver([post_save, post_delete], sender=ExerciseResult)
+def exercise_result_changed(sender, instance, **kwargs):
+    """El análisis de puntos débiles está en caché por usuario (api/analytics.py)"""
+    from .analytics import invalidate_weakness_analysis
+    invalidate_weakness_analysis(instance.user_id)
+
+
+@receiver(post_save, sender=ExerciseResult)
+def exercise_result_created(sender, instance, created, **kwargs):
+    """Cada resultado nuevo actualiza la cola de repaso de errores"""
+    if created:
+        MistakeReviewItem.record(instance)
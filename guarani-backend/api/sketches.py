@@ -0,0 +1,27 @@
+# api/sketches.py
+
+"""
+Contadores acotados que se guardan en JSONFields.
+
+topk_add implementa Space-Saving: mantiene como mucho `capacity` claves y,
+cuando no hay lugar, reemplaza la de menor conteo heredando su valor. Los
+elementos frecuentes siempre quedan y el conteo nunca subestima.
+"""
+
+
+def topk_add(counts, items, capacity):
+    """Sumar items a un dict {item: conteo} de tamaño acotado"""
+    for item in items:
+        if item in counts:
+            counts[item] += 1
+        elif len(counts) < capacity:
+            counts[item] = 1
+        else:
+            victim = min(counts, key=counts.get)
+            counts[item] = counts.pop(victim) + 1
+    return counts
+
+
+def topk_most_common(counts, n):
+    """Los n items más frecuentes como lista de (item, conteo)"""
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:n]
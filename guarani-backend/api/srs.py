@@ -0,0 +1,54 @@
+# api/srs.py
+
+"""
+Repetición espaciada de flashcards (algoritmo SM-2).
+
+Cada tarjeta guarda repeticiones, intervalo en días, factor de facilidad
+y due_at. La calificación va de 0 a 5: menos de 3 es un olvido y la
+tarjeta vuelve a empezar; 3 o más alarga el intervalo (1 día, 6 días y
+después intervalo anterior × facilidad). La facilidad baja con las
+respuestas difíciles y nunca queda por debajo de MIN_EASE.
+"""
+
+from datetime import timedelta
+
+
+MIN_EASE = 1.3
+DEFAULT_EASE = 2.5
+PASSING_GRADE = 3
+
+# Calificación cuando el cliente sólo manda acierto / error
+GRADE_CORRECT = 4
+GRADE_INCORRECT = 1
+
+
+def grade_from(data):
+    """Calificación 0-5 a partir de "grade" o, si no viene, de "is_correct" """
+    grade = data.get('grade')
+    if grade is None:
+        return GRADE_CORRECT if data.get('is_correct') else GRADE_INCORRECT
+    grade = int(grade)
+    if not 0 <= grade <= 5:
+        raise ValueError('grade debe estar entre 0 y 5')
+    return grade
+
+
+def sm2(repetitions, interval_days, ease_factor, grade):
+    """Nuevo (repeticiones, intervalo en días, facilidad) tras una revisión"""
+    if grade < PASSING_GRADE:
+        repetitions, interval_days = 0, 1
+    else:
+        if repetitions == 0:
+            interval_days = 1
+        elif repetitions == 1:
+            interval_days = 6
+        else:
+            interval_days = round(interval_days * ease_factor)
+        repetitions += 1
+
+    ease_factor += 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02)
+    return repetitions, interval_days, round(max(ease_factor, MIN_EASE), 2)
+
+
+def next_due(reviewed_at, interval_days):
+    return reviewed_at + timedelta(days=interval_days)
@@ -0,0 +1,96 @@
+# api/tasks.py
+
+"""
+Tareas en segundo plano.
+
+No usamos un broker externo: las tareas corren en un pool de hilos del
+mismo proceso y se encolan recién cuando la transacción actual se confirma,
+así el worker siempre ve las filas que la request acaba de escribir.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+_executor = None
+
+
+def get_executor():
+    """Pool de hilos compartido (se crea en el primer uso)"""
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=getattr(settings, 'BACKGROUND_TASK_WORKERS', 2),
+            thread_name_prefix='guarani-tasks'
+        )
+    return _executor
+
+
+def _run_task(fn, *args, **kwargs):
+    close_old_connections()
+    try:
+        fn(*args, **kwargs)
+    except Exception as e:
+        print(f"Error en tarea {fn.__name__}: {e}")
+    finally:
+        close_old_connections()
+
+
+def submit(fn, *args, **kwargs):
+    """Encolar una tarea para después del commit actual"""
+    if getattr(settings, 'BACKGROUND_TASKS_EAGER', False):
+        transaction.on_commit(lambda: fn(*args, **kwargs))
+        return
+    transaction.on_commit(
+        lambda: get_executor().submit(_run_task, fn, *args, **kwargs)
+    )
+
+
+# ==================== CHATBOT ====================
+
+def analyze_message_grammar(message_id):
+    """Analizar la gramática de un mensaje ya respondido y adjuntar correcciones"""
+    from .grammar import analyze_grammar, save_corrections
+    from .llm import get_model
+    from .models import ChatMessage, UserConversationLevel
+
+    try:
+        chat_message = ChatMessage.objects.select_related('user', 'session').get(id=message_id)
+    except ChatMessage.DoesNotExist:
+        return
+
+    try:
+        model = get_model()
+        grammar_analysis = analyze_grammar(
+            chat_message.message, model, user_id=chat_message.user_id, fallback=False
+        )
+        corrections = grammar_analysis.get('corrections', [])
+    except Exception as e:
+        print(f"Error analyzing grammar: {e}")
+        ChatMessage.objects.filter(id=message_id).update(grammar_status='failed')
+        return
+
+    with transaction.atomic():
+        save_corrections(chat_message, corrections)
+        chat_message.grammar_corrections = corrections
+        chat_message.detected_language = grammar_analysis.get('language', 'es')
+        chat_message.grammar_status = 'done'
+        chat_message.save(update_fields=[
+            'grammar_corrections', 'detected_language', 'grammar_status'
+        ])
+
+        if chat_message.session_id:
+            chat_message.session.record_corrections(corrections)
+
+        level, _ = UserConversationLevel.objects.get_or_create(user=chat_message.user)
+        level.record_message(chat_message)
+
+
+def update_session_summary(session_id):
+    """Plegar los turnos viejos de una sesión en su resumen"""
+    from .chat_context import fold_session_summary
+    from .llm import get_model
+
+    fold_session_summary(session_id, get_model())
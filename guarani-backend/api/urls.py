@@ -9,8 +9,11 @@ from .views import (
     AchievementsView,
     add_xp,
     WeaknessAnalysisView,
+    MistakeReviewView,
     FlashcardViewSet,
     FlashcardReviewView,
+    FlashcardDueView,
+    FlashcardBatchReviewView,
     FlashcardBulkCreateView,
     FlashcardDecksView,
     StreakView,
@@ -26,6 +29,12 @@ from .views import (
     ChatSessionListView,
     EndChatSessionView,
     UserConversationStatsView,
+    ChatMessageCorrectionsView,
+    ChatTranscriptView,
+    ChatSearchView,
+    ChatSessionAnalysisView,
+    ExportView,
+    LeaderboardView,
 )
 
 router = DefaultRouter()
@@ -46,23 +55,35 @@ urlpatterns = [
     path('chatbot/modes/', ConversationModesView.as_view(), name='conversation-modes'),
     path('chatbot/sessions/', ChatSessionListView.as_view(), name='chat-sessions'),
     path('chatbot/sessions/<int:session_id>/', ChatSessionDetailView.as_view(), name='chat-session-detail'),
+    path('chatbot/sessions/<int:session_id>/messages/', ChatTranscriptView.as_view(), name='chat-session-transcript'),
+    path('chatbot/sessions/<int:session_id>/analysis/', ChatSessionAnalysisView.as_view(), name='chat-session-analysis'),
     path('chatbot/sessions/end/', EndChatSessionView.as_view(), name='end-chat-session'),
+    path('chatbot/search/', ChatSearchView.as_view(), name='chat-search'),
     path('chatbot/stats/', UserConversationStatsView.as_view(), name='conversation-stats'),
+    path('chatbot/messages/<int:message_id>/corrections/', ChatMessageCorrectionsView.as_view(), name='chat-message-corrections'),
     
     # Mascot
     path('mascot/', MascotView.as_view(), name='mascot'),
     path('mascot/add-xp/', add_xp, name='add_xp'),
     
+    # Leaderboard
+    path('leaderboard/', LeaderboardView.as_view(), name='leaderboard'),
+    
     # Achievements
     path('achievements/', AchievementsView.as_view(), name='achievements'),
     
     # Analytics
     path('analytics/weaknesses/', WeaknessAnalysisView.as_view(), name='weakness-analysis'),
     
+    # Repaso
+    path('review/mistakes/', MistakeReviewView.as_view(), name='mistake-review'),
+    
     # Flashcards
     path('flashcards/decks/', FlashcardDecksView.as_view(), name='flashcard-decks'),
     path('flashcards/bulk-create/', FlashcardBulkCreateView.as_view(), name='flashcard-bulk-create'),
     path('flashcards/review/', FlashcardReviewView.as_view(), name='flashcard-review'),
+    path('flashcards/review/batch/', FlashcardBatchReviewView.as_view(), name='flashcard-review-batch'),
+    path('flashcards/due/', FlashcardDueView.as_view(), name='flashcard-due'),
     
     # Streak & Challenges
     path('streak/', StreakView.as_view(), name='streak'),
@@ -77,6 +98,9 @@ urlpatterns = [
     path('study/start/', StartStudySessionView.as_view(), name='start-session'),
     path('study/end/', EndStudySessionView.as_view(), name='end-session'),
     
+    # Exportación
+    path('export/<str:kind>/', ExportView.as_view(), name='export'),
+    
     # Router
     path('', include(router.urls)),
 ]
\ No newline at end of file
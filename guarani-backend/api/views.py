@@ -1,18 +1,24 @@
-from rest_framework import viewsets, status
+from rest_framework import viewsets, generics, status
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, IsAdminUser
 from rest_framework.decorators import api_view, permission_classes
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.cache import patch_cache_control
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
 import google.generativeai as genai
 
 from .models import (
     Lesson, UserProgress, Translation, ChatHistory, Mascot, 
-    Achievement, ExerciseResult, Flashcard,
+    Achievement, ExerciseResult, Flashcard, MistakeReviewItem,
     UserStreak, DailyChallenge, UserChallengeProgress,
-    ActivityLog, StudySession,
+    ActivityLog, StudySession, XPEvent, LeaderboardEntry,
     ConversationMode, ChatSession, ChatMessage, GrammarCorrection,
     ConversationChallenge, UserConversationLevel
 )
@@ -33,11 +39,23 @@ from .serializers import (
     StudySessionSerializer,
     ConversationModeSerializer,
     ChatSessionSerializer,
+    ChatSessionSummarySerializer,
     ChatMessageSerializer,
     GrammarCorrectionSerializer,
     ConversationChallengeSerializer,
     UserConversationLevelSerializer,
+    MistakeReviewItemSerializer,
 )
+from .chat import get_or_start_session, get_session_history, record_turn
+from .llm import get_chat_model, get_mode, get_model
+from .ledger import record, track
+from .response_cache import opener_key, get_reply, add_reply
+from .search import search_messages, snippet
+from .export import EXPORTS, async_blocks, export_rows, stream_export
+from .achievements import check_achievements
+from .analytics import get_weakness_analysis
+from .exercises import lesson_exercises, result_fields
+from .srs import grade_from
 
 # Configurar Gemini (SOLO SI HAY API KEY)
 if hasattr(settings, 'GOOGLE_API_KEY') and settings.GOOGLE_API_KEY:
@@ -95,30 +113,50 @@ class ProgressView(APIView):
         
         # Guardar resultados individuales de ejercicios
         if exercise_results:
+            lesson = Lesson.objects.filter(pk=lesson_id).only('exercises', 'vocabulary').first()
+            exercises = lesson_exercises(lesson) if lesson else {}
+            vocabulary = lesson.vocabulary if lesson else []
             for result_data in exercise_results:
+                exercise_id = result_data.get('exercise_id')
+                exercise_type = result_data.get('exercise_type')
+                user_answer = result_data.get('user_answer', '')
+                correct_answer = result_data.get('correct_answer', '')
+                latency = result_data.get('answer_latency_ms')
                 ExerciseResult.objects.create(
                     user=request.user,
                     lesson_id=lesson_id,
-                    exercise_id=result_data.get('exercise_id'),
-                    exercise_type=result_data.get('exercise_type'),
+                    exercise_id=exercise_id,
+                    exercise_type=exercise_type,
                     is_correct=result_data.get('is_correct'),
-                    user_answer=result_data.get('user_answer', ''),
-                    correct_answer=result_data.get('correct_answer', ''),
+                    user_answer=user_answer,
+                    correct_answer=correct_answer,
+                    answer_latency_ms=(
+                        max(int(latency), 0)
+                        if isinstance(latency, (int, float)) and not isinstance(latency, bool) else None
+                    ),
+                    **result_fields(
+                        lesson_id, vocabulary, exercises.get(str(exercise_id)),
+                        exercise_type, user_answer, correct_answer
+                    )
                 )
         
         # DAR XP AL COMPLETAR LECCIÓN
         if completed:
-            mascot, _ = Mascot.objects.get_or_create(user=request.user)
             xp_earned = 50
             if score >= 90:
                 xp_earned = 75
-            mascot.add_xp(xp_earned)
-            mascot.state = 'celebrating'
-            mascot.save()
+            XPEvent.award(request.user, xp_earned, 'lesson', lesson_id)
+            now = timezone.now()
+            Mascot.objects.filter(user=request.user).update(
+                state='celebrating',
+                state_changed_at=now,
+                last_interaction=now
+            )
             
             # Actualizar racha
             streak, _ = UserStreak.objects.get_or_create(user=request.user)
-            streak.update_streak()
+            if streak.update_streak():
+                check_achievements(request.user, 'streak', streak.current_streak)
             
             # Registrar actividad
             ActivityLog.log_activity(
@@ -128,8 +166,8 @@ class ProgressView(APIView):
                 xp=xp_earned
             )
             
-            # Verificar logros
-            check_and_unlock_achievements(request.user)
+            # Verificar logros de lecciones
+            check_achievements(request.user, 'lessons')
         
         serializer = UserProgressSerializer(progress)
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -147,7 +185,7 @@ class TranslateView(APIView):
             return Response({'error': 'Texto vacío'}, status=status.HTTP_400_BAD_REQUEST)
 
         try:
-            model = genai.GenerativeModel('gemini-2.5-flash')
+            model = get_model()
             prompt = f"""Translate the following Spanish word or phrase to Guaraní. 
 Provide ONLY the Guaraní translation.
 
@@ -155,7 +193,8 @@ Spanish phrase: "{text}"
 
 Guaraní translation:"""
             
-            response = model.generate_content(prompt)
+            with track('translate', model, user_id=request.user.id) as call:
+                response = call.response = model.generate_content(prompt)
             guarani_text = response.text.strip()
             
             # Guardar en base de datos
@@ -199,6 +238,12 @@ class ChatbotView(APIView):
         mode_id = request.data.get('mode_id')
         session_id = request.data.get('session_id')
         difficulty_level = request.data.get('difficulty_level', 'beginner')
+        defer_grammar = request.data.get('defer_grammar')
+        if defer_grammar is None:
+            defer_grammar = getattr(settings, 'CHATBOT_DEFER_GRAMMAR', False)
+        else:
+            # En un formulario llega como texto ("false" no es verdadero)
+            defer_grammar = str(defer_grammar).lower() in ('1', 'true')
         
         if not message.strip():
             return Response(
@@ -207,97 +252,50 @@ class ChatbotView(APIView):
             )
 
         try:
-            # Obtener o crear sesión
-            if session_id:
-                try:
-                    session = ChatSession.objects.get(
-                        id=session_id,
-                        user=request.user,
-                        ended_at__isnull=True
-                    )
-                except ChatSession.DoesNotExist:
-                    session = self._create_new_session(
-                        request.user,
-                        mode_id,
-                        difficulty_level
-                    )
-            else:
-                session = self._create_new_session(
-                    request.user,
-                    mode_id,
-                    difficulty_level
-                )
+            # Modo de conversación (registro en caché, sin consulta)
+            mode = get_mode(mode_id)
             
-            # Obtener modo de conversación
-            mode = None
-            if mode_id:
-                try:
-                    mode = ConversationMode.objects.get(id=mode_id)
-                except ConversationMode.DoesNotExist:
-                    pass
-            
-            # Construir system instruction basado en modo y nivel
-            system_instruction = self._build_system_instruction(
+            # Obtener o crear sesión
+            session = get_or_start_session(
+                request.user,
+                session_id,
                 mode,
                 difficulty_level
             )
             
-            # Generar respuesta con Gemini
-            model = genai.GenerativeModel(
-                'gemini-2.5-flash',
-                system_instruction=system_instruction
-            )
+            # Modelo ya construido para este modo y nivel
+            model = get_chat_model(mode, difficulty_level)
             
             # Incluir historial de la sesión para contexto
-            chat_history = self._get_session_history(session)
-            chat = model.start_chat(history=chat_history)
-            
-            response = chat.send_message(message)
-            bot_response = response.text.strip()
+            chat_history = get_session_history(session)
             
-            # Analizar mensaje del usuario (detección de errores)
-            grammar_analysis = self._analyze_grammar(message, model)
+            # Primeros turnos de modos guionados: respuesta cacheada
+            cache_key = opener_key(mode, difficulty_level, message, chat_history)
+            bot_response = get_reply(cache_key)
+            if bot_response is None:
+                chat = model.start_chat(history=chat_history)
+                with track('chat', model, user_id=request.user.id, mode=mode) as call:
+                    response = call.response = chat.send_message(message)
+                bot_response = response.text.strip()
+                add_reply(cache_key, bot_response)
+            else:
+                record('chat', model, user_id=request.user.id, mode=mode, cache_hit=True)
             
-            # Guardar mensaje
-            chat_message = ChatMessage.objects.create(
-                session=session,
-                user=request.user,
-                message=message,
-                response=bot_response,
-                word_count=len(message.split()),
-                grammar_corrections=grammar_analysis.get('corrections', [])
+            # Guardar mensaje, correcciones y estadísticas
+            chat_message, corrections = record_turn(
+                request.user,
+                session,
+                message,
+                bot_response,
+                model,
+                defer_grammar=defer_grammar
             )
             
-            # Guardar correcciones detalladas
-            for correction in grammar_analysis.get('corrections', []):
-                GrammarCorrection.objects.create(
-                    message=chat_message,
-                    original_text=correction.get('original', ''),
-                    corrected_text=correction.get('corrected', ''),
-                    error_type=correction.get('type', 'general'),
-                    explanation=correction.get('explanation', ''),
-                    severity=correction.get('severity', 'medium')
-                )
-            
-            # Actualizar estadísticas de sesión
-            session.message_count += 1
-            session.save()
-            
-            # Actualizar nivel de conversación del usuario
-            self._update_user_level(request.user, chat_message)
-            
-            # Actualizar desafío de chatbot
-            try:
-                from .views import apiUpdateChallengeProgress
-                # Esto se manejará desde el frontend
-            except:
-                pass
-            
             serializer = ChatMessageSerializer(chat_message)
             return Response({
                 **serializer.data,
                 'session_id': session.id,
-                'has_corrections': len(grammar_analysis.get('corrections', [])) > 0
+                'has_corrections': len(corrections) > 0
             }, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -307,136 +305,32 @@ class ChatbotView(APIView):
                 {'error': str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+
+
+class ChatMessageCorrectionsView(APIView):
+    """Consultar correcciones de un mensaje (análisis diferido)"""
+    permission_classes = [IsAuthenticated]
     
-    def _create_new_session(self, user, mode_id, difficulty_level):
-        """Crear nueva sesión de chat"""
-        mode = None
-        if mode_id:
-            try:
-                mode = ConversationMode.objects.get(id=mode_id)
-            except ConversationMode.DoesNotExist:
-                pass
-        
-        return ChatSession.objects.create(
-            user=user,
-            mode=mode,
-            difficulty_level=difficulty_level
-        )
-    
-    def _build_system_instruction(self, mode, difficulty_level):
-        """Construir instrucciones del sistema según modo y nivel"""
-        base_instruction = """Eres Arami, una tutora amigable y alentadora de idioma Guaraní. 
-Tu objetivo es ayudar al usuario a practicar Guaraní de manera conversacional."""
-        
-        # Ajustar según nivel
-        level_instructions = {
-            'beginner': """
-- Usa frases simples y cortas
-- Proporciona traducciones frecuentes
-- Sé muy alentador con cada intento
-- Introduce vocabulario básico gradualmente
-""",
-            'intermediate': """
-- Usa frases de complejidad media
-- Proporciona traducciones solo cuando sea necesario
-- Introduce modismos y expresiones comunes
-- Correcciones suaves pero claras
-""",
-            'advanced': """
-- Usa lenguaje natural y complejo
-- Pocas traducciones, enfócate en Guaraní
-- Introduce cultura y contexto profundo
-- Correcciones directas pero constructivas
-"""
-        }
-        
-        instruction = base_instruction + level_instructions.get(
-            difficulty_level,
-            level_instructions['beginner']
-        )
-        
-        # Agregar contexto del modo
-        if mode:
-            instruction += f"\n\nMODO ACTUAL: {mode.get_name_display()}\n{mode.system_prompt}"
-        
-        return instruction
-    
-    def _get_session_history(self, session):
-        """Obtener historial de mensajes de la sesión para contexto"""
-        messages = session.messages.order_by('created_at')[:10]
-        history = []
-        
-        for msg in messages:
-            history.append({
-                'role': 'user',
-                'parts': [msg.message]
-            })
-            history.append({
-                'role': 'model',
-                'parts': [msg.response]
-            })
-        
-        return history
-    
-    def _analyze_grammar(self, message, model):
-        """Analizar gramática y detectar errores"""
-        # Detectar si el mensaje contiene Guaraní
-        has_guarani = any(char in message for char in ['ã', 'ẽ', 'ĩ', 'ỹ', 'õ', 'ũ'])
-        
-        if not has_guarani:
-            return {'corrections': []}
-        
+    def get(self, request, message_id):
         try:
-            analysis_prompt = f"""Analiza el siguiente texto en Guaraní y detecta errores gramaticales.
-Proporciona la respuesta en formato JSON:
-
-Texto: "{message}"
-
-Formato de respuesta:
-{{
-  "corrections": [
-    {{
-      "original": "texto con error",
-      "corrected": "texto corregido",
-      "type": "verb|article|preposition|spelling|other",
-      "explanation": "explicación del error",
-      "severity": "low|medium|high"
-    }}
-  ]
-}}
-
-Si no hay errores, devuelve: {{"corrections": []}}
-"""
-            
-            response = model.generate_content(analysis_prompt)
-            import json
-            
-            # Extraer JSON de la respuesta
-            response_text = response.text.strip()
-            if '```json' in response_text:
-                response_text = response_text.split('```json')[1].split('```')[0]
-            elif '```' in response_text:
-                response_text = response_text.split('```')[1].split('```')[0]
-            
-            return json.loads(response_text)
-        except Exception as e:
-            print(f"Error analyzing grammar: {e}")
-            return {'corrections': []}
-    
-    def _update_user_level(self, user, message):
-        """Actualizar nivel de conversación del usuario"""
-        level, created = UserConversationLevel.objects.get_or_create(user=user)
-        
-        level.total_messages += 1
-        
-        # Incrementar score si no tiene errores
-        if len(message.grammar_corrections) == 0:
-            level.grammar_score = min(100, level.grammar_score + 0.5)
-        
-        # Incrementar vocabulario
-        level.vocabulary_size += max(0, message.word_count - 2)
+            chat_message = ChatMessage.objects.get(
+                id=message_id,
+                user=request.user
+            )
+        except ChatMessage.DoesNotExist:
+            return Response(
+                {'error': 'Mensaje no encontrado'},
+                status=status.HTTP_404_NOT_FOUND
+            )
         
-        level.save()
+        corrections = chat_message.corrections.all()
+        return Response({
+            'message_id': chat_message.id,
+            'grammar_status': chat_message.grammar_status,
+            'grammar_corrections': chat_message.grammar_corrections,
+            'corrections': GrammarCorrectionSerializer(corrections, many=True).data,
+            'has_corrections': len(chat_message.grammar_corrections) > 0
+        })
 
 
 class ChatSessionDetailView(APIView):
@@ -445,7 +339,9 @@ class ChatSessionDetailView(APIView):
     
     def get(self, request, session_id):
         try:
-            session = ChatSession.objects.get(
+            session = ChatSession.objects.select_related('mode').prefetch_related(
+                'messages__corrections'
+            ).get(
                 id=session_id,
                 user=request.user
             )
@@ -458,13 +354,121 @@ class ChatSessionDetailView(APIView):
             )
 
 
+class ChatTranscriptPagination(CursorPagination):
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = 'id'
+
+
+class ChatTranscriptView(generics.ListAPIView):
+    """Mensajes de una sesión paginados por cursor (correcciones precargadas)"""
+    permission_classes = [IsAuthenticated]
+    serializer_class = ChatMessageSerializer
+    pagination_class = ChatTranscriptPagination
+    
+    def get_queryset(self):
+        if not ChatSession.objects.filter(
+            id=self.kwargs['session_id'],
+            user=self.request.user
+        ).exists():
+            raise NotFound('Sesión no encontrada')
+        
+        return ChatMessage.objects.filter(
+            session_id=self.kwargs['session_id']
+        ).prefetch_related('corrections')
+
+
+class ChatSearchView(APIView):
+    """Buscar en el historial de chat del usuario (índice invertido)"""
+    permission_classes = [IsAuthenticated]
+    
+    PAGE_SIZE = 20
+    
+    def get(self, request):
+        query = request.query_params.get('q', '')
+        before = request.query_params.get('before')
+        try:
+            before = int(before) if before else None
+        except ValueError:
+            return Response({'error': 'before inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        messages, terms = search_messages(request.user, query, self.PAGE_SIZE, before)
+        
+        results = []
+        for message in messages:
+            message_snippet, message_highlights = snippet(message.message, terms)
+            response_snippet, response_highlights = snippet(message.response, terms)
+            session = message.session
+            results.append({
+                'message_id': message.id,
+                'session_id': message.session_id,
+                'mode_name': session.mode.get_name_display() if session and session.mode else None,
+                'created_at': message.created_at,
+                'message': message_snippet,
+                'message_highlights': message_highlights,
+                'response': response_snippet,
+                'response_highlights': response_highlights,
+            })
+        
+        return Response({
+            'results': results,
+            'next_before': messages[-1].id if len(messages) == self.PAGE_SIZE else None
+        })
+
+
 class ChatSessionListView(APIView):
-    """Listar todas las sesiones del usuario"""
+    """Listar las sesiones del usuario (resumen, sin mensajes)"""
     permission_classes = [IsAuthenticated]
     
+    PREVIEW_LENGTH = 100
+    
     def get(self, request):
-        sessions = ChatSession.objects.filter(user=request.user)[:20]
-        serializer = ChatSessionSerializer(sessions, many=True)
+        from django.db.models import OuterRef, Subquery, Count, IntegerField
+        from django.db.models.functions import Coalesce, Substr
+        
+        sessions = ChatSession.objects.filter(user=request.user).select_related('mode')
+        
+        # Filtros opcionales
+        mode = request.query_params.get('mode')
+        date_from = request.query_params.get('date_from')
+        date_to = request.query_params.get('date_to')
+        try:
+            if (date_from and not parse_date(date_from)) or (date_to and not parse_date(date_to)):
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'Fechas inválidas (YYYY-MM-DD)'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        if mode:
+            if mode.isdigit():
+                sessions = sessions.filter(mode_id=mode)
+            else:
+                sessions = sessions.filter(mode__name=mode.upper())
+        if date_from:
+            sessions = sessions.filter(started_at__date__gte=date_from)
+        if date_to:
+            sessions = sessions.filter(started_at__date__lte=date_to)
+        
+        # Vista previa y conteos calculados en SQL
+        session_messages = ChatMessage.objects.filter(session=OuterRef('pk'))
+        preview = Substr('message', 1, self.PREVIEW_LENGTH)
+        corrections = GrammarCorrection.objects.filter(
+            message__session=OuterRef('pk')
+        ).values('message__session').annotate(total=Count('id')).values('total')
+        
+        sessions = sessions.annotate(
+            first_message=Subquery(
+                session_messages.order_by('id').annotate(preview=preview).values('preview')[:1]
+            ),
+            last_message=Subquery(
+                session_messages.order_by('-id').annotate(preview=preview).values('preview')[:1]
+            ),
+            correction_count=Coalesce(
+                Subquery(corrections, output_field=IntegerField()), 0
+            ),
+        )[:20]
+        
+        serializer = ChatSessionSummarySerializer(sessions, many=True)
         return Response(serializer.data)
 
 
@@ -476,26 +480,19 @@ class EndChatSessionView(APIView):
         session_id = request.data.get('session_id')
         
         try:
-            session = ChatSession.objects.get(
+            session = ChatSession.objects.select_related('mode').get(
                 id=session_id,
                 user=request.user,
                 ended_at__isnull=True
             )
             
+            # Las estadísticas ya están al día (se actualizan con cada mensaje)
             session.end_session()
             
-            # Calcular estadísticas finales
-            messages = session.messages.all()
-            session.words_used = sum(msg.word_count for msg in messages)
-            session.grammar_errors = sum(
-                len(msg.grammar_corrections) for msg in messages
-            )
-            session.save()
-            
             # Generar análisis
-            analysis = self._generate_session_analysis(session)
+            analysis = generate_session_analysis(session)
             
-            serializer = ChatSessionSerializer(session)
+            serializer = ChatSessionSummarySerializer(session)
             return Response({
                 'session': serializer.data,
                 'analysis': analysis
@@ -505,55 +502,25 @@ class EndChatSessionView(APIView):
                 {'error': 'Sesión no encontrada'},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+
+class ChatSessionAnalysisView(APIView):
+    """Análisis de una sesión en curso (o terminada) sin finalizarla"""
+    permission_classes = [IsAuthenticated]
     
-    def _generate_session_analysis(self, session):
-        """Generar análisis de la sesión"""
-        messages = session.messages.all()
-        
-        # Palabras más usadas
-        all_words = []
-        for msg in messages:
-            all_words.extend(msg.message.lower().split())
-        
-        from collections import Counter
-        word_freq = Counter(all_words).most_common(10)
-        
-        # Tipos de errores
-        error_types = Counter()
-        for msg in messages:
-            for correction in msg.corrections.all():
-                error_types[correction.error_type] += 1
-        
-        return {
-            'duration_minutes': round(session.duration_seconds / 60, 1),
-            'messages_sent': session.message_count,
-            'words_used': session.words_used,
-            'grammar_errors': session.grammar_errors,
-            'accuracy_rate': round(
-                ((session.message_count - session.grammar_errors) / session.message_count * 100)
-                if session.message_count > 0 else 0,
-                1
-            ),
-            'most_common_words': [word for word, _ in word_freq],
-            'error_breakdown': dict(error_types),
-            'performance': self._calculate_performance(session)
-        }
-    
-    def _calculate_performance(self, session):
-        """Calcular performance general"""
-        if session.message_count == 0:
-            return 'beginner'
-        
-        accuracy = (session.message_count - session.grammar_errors) / session.message_count
-        
-        if accuracy >= 0.9 and session.message_count >= 10:
-            return 'excellent'
-        elif accuracy >= 0.75:
-            return 'good'
-        elif accuracy >= 0.5:
-            return 'fair'
-        else:
-            return 'needs_improvement'
+    def get(self, request, session_id):
+        try:
+            session = ChatSession.objects.get(
+                id=session_id,
+                user=request.user
+            )
+        except ChatSession.DoesNotExist:
+            return Response(
+                {'error': 'Sesión no encontrada'},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        return Response(generate_session_analysis(session))
 
 
 class UserConversationStatsView(APIView):
@@ -561,19 +528,15 @@ class UserConversationStatsView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        level, created = UserConversationLevel.objects.get_or_create(
-            user=request.user
-        )
-        
-        # Actualizar estadísticas generales
-        sessions = ChatSession.objects.filter(user=request.user)
-        level.total_sessions = sessions.count()
-        level.total_messages = sum(s.message_count for s in sessions)
-        level.total_time_minutes = sum(s.duration_seconds for s in sessions) // 60
-        level.save()
+        # Solo lectura: los totales se mantienen al escribir cada sesión/mensaje
+        level = UserConversationLevel.objects.filter(user=request.user).first()
+        if level is None:
+            level = UserConversationLevel(user=request.user)
         
         serializer = UserConversationLevelSerializer(level)
-        return Response(serializer.data)
+        response = Response(serializer.data)
+        patch_cache_control(response, private=True, max_age=60)
+        return response
 
 
 # ==================== MASCOT ====================
@@ -582,20 +545,14 @@ class MascotView(APIView):
     permission_classes = [IsAuthenticated]
 
     def get(self, request):
-        """Obtener o crear la mascota del usuario"""
+        """Obtener o crear la mascota del usuario (sin escribir si ya existe)"""
         mascot, created = Mascot.objects.get_or_create(user=request.user)
         
-        # Actualizar estado según última interacción
-        from datetime import timedelta
-        if timezone.now() - mascot.last_interaction > timedelta(days=2):
-            mascot.state = 'sleeping'
-            mascot.save()
-        elif mascot.state == 'sleeping':
-            mascot.state = 'happy'
-            mascot.save()
-        
+        # El estado (dormido, feliz...) se deriva al serializar
         serializer = MascotSerializer(mascot)
-        return Response(serializer.data)
+        response = Response(serializer.data)
+        patch_cache_control(response, private=True, max_age=30)
+        return response
     
     def patch(self, request):
         """Actualizar mascota (nombre, estado)"""
@@ -604,10 +561,12 @@ class MascotView(APIView):
         name = request.data.get('name')
         state = request.data.get('state')
         
+        mascot.last_interaction = timezone.now()
         if name:
             mascot.name = name
         if state:
             mascot.state = state
+            mascot.state_changed_at = mascot.last_interaction
         
         mascot.save()
         serializer = MascotSerializer(mascot)
@@ -634,11 +593,9 @@ def add_xp(request):
         return Response({'error': 'Amount debe ser positivo'}, status=status.HTTP_400_BAD_REQUEST)
     
     mascot, created = Mascot.objects.get_or_create(user=request.user)
+    # Los logros de XP se revisan al registrar el evento
     leveled_up = mascot.add_xp(amount)
     
-    # Verificar logros
-    check_and_unlock_achievements(request.user)
-    
     return Response({
         'mascot': MascotSerializer(mascot).data,
         'leveled_up': leveled_up,
@@ -646,6 +603,84 @@ def add_xp(request):
     })
 
 
+# ==================== LEADERBOARD ====================
+
+class LeaderboardView(APIView):
+    """Tabla de posiciones por XP: top N y la posición del usuario con sus vecinos.
+    
+    Parámetros: period=weekly|monthly|all, group=<id de grupo>, limit.
+    
+    La posición son dos COUNT por rango sobre el índice (period,
+    period_start, -xp, user): los de más XP y los empatados con menor id. Un
+    OR en un solo filtro haría que la base recorriera todo el período. Cada
+    COUNT lee O(posición) entradas del índice, sin tocar la tabla; con group
+    cada entrada además se cruza con el índice único (user, group) de
+    users_groups. Los vecinos son tramos del mismo orden. Para tablas de
+    cientos de miles de usuarios habría que guardar la posición en
+    rebuild_leaderboards.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    NEIGHBORS = 2
+    
+    def get(self, request):
+        period = request.query_params.get('period', 'weekly')
+        starts = LeaderboardEntry.period_starts()
+        if period not in starts:
+            return Response({'error': 'period debe ser weekly, monthly o all'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 10)), 100))
+        except ValueError:
+            return Response({'error': 'limit inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        entries = LeaderboardEntry.objects.filter(period=period, period_start=starts[period])
+        
+        group_id = request.query_params.get('group')
+        if group_id:
+            if not group_id.isdigit() or not request.user.groups.filter(id=group_id).exists():
+                raise NotFound('Grupo no encontrado')
+            entries = entries.filter(user__groups=group_id)
+        
+        ordered = entries.select_related('user').order_by('-xp', 'user_id')
+        top = list(ordered[:limit])
+        
+        me = entries.filter(user=request.user).first()
+        neighbors = []
+        rank = None
+        if me:
+            rank = (
+                entries.filter(xp__gt=me.xp).count()
+                + entries.filter(xp=me.xp, user_id__lt=me.user_id).count()
+                + 1
+            )
+            above = list(ordered[max(0, rank - 1 - self.NEIGHBORS):rank - 1])
+            below = list(ordered[rank:rank + self.NEIGHBORS])
+            me.user = request.user
+            neighbors = [
+                (rank - len(above) + i, entry) for i, entry in enumerate(above)
+            ] + [(rank, me)] + [
+                (rank + 1 + i, entry) for i, entry in enumerate(below)
+            ]
+        
+        def row(position, entry):
+            return {
+                'rank': position,
+                'user_id': entry.user_id,
+                'username': entry.user.username,
+                'xp': entry.xp,
+            }
+        
+        response = Response({
+            'period': period,
+            'period_start': starts[period],
+            'top': [row(i + 1, entry) for i, entry in enumerate(top)],
+            'me': row(rank, me) if me else None,
+            'neighbors': [row(position, entry) for position, entry in neighbors],
+        })
+        patch_cache_control(response, private=True, max_age=30)
+        return response
+
+
 # ==================== ANALYTICS ====================
 
 class WeaknessAnalysisView(APIView):
@@ -653,96 +688,25 @@ class WeaknessAnalysisView(APIView):
     permission_classes = [IsAuthenticated]
     
     def get(self, request):
-        from django.db.models import Count, Q, Avg
-        
-        user = request.user
-        
-        # Calcular estadísticas por tipo de ejercicio
-        stats = []
-        exercise_types = [
-            ('MULTIPLE_CHOICE', 'Opción Múltiple', '✅'),
-            ('TRANSLATION', 'Traducción', '🔄'),
-            ('FILL_IN_THE_BLANK', 'Completar Espacios', '✍️'),
-        ]
-        
-        for ex_type, display_name, icon in exercise_types:
-            results = ExerciseResult.objects.filter(
-                user=user,
-                exercise_type=ex_type
-            )
-            
-            total = results.count()
-            if total == 0:
-                continue
-            
-            correct = results.filter(is_correct=True).count()
-            accuracy = int((correct / total) * 100) if total > 0 else 0
-            
-            stats.append({
-                'type': ex_type,
-                'display_name': display_name,
-                'icon': icon,
-                'total_attempts': total,
-                'correct_answers': correct,
-                'accuracy': accuracy,
-                'recent_attempts': list(results[:5].values(
-                    'exercise_id', 'is_correct', 'created_at'
-                ))
-            })
-        
-        # Ordenar por peor rendimiento primero
-        stats.sort(key=lambda x: x['accuracy'])
-        
-        # Análisis de traducción
-        translation_results = ExerciseResult.objects.filter(
-            user=user,
-            exercise_type='TRANSLATION'
-        )
-        
-        es_to_gn = translation_results.filter(
-            Q(correct_answer__icontains='ã') | 
-            Q(correct_answer__icontains='ẽ') |
-            Q(correct_answer__icontains='ĩ') |
-            Q(correct_answer__icontains="'")
-        )
-        gn_to_es = translation_results.exclude(
-            Q(correct_answer__icontains='ã') | 
-            Q(correct_answer__icontains='ẽ') |
-            Q(correct_answer__icontains='ĩ') |
-            Q(correct_answer__icontains="'")
-        )
-        
-        translation_breakdown = []
-        
-        if es_to_gn.exists():
-            total_es_gn = es_to_gn.count()
-            correct_es_gn = es_to_gn.filter(is_correct=True).count()
-            translation_breakdown.append({
-                'type': 'ES_TO_GN',
-                'display_name': 'Español → Guaraní',
-                'icon': '🇪🇸→🇵🇾',
-                'total_attempts': total_es_gn,
-                'correct_answers': correct_es_gn,
-                'accuracy': int((correct_es_gn / total_es_gn) * 100)
-            })
-        
-        if gn_to_es.exists():
-            total_gn_es = gn_to_es.count()
-            correct_gn_es = gn_to_es.filter(is_correct=True).count()
-            translation_breakdown.append({
-                'type': 'GN_TO_ES',
-                'display_name': 'Guaraní → Español',
-                'icon': '🇵🇾→🇪🇸',
-                'total_attempts': total_gn_es,
-                'correct_answers': correct_gn_es,
-                'accuracy': int((correct_gn_es / total_gn_es) * 100)
-            })
+        return Response(get_weakness_analysis(request.user))
+
+
+# ==================== REVIEW ====================
+
+class MistakeReviewView(APIView):
+    """Cola de repaso de errores, de mayor a menor prioridad (parámetro limit)"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 100))
+        except ValueError:
+            return Response({'error': 'limit inválido'}, status=status.HTTP_400_BAD_REQUEST)
         
-        return Response({
-            'overall_stats': stats,
-            'translation_breakdown': translation_breakdown,
-            'total_exercises_completed': ExerciseResult.objects.filter(user=user).count(),
-        })
+        items = MistakeReviewItem.objects.filter(user=request.user).order_by(
+            '-priority', '-last_mistake_at'
+        )[:limit]
+        return Response(MistakeReviewItemSerializer(items, many=True).data)
 
 
 # ==================== FLASHCARDS ====================
@@ -770,26 +734,27 @@ class FlashcardViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
         """Asignar usuario automáticamente"""
         serializer.save(user=self.request.user)
+        check_achievements(self.request.user, 'flashcards')
 
 
 class FlashcardReviewView(APIView):
-    """Registrar revisión de una flashcard"""
+    """Registrar revisión de una flashcard (grade 0-5 o is_correct)"""
     permission_classes = [IsAuthenticated]
     
     def post(self, request):
         flashcard_id = request.data.get('flashcard_id')
-        is_correct = request.data.get('is_correct')
+        try:
+            grade = grade_from(request.data)
+        except (TypeError, ValueError):
+            return Response({'error': 'grade debe estar entre 0 y 5'}, status=status.HTTP_400_BAD_REQUEST)
         
         try:
             flashcard = Flashcard.objects.get(id=flashcard_id, user=request.user)
         except Flashcard.DoesNotExist:
             return Response({'error': 'Flashcard no encontrada'}, status=status.HTTP_404_NOT_FOUND)
         
-        # Actualizar estadísticas
-        flashcard.times_reviewed += 1
-        if is_correct:
-            flashcard.times_correct += 1
-        flashcard.last_reviewed = timezone.now()
+        # Actualizar estadísticas y reprogramar
+        flashcard.review(grade)
         flashcard.save()
         
         # Registrar actividad
@@ -802,44 +767,190 @@ class FlashcardReviewView(APIView):
         return Response(FlashcardSerializer(flashcard).data)
 
 
+class FlashcardBatchReviewView(APIView):
+    """Registrar una sesión de repaso completa en una sola transacción.
+    
+    Recibe {"reviews": [{"flashcard_id", "grade" o "is_correct", "reviewed_at"}]};
+    las revisiones de una misma tarjeta se aplican en orden de reviewed_at.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    MAX_REVIEWS = 500
+    
+    def post(self, request):
+        from django.utils.dateparse import parse_datetime
+        
+        reviews = request.data.get('reviews')
+        if not isinstance(reviews, list) or not reviews:
+            return Response({'error': 'No se enviaron revisiones'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(reviews) > self.MAX_REVIEWS:
+            return Response(
+                {'error': f'Máximo {self.MAX_REVIEWS} revisiones por envío'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        now = timezone.now()
+        parsed = []
+        for index, review in enumerate(reviews):
+            try:
+                flashcard_id = int(review['flashcard_id'])
+                grade = grade_from(review)
+                reviewed_at = parse_datetime(review['reviewed_at']) if review.get('reviewed_at') else now
+                if reviewed_at is None:
+                    raise ValueError
+            except (KeyError, TypeError, ValueError):
+                return Response(
+                    {'error': f'Revisión inválida en la posición {index}'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if timezone.is_naive(reviewed_at):
+                reviewed_at = timezone.make_aware(reviewed_at)
+            parsed.append((min(reviewed_at, now), index, flashcard_id, grade))
+        
+        with transaction.atomic():
+            cards = Flashcard.objects.select_for_update().filter(user=request.user).in_bulk(
+                {flashcard_id for _, _, flashcard_id, _ in parsed}
+            )
+            
+            applied = 0
+            for reviewed_at, _, flashcard_id, grade in sorted(parsed):
+                card = cards.get(flashcard_id)
+                if card:
+                    card.review(grade, reviewed_at)
+                    card.updated_at = now
+                    applied += 1
+            
+            Flashcard.objects.bulk_update(cards.values(), [
+                'repetitions', 'interval_days', 'ease_factor', 'due_at',
+                'times_reviewed', 'times_correct', 'last_reviewed', 'updated_at'
+            ])
+            
+            # Actividad y racha una sola vez por envío
+            if applied:
+                ActivityLog.log_activity(user=request.user, activity_type='flashcard', value=applied)
+        
+        return Response({
+            'reviewed': applied,
+            'not_found': sorted({flashcard_id for _, _, flashcard_id, _ in parsed} - set(cards)),
+            'flashcards': FlashcardSerializer(cards.values(), many=True).data,
+        })
+
+
+class FlashcardDueView(APIView):
+    """Próximas tarjetas para repasar (vencidas primero), parámetros limit y deck"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            limit = max(1, min(int(request.query_params.get('limit', 20)), 200))
+        except ValueError:
+            return Response({'error': 'limit inválido'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Rango sobre el índice (user, due_at)
+        cards = Flashcard.objects.filter(user=request.user, due_at__lte=timezone.now())
+        deck = request.query_params.get('deck')
+        if deck:
+            cards = cards.filter(deck_name=deck)
+        cards = cards.order_by('due_at')[:limit]
+        return Response(FlashcardSerializer(cards, many=True).data)
+
+
 class FlashcardBulkCreateView(APIView):
-    """Crear múltiples flashcards de una vez"""
+    """Crear múltiples flashcards de una vez (importaciones de miles de tarjetas).
+    
+    Por cada tramo de CHUNK_SIZE se buscan los pares (español, guaraní) que
+    ya existen con una consulta y se insertan los nuevos con bulk_create
+    (en un savepoint: si otra importación crea un par antes, el tramo se
+    vuelve a leer y se reintenta hasta MAX_RETRIES veces; después se
+    deshace todo y se responde 409). Devuelve un resumen en vez de las
+    tarjetas creadas.
+    """
     permission_classes = [IsAuthenticated]
     
+    CHUNK_SIZE = 1000
+    MAX_FLASHCARDS = 50000
+    MAX_ERRORS = 20
+    MAX_RETRIES = 3
+    
     def post(self, request):
         flashcards_data = request.data.get('flashcards', [])
         
-        if not flashcards_data:
+        if not flashcards_data or not isinstance(flashcards_data, list):
             return Response({'error': 'No se enviaron flashcards'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(flashcards_data) > self.MAX_FLASHCARDS:
+            return Response(
+                {'error': f'Máximo {self.MAX_FLASHCARDS} flashcards por importación'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         
-        created = []
         errors = []
+        invalid = duplicates = 0
         
+        # Validar y quitar repetidos dentro del mismo envío
+        cards = {}
         for item in flashcards_data:
-            # Evitar duplicados
-            exists = Flashcard.objects.filter(
-                user=request.user,
-                spanish_word=item.get('spanish_word'),
-                guarani_word=item.get('guarani_word')
-            ).exists()
-            
-            if exists:
-                errors.append(f"{item.get('spanish_word')} ya existe")
+            if not isinstance(item, dict):
+                item = {}
+            spanish_word = str(item.get('spanish_word') or '').strip()
+            guarani_word = str(item.get('guarani_word') or '').strip()
+            if not spanish_word or not guarani_word or len(spanish_word) > 200 or len(guarani_word) > 200:
+                invalid += 1
+                errors.append(f"{spanish_word or '(vacía)'} no es válida")
                 continue
-            
-            flashcard = Flashcard.objects.create(
+            if (spanish_word, guarani_word) in cards:
+                duplicates += 1
+                continue
+            cards[(spanish_word, guarani_word)] = Flashcard(
                 user=request.user,
-                spanish_word=item.get('spanish_word', ''),
-                guarani_word=item.get('guarani_word', ''),
-                example=item.get('example', ''),
-                deck_name=item.get('deck_name', 'General')
+                spanish_word=spanish_word,
+                guarani_word=guarani_word,
+                example=item.get('example') or '',
+                deck_name=str(item.get('deck_name') or 'General')[:100]
             )
-            created.append(FlashcardSerializer(flashcard).data)
+        
+        pairs = list(cards)
+        created = 0
+        with transaction.atomic():
+            for i in range(0, len(pairs), self.CHUNK_SIZE):
+                chunk = pairs[i:i + self.CHUNK_SIZE]
+                for _ in range(self.MAX_RETRIES):
+                    existing = set(
+                        Flashcard.objects.filter(
+                            user=request.user,
+                            spanish_word__in={spanish_word for spanish_word, _ in chunk}
+                        ).values_list('spanish_word', 'guarani_word')
+                    )
+                    new = [cards[pair] for pair in chunk if pair not in existing]
+                    try:
+                        with transaction.atomic():
+                            Flashcard.objects.bulk_create(new)
+                        break
+                    except IntegrityError:
+                        # Otra importación simultánea creó alguno de los pares:
+                        # volver a leer los existentes y reintentar el tramo
+                        continue
+                else:
+                    # El conflicto no se resuelve releyendo: no dejar nada a medias
+                    transaction.set_rollback(True)
+                    return Response(
+                        {'error': 'Conflicto al guardar las flashcards, intentá de nuevo'},
+                        status=status.HTTP_409_CONFLICT
+                    )
+                
+                for pair in chunk:
+                    if pair in existing:
+                        duplicates += 1
+                        errors.append(f"{pair[0]} ya existe")
+                created += len(new)
+        
+        if created:
+            check_achievements(request.user, 'flashcards')
         
         return Response({
-            'created': len(created),
-            'errors': errors,
-            'flashcards': created
+            'created': created,
+            'duplicates': duplicates,
+            'invalid': invalid,
+            'errors': errors[:self.MAX_ERRORS],
         })
 
 
@@ -1057,62 +1168,99 @@ class EndStudySessionView(APIView):
             return Response({'error': 'Sesión no encontrada'}, status=404)
 
 
-# ==================== HELPER FUNCTIONS ====================
+# ==================== EXPORT ====================
 
-def check_and_unlock_achievements(user):
-    """Verificar y desbloquear logros"""
-    # Logro: Primera lección
-    completed_count = UserProgress.objects.filter(user=user, completed=True).count()
-    if completed_count == 1:
-        Achievement.objects.get_or_create(
-            user=user,
-            achievement_type='first_lesson',
-            defaults={
-                'title': 'Primera Lección',
-                'description': '¡Completaste tu primera lección!',
-                'icon': '🎓'
-            }
-        )
+class ExportView(APIView):
+    """Descargar el historial (chat, traducciones, ejercicios) en streaming.
+
+    Parámetros: output=ndjson|csv, gzip=1, date_from, date_to (YYYY-MM-DD)
+    y after_id u offset para retomar una descarga cortada.
+    """
+    permission_classes = [IsAuthenticated]
     
-    # Logro: 5 lecciones
-    if completed_count == 5:
-        Achievement.objects.get_or_create(
-            user=user,
-            achievement_type='five_lessons',
-            defaults={
-                'title': 'Estudiante Dedicado',
-                'description': '¡Completaste 5 lecciones!',
-                'icon': '📚'
-            }
-        )
+    CONTENT_TYPES = {
+        'ndjson': 'application/x-ndjson',
+        'csv': 'text/csv; charset=utf-8',
+    }
     
-    # Logro: 10 lecciones
-    if completed_count == 10:
-        Achievement.objects.get_or_create(
-            user=user,
-            achievement_type='ten_lessons',
-            defaults={
-                'title': 'Maestro del Guaraní',
-                'description': '¡Completaste 10 lecciones!',
-                'icon': '🏆'
-            }
+    def get(self, request, kind):
+        if kind not in EXPORTS:
+            raise NotFound('Exportación no encontrada')
+        
+        params = request.query_params
+        fmt = params.get('output', 'ndjson')
+        if fmt not in self.CONTENT_TYPES:
+            return Response({'error': 'output debe ser ndjson o csv'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        date_from = params.get('date_from')
+        date_to = params.get('date_to')
+        try:
+            if (date_from and not parse_date(date_from)) or (date_to and not parse_date(date_to)):
+                raise ValueError
+            after_id = int(params.get('after_id') or 0)
+            offset = int(params.get('offset') or 0)
+            if after_id < 0 or offset < 0:
+                raise ValueError
+        except ValueError:
+            return Response({'error': 'Parámetros inválidos'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        compress = params.get('gzip') in ('1', 'true')
+        header, rows = export_rows(kind, request.user, date_from, date_to, after_id, offset)
+        blocks = stream_export(header, rows, fmt, compress)
+        if isinstance(request._request, ASGIRequest):
+            blocks = async_blocks(blocks)
+        
+        response = StreamingHttpResponse(
+            blocks,
+            content_type='application/gzip' if compress else self.CONTENT_TYPES[fmt]
         )
+        filename = f"guarani-{kind}.{fmt}" + ('.gz' if compress else '')
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        response['Cache-Control'] = 'no-store'
+        return response
+
+
+# ==================== HELPER FUNCTIONS ====================
+
+def generate_session_analysis(session):
+    """Generar análisis de la sesión a partir de sus agregados"""
+    from .sketches import topk_most_common
     
-    # Logro: Racha de 7 días
-    try:
-        streak = UserStreak.objects.get(user=user)
-        if streak.current_streak >= 7:
-            Achievement.objects.get_or_create(
-                user=user,
-                achievement_type='week_streak',
-                defaults={
-                    'title': 'Racha Semanal',
-                    'description': '¡7 días seguidos practicando!',
-                    'icon': '🔥'
-                }
-            )
-    except UserStreak.DoesNotExist:
-        pass
+    duration_seconds = session.duration_seconds
+    if session.ended_at is None:
+        duration_seconds = int((timezone.now() - session.started_at).total_seconds())
+    
+    return {
+        'duration_minutes': round(duration_seconds / 60, 1),
+        'messages_sent': session.message_count,
+        'words_used': session.words_used,
+        'grammar_errors': session.grammar_errors,
+        'accuracy_rate': round(
+            ((session.message_count - session.grammar_errors) / session.message_count * 100)
+            if session.message_count > 0 else 0,
+            1
+        ),
+        'most_common_words': [word for word, _ in topk_most_common(session.word_frequencies, 10)],
+        'error_breakdown': session.error_breakdown,
+        'performance': calculate_session_performance(session)
+    }
+
+
+def calculate_session_performance(session):
+    """Calcular performance general"""
+    if session.message_count == 0:
+        return 'beginner'
+    
+    accuracy = (session.message_count - session.grammar_errors) / session.message_count
+    
+    if accuracy >= 0.9 and session.message_count >= 10:
+        return 'excellent'
+    elif accuracy >= 0.75:
+        return 'good'
+    elif accuracy >= 0.5:
+        return 'fair'
+    else:
+        return 'needs_improvement'
 
 
 def create_daily_challenges(date):
@@ -13,4 +13,21 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
 
-application = get_asgi_application()
+django_application = get_asgi_application()
+
+# El canal WebSocket del chatbot se importa después de inicializar Django
+from api.consumers import chat_socket  # noqa: E402
+
+
+async def application(scope, receive, send):
+    """HTTP va a Django; ws/chat/ al canal WebSocket del chatbot.
+
+    Para WebSockets hace falta un servidor ASGI con soporte (por ejemplo
+    uvicorn[standard] o daphne); runserver sólo atiende HTTP.
+    """
+    if scope['type'] == 'websocket':
+        if scope['path'].rstrip('/') == '/ws/chat':
+            return await chat_socket(scope, receive, send)
+        await receive()
+        return await send({'type': 'websocket.close', 'code': 4404})
+    return await django_application(scope, receive, send)
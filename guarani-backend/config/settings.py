@@ -116,6 +116,60 @@ SIMPLE_JWT = {
 # Google Gemini API
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 
+# Chatbot: responder sin esperar el análisis gramatical (se hace en segundo plano)
+CHATBOT_DEFER_GRAMMAR = os.getenv('CHATBOT_DEFER_GRAMMAR', 'False') == 'True'
+
+# Chatbot: contexto enviado a Gemini (api/chat_context.py)
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', '2000'))
+CHAT_CONTEXT_MAX_TURNS = 50
+CHAT_SUMMARY_BATCH_TURNS = 4
+CHAT_SUMMARY_MAX_CHARS = 1200
+CHAT_SESSION_TOP_WORDS = 50
+
+# Chatbot: respuestas cacheadas para los primeros turnos (api/response_cache.py)
+CHAT_RESPONSE_CACHE_MODES = ('GREETINGS', 'MARKET', 'RESTAURANT')
+CHAT_RESPONSE_CACHE_MAX_TURNS = 2
+CHAT_RESPONSE_CACHE_VARIANTS = int(os.getenv('CHAT_RESPONSE_CACHE_VARIANTS', '3'))
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'chat_responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'chat-responses',
+        'TIMEOUT': int(os.getenv('CHAT_RESPONSE_CACHE_TTL', str(60 * 60 * 24))),
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('CHAT_RESPONSE_CACHE_MAX_ENTRIES', '5000')),
+        },
+    },
+}
+
+# Análisis de puntos débiles en caché (cada pedido compara la versión con la
+# base, así que los demás procesos no sirven datos viejos)
+WEAKNESS_ANALYSIS_CACHE_SECONDS = 60 * 60
+
+# Estadísticas por ejercicio (api/item_stats.py, comando update_exercise_stats)
+EXERCISE_STATS_BATCH_SIZE = int(os.getenv('EXERCISE_STATS_BATCH_SIZE', '5000'))
+EXERCISE_STATS_TOP_WRONG_ANSWERS = 10
+
+# Cola de repaso de errores: cada acierto multiplica la prioridad por
+# MISTAKE_REVIEW_DECAY y tras MISTAKE_REVIEW_CLEAR_AFTER aciertos seguidos sale
+MISTAKE_REVIEW_DECAY = 0.5
+MISTAKE_REVIEW_CLEAR_AFTER = 2
+
+# Registro de llamadas al LLM (api/ledger.py, comando llm_usage)
+LLM_LEDGER_BATCH_SIZE = int(os.getenv('LLM_LEDGER_BATCH_SIZE', '50'))
+LLM_LEDGER_FLUSH_SECONDS = 10
+# USD por millón de tokens (entrada, salida)
+LLM_PRICING = {
+    'gemini-2.5-flash': {'input': 0.30, 'output': 2.50},
+}
+
+# Tareas en segundo plano (api/tasks.py)
+BACKGROUND_TASK_WORKERS = int(os.getenv('BACKGROUND_TASK_WORKERS', '2'))
+BACKGROUND_TASKS_EAGER = os.getenv('BACKGROUND_TASKS_EAGER', 'False') == 'True'
+
 # Modelo de Usuario personalizado (opcional)
 AUTH_USER_MODEL = 'users.User'
 
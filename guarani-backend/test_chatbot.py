@@ -0,0 +1,668 @@
+import io
+import json
+import re
+
+import pytest
+from django.core.cache import caches
+from django.urls import reverse
+from rest_framework import status
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api import ledger, llm
+from api.models import ChatMessage, ConversationMode, GrammarCorrection
+
+User = get_user_model()
+
+
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeChat:
+    reply = '¡Iporã! Mba\'éichapa nde?'
+
+    def send_message(self, message, stream=False, **kwargs):
+        if stream:
+            return [FakeResponse(part) for part in re.findall(r'\S+\s*', self.reply)]
+        return FakeResponse(self.reply)
+
+
+class FakeModel:
+    """Reemplazo de genai.GenerativeModel sin llamadas de red"""
+    calls = []
+    instances = 0
+
+    def __init__(self, *args, **kwargs):
+        FakeModel.instances += 1
+        self.system_instruction = kwargs.get('system_instruction')
+
+    def start_chat(self, history=None):
+        FakeModel.calls.append('chat')
+        return FakeChat()
+
+    def generate_content(self, prompt, **kwargs):
+        FakeModel.calls.append('analysis')
+        return FakeResponse(json.dumps({'corrections': [{
+            'original': 'che aiko porã',
+            'corrected': 'che aiko porã',
+            'type': 'spelling',
+            'explanation': 'Falta la tilde nasal',
+            'severity': 'low',
+        }]}))
+
+
+@pytest.fixture
+def fake_gemini(monkeypatch):
+    FakeModel.calls = []
+    FakeModel.instances = 0
+    monkeypatch.setattr('google.generativeai.GenerativeModel', FakeModel)
+    llm.reset_models()
+    llm.invalidate_modes()
+    caches['chat_responses'].clear()
+    ledger.take()
+    yield FakeModel
+    llm.reset_models()
+    ledger.take()
+
+
+@pytest.mark.django_db
+class TestChatbot:
+    """Tests del chatbot con Gemini simulado"""
+
+    def test_analisis_inline(self, authenticated_client, fake_gemini):
+        """Sin diferir, las correcciones vienen en la respuesta"""
+        client = authenticated_client
+
+        response = client.post(reverse('chatbot'), {'message': 'Che ahayhu nde rógape'}, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['grammar_status'] == 'done'
+        assert response.data['has_corrections'] is True
+        assert len(response.data['corrections']) == 1
+        assert response.data['detected_language'] == 'gn'
+
+    def test_analisis_local_sin_llm(self, authenticated_client, fake_gemini):
+        """Los mensajes que el analizador local resuelve no llaman a Gemini"""
+        client = authenticated_client
+
+        response = client.post(
+            reverse('chatbot'),
+            {'message': 'Che aguyje', 'defer_grammar': True},
+            format='json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['grammar_status'] == 'done'
+        assert response.data['detected_language'] == 'gn'
+        assert fake_gemini.calls == ['chat']
+
+    def test_analisis_diferido(self, authenticated_client, test_user, fake_gemini, django_capture_on_commit_callbacks):
+        """Con defer_grammar la respuesta no espera al análisis"""
+        client, user = authenticated_client, test_user
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            response = client.post(
+                reverse('chatbot'),
+                {'message': 'Che ahayhu nde rógape', 'defer_grammar': True},
+                format='json'
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['grammar_status'] == 'pending'
+        assert response.data['has_corrections'] is False
+        assert fake_gemini.calls == ['chat']
+
+        message_id = response.data['id']
+        url = reverse('chat-message-corrections', args=[message_id])
+        assert client.get(url).data['grammar_status'] == 'pending'
+
+        # Ejecutar el worker en el mismo hilo
+        from api.tasks import analyze_message_grammar
+        assert len(callbacks) == 1
+        analyze_message_grammar(message_id)
+
+        poll = client.get(url)
+        assert poll.data['grammar_status'] == 'done'
+        assert len(poll.data['corrections']) == 1
+        assert GrammarCorrection.objects.filter(message_id=message_id).count() == 1
+        assert user.conversation_level.total_messages == 1
+
+    def test_defer_grammar_falso_en_formulario(self, authenticated_client, fake_gemini):
+        """El texto "false" de un formulario no difiere el análisis"""
+        client = authenticated_client
+
+        response = client.post(reverse('chatbot'), {'message': 'Che ahayhu nde rógape', 'defer_grammar': 'false'})
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['grammar_status'] == 'done'
+
+    def test_analisis_diferido_fallido(self, authenticated_client, test_user, fake_gemini, monkeypatch):
+        """Si el LLM falla en el worker el mensaje queda como fallido"""
+        client, user = authenticated_client, test_user
+        message = ChatMessage.objects.create(
+            user=user, message='Che ahayhu nde rógape', response='Iporã', grammar_status='pending'
+        )
+
+        def broken(self, prompt, **kwargs):
+            raise RuntimeError('sin conexión')
+        monkeypatch.setattr(FakeModel, 'generate_content', broken)
+
+        from api.tasks import analyze_message_grammar
+        analyze_message_grammar(message.id)
+
+        message.refresh_from_db()
+        assert message.grammar_status == 'failed'
+
+    def test_correcciones_de_otro_usuario(self, authenticated_client):
+        """No se pueden consultar correcciones de mensajes ajenos"""
+        client = authenticated_client
+        other = User.objects.create_user(username='otro', email='otro@test.com', password='Pass123!')
+        message = ChatMessage.objects.create(user=other, message='hola', response='mba\'éichapa')
+
+        response = client.get(reverse('chat-message-corrections', args=[message.id]))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    def test_modelos_reutilizados_por_modo_y_nivel(self, authenticated_client, fake_gemini):
+        """El modelo se construye una vez por (modo, nivel) y se invalida al editar el modo"""
+        client = authenticated_client
+        mode = ConversationMode.objects.create(
+            name='MARKET', description='Mercado', system_prompt='Eres un vendedor.'
+        )
+        data = {'message': 'Che aguyje', 'mode_id': mode.id}
+
+        first = client.post(reverse('chatbot'), data, format='json')
+        data['session_id'] = first.data['session_id']
+        client.post(reverse('chatbot'), data, format='json')
+
+        assert fake_gemini.instances == 1
+        assert llm.get_chat_model(llm.get_mode(mode.id), 'beginner').system_instruction.endswith('Eres un vendedor.')
+
+        mode.system_prompt = 'Eres una vendedora.'
+        mode.save()
+
+        model = llm.get_chat_model(llm.get_mode(mode.id), 'beginner')
+        assert fake_gemini.instances == 2
+        assert model.system_instruction.endswith('Eres una vendedora.')
+
+
+@pytest.mark.django_db
+class TestResponseCache:
+    """Tests de la caché de respuestas de los primeros turnos"""
+
+    @pytest.fixture
+    def varied_replies(self, monkeypatch):
+        replies = iter(f'Respuesta {i}' for i in range(100))
+        monkeypatch.setattr(FakeChat, 'send_message', lambda self, message, **kwargs: FakeResponse(next(replies)))
+
+    def test_saludo_cacheado_con_variantes(self, authenticated_client, fake_gemini, varied_replies, settings):
+        settings.CHAT_RESPONSE_CACHE_VARIANTS = 2
+        mode = ConversationMode.objects.create(name='GREETINGS', description='-', system_prompt='-')
+
+        seen = set()
+        for message in ["Mba'éichapa", 'mba\'eichapa!', "MBA'ÉICHAPA", "Mba’éichapa?"]:
+            response = authenticated_client.post(reverse('chatbot'), {'message': message, 'mode_id': mode.id}, format='json')
+            seen.add(response.data['response'])
+
+        # Dos llamadas para llenar el grupo, las demás salen de la caché
+        assert fake_gemini.calls == ['chat', 'chat']
+        assert seen == {'Respuesta 0', 'Respuesta 1'}
+        assert ChatMessage.objects.count() == 4
+
+    def test_no_cachea_modo_libre_ni_turnos_avanzados(self, authenticated_client, fake_gemini, varied_replies, settings):
+        settings.CHAT_RESPONSE_CACHE_VARIANTS = 1
+        free = ConversationMode.objects.create(name='FREE', description='-', system_prompt='-')
+        market = ConversationMode.objects.create(name='MARKET', description='-', system_prompt='-')
+
+        for _ in range(2):
+            authenticated_client.post(reverse('chatbot'), {'message': 'hola', 'mode_id': free.id}, format='json')
+        assert fake_gemini.calls == ['chat', 'chat']
+
+        data = {'message': 'hola', 'mode_id': market.id}
+        for _ in range(3):
+            data['session_id'] = authenticated_client.post(reverse('chatbot'), data, format='json').data['session_id']
+        # 1er turno: llena el grupo; 2do: contexto distinto; 3ro: fuera de los primeros turnos
+        assert fake_gemini.calls == ['chat'] * 5
+
+
+@pytest.mark.django_db
+class TestLLMLedger:
+    """Tests del registro de llamadas al LLM"""
+
+    def test_llamadas_registradas_en_lote(self, authenticated_client, test_user, fake_gemini, settings):
+        from django.core.management import call_command
+        from api.models import LLMCall
+
+        settings.LLM_LEDGER_BATCH_SIZE = 100
+        user = test_user
+        client = authenticated_client
+        mode = ConversationMode.objects.create(name='GREETINGS', description='-', system_prompt='-')
+        settings.CHAT_RESPONSE_CACHE_VARIANTS = 1
+
+        client.post(reverse('chatbot'), {'message': 'Che ahayhu nde rógape', 'mode_id': mode.id}, format='json')
+        client.post(reverse('chatbot'), {'message': 'Che ahayhu nde rógape', 'mode_id': mode.id}, format='json')
+
+        # Nada se escribe hasta que se junta el lote
+        assert LLMCall.objects.count() == 0
+        assert ledger.flush() == 4
+
+        calls = LLMCall.objects.order_by('id')
+        assert [(c.purpose, c.cache_hit) for c in calls] == [
+            ('chat', False), ('grammar', False), ('chat', True), ('grammar', False)
+        ]
+        assert {c.user_id for c in calls} == {user.id}
+        assert calls[0].mode == 'GREETINGS'
+        assert calls[0].model == 'gemini-2.5-flash'
+
+        out = io.StringIO()
+        call_command('llm_usage', stdout=out)
+        assert 'Costo total estimado' in out.getvalue()
+
+    def test_errores_registrados(self, authenticated_client, fake_gemini, monkeypatch):
+        def fail(self, message, **kwargs):
+            raise TimeoutError('sin respuesta')
+        monkeypatch.setattr(FakeChat, 'send_message', fail)
+        client = authenticated_client
+
+        response = client.post(reverse('chatbot'), {'message': 'hola'}, format='json')
+
+        assert response.status_code == status.HTTP_500_INTERNAL_SERVER_ERROR
+        rows = ledger.take()
+        assert [(row.purpose, row.error) for row in rows] == [('chat', 'TimeoutError')]
+
+    def test_guardado_por_tiempo_sin_mas_llamadas(self, fake_gemini, settings, monkeypatch):
+        """El temporizador guarda aunque no lleguen más llamadas y cierra su conexión"""
+        import threading
+        settings.LLM_LEDGER_FLUSH_SECONDS = 0.01
+        flushed, closed = threading.Event(), threading.Event()
+        monkeypatch.setattr(ledger, 'flush', lambda: flushed.set())
+        monkeypatch.setattr(ledger.connections, 'close_all', lambda: closed.set())
+
+        ledger.record('chat', 'gemini-2.5-flash')
+
+        assert flushed.wait(timeout=2) and closed.wait(timeout=2)
+        assert len(ledger.take()) == 1
+
+
+@pytest.mark.django_db
+class TestChatSearch:
+    """Tests de la búsqueda en el historial de chat"""
+
+    def test_busqueda_normalizada_con_fragmentos(self, authenticated_client, test_user, fake_gemini):
+        from django.core.management import call_command
+        from api.models import ChatSearchTerm
+        user = test_user
+        other = User.objects.create_user(username='otro', email='otro@test.com', password='Pass123!')
+        client = authenticated_client
+
+        # Mensajes anteriores al índice: se agregan con el comando
+        ChatMessage.objects.create(
+            user=user, message='¿Cómo se pronuncia la ñ?',
+            response='La letra ñ suena como en español: ñandu, ñe\'ẽ.'
+        )
+        ChatMessage.objects.create(user=other, message='ñ', response='La ñ')
+        call_command('index_chat_messages', stdout=io.StringIO())
+
+        # Los mensajes nuevos se indexan al guardarse
+        client.post(reverse('chatbot'), {'message': "Mba’éichapa"}, format='json')
+        assert ChatSearchTerm.objects.filter(user=user, term='mbaeichapa').exists()
+
+        response = client.get(reverse('chat-search'), {'q': 'Ñ'})
+        assert [r['message'] for r in response.data['results']] == ['¿Cómo se pronuncia la ñ?']
+        result = response.data['results'][0]
+        start, end = result['response_highlights'][0]
+        assert result['response'][start:end] == 'ñ'
+
+        response = client.get(reverse('chat-search'), {'q': 'mbaeichapa'})
+        assert len(response.data['results']) == 1
+        assert response.data['results'][0]['message'] == "Mba’éichapa"
+
+        # Todas las palabras deben aparecer
+        assert client.get(reverse('chat-search'), {'q': 'letra mbaeichapa'}).data['results'] == []
+
+    def test_fragmento_largo(self):
+        from api.search import search_terms, snippet
+        text = ('palabra ' * 30) + 'Jajotopata ' + ('otra ' * 30)
+
+        fragment, highlights = snippet(text, search_terms('jajotopata'), width=20)
+
+        assert fragment.startswith('…') and fragment.endswith('…')
+        assert len(fragment) < 60
+        start, end = highlights[0]
+        assert fragment[start:end] == 'Jajotopata'
+
+
+@pytest.mark.django_db
+class TestChatContext:
+    """Tests del contexto con presupuesto de tokens"""
+
+    @pytest.fixture
+    def session(self, test_user):
+        from api.models import ChatSession
+        user = test_user
+        session = ChatSession.objects.create(user=user)
+        for i in range(10):
+            ChatMessage.objects.create(
+                session=session, user=user,
+                message=f'mensaje {i} ' + 'x' * 40, response=f'respuesta {i} ' + 'y' * 40
+            )
+        return session
+
+    def test_toma_los_turnos_mas_recientes(self, session, settings):
+        from api.chat_context import build_chat_context
+        settings.CHAT_CONTEXT_TOKEN_BUDGET = 100
+
+        history, evicted = build_chat_context(session)
+
+        assert history[-2]['parts'][0].startswith('mensaje 9')
+        assert not any(h['parts'][0].startswith('mensaje 0') for h in history)
+        assert evicted == 10 - len(history) // 2
+
+    def test_resumen_incremental(self, session, settings):
+        from api.chat_context import build_chat_context, fold_session_summary, SUMMARY_PREFIX
+        settings.CHAT_CONTEXT_TOKEN_BUDGET = 100
+
+        class SummaryModel:
+            def generate_content(self, prompt):
+                return FakeResponse('El usuario practicó saludos.')
+
+        assert fold_session_summary(session.id, SummaryModel()) is True
+        session.refresh_from_db()
+        assert session.context_summary == 'El usuario practicó saludos.'
+        assert session.summarized_message_id is not None
+
+        history, evicted = build_chat_context(session)
+        assert history[0]['parts'][0].startswith(SUMMARY_PREFIX)
+        assert history[-2]['parts'][0].startswith('mensaje 9')
+        assert evicted == 0
+
+
+@pytest.mark.django_db
+class TestChatTranscript:
+    """Tests de la transcripción paginada"""
+
+    def _create_session(self, user, count):
+        from api.models import ChatSession
+        session = ChatSession.objects.create(user=user)
+        for i in range(count):
+            message = ChatMessage.objects.create(
+                session=session, user=user, message=f'mensaje {i}', response='ok'
+            )
+            GrammarCorrection.objects.create(
+                message=message, original_text='a', corrected_text='b',
+                error_type='spelling', explanation='-'
+            )
+        return session
+
+    def test_paginas_por_cursor(self, authenticated_client, test_user):
+        client, user = authenticated_client, test_user
+        session = self._create_session(user, 5)
+        url = reverse('chat-session-transcript', args=[session.id])
+
+        first = client.get(url, {'page_size': 3})
+        second = client.get(first.data['next'])
+
+        assert [m['message'] for m in first.data['results']] == ['mensaje 0', 'mensaje 1', 'mensaje 2']
+        assert [m['message'] for m in second.data['results']] == ['mensaje 3', 'mensaje 4']
+        assert second.data['next'] is None
+        assert len(first.data['results'][0]['corrections']) == 1
+
+    def test_consultas_constantes(self, authenticated_client, test_user, django_assert_max_num_queries):
+        """La cantidad de consultas no depende del largo de la página"""
+        client, user = authenticated_client, test_user
+        session = self._create_session(user, 40)
+        url = reverse('chat-session-transcript', args=[session.id])
+
+        with django_assert_max_num_queries(4):
+            response = client.get(url)
+
+        assert len(response.data['results']) == 40
+
+    def test_sesion_ajena(self, authenticated_client):
+        client = authenticated_client
+        other = User.objects.create_user(username='otro', email='otro@test.com', password='Pass123!')
+        session = self._create_session(other, 1)
+
+        response = client.get(reverse('chat-session-transcript', args=[session.id]))
+
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.django_db
+class TestChatSessionList:
+    """Tests del listado resumido de sesiones"""
+
+    def test_resumen_sin_transcripcion(self, authenticated_client, test_user, django_assert_max_num_queries):
+        from api.models import ChatSession
+        client, user = authenticated_client, test_user
+        market = ConversationMode.objects.create(name='MARKET', description='-', system_prompt='-')
+        for _ in range(5):
+            session = ChatSession.objects.create(user=user, mode=market, message_count=2)
+            first = ChatMessage.objects.create(session=session, user=user, message='Mba\'éichapa', response='-')
+            ChatMessage.objects.create(session=session, user=user, message='Jajotopata', response='-')
+            GrammarCorrection.objects.create(
+                message=first, original_text='a', corrected_text='b',
+                error_type='spelling', explanation='-'
+            )
+
+        with django_assert_max_num_queries(3):
+            response = client.get(reverse('chat-sessions'))
+
+        assert len(response.data) == 5
+        item = response.data[0]
+        assert 'messages' not in item
+        assert item['mode_name'] == 'En el Mercado'
+        assert item['first_message'] == "Mba'éichapa"
+        assert item['last_message'] == 'Jajotopata'
+        assert item['correction_count'] == 1
+
+    def test_filtros_por_modo_y_fecha(self, authenticated_client, test_user):
+        from api.models import ChatSession
+        client, user = authenticated_client, test_user
+        market = ConversationMode.objects.create(name='MARKET', description='-', system_prompt='-')
+        ChatSession.objects.create(user=user, mode=market)
+        ChatSession.objects.create(user=user)
+
+        assert len(client.get(reverse('chat-sessions'), {'mode': 'market'}).data) == 1
+        assert len(client.get(reverse('chat-sessions'), {'mode': market.id}).data) == 1
+        assert len(client.get(reverse('chat-sessions'), {'date_from': '2000-01-01'}).data) == 2
+        assert len(client.get(reverse('chat-sessions'), {'date_to': '2000-01-01'}).data) == 0
+
+        for bad in ({'date_from': '2024-13-99'}, {'date_from': 'abc'}, {'date_to': '2024-02-30'}):
+            assert client.get(reverse('chat-sessions'), bad).status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestSessionAnalytics:
+    """Tests de los agregados incrementales de la sesión"""
+
+    def test_agregados_y_fin_de_sesion(self, authenticated_client, test_user, django_assert_max_num_queries):
+        from api.models import ChatSession
+        client, user = authenticated_client, test_user
+        session = ChatSession.start(user)
+
+        for text, corrections in [
+            ('che aiko porã', [{'type': 'verb'}]),
+            ('porã porã', []),
+            ('che karu', [{'type': 'spelling'}, {'type': 'verb'}]),
+        ]:
+            message = ChatMessage.objects.create(
+                session=session, user=user, message=text, response='-',
+                word_count=len(text.split())
+            )
+            session.record_message(message, corrections)
+
+        session.refresh_from_db()
+        assert session.message_count == 3
+        assert session.words_used == 7
+        assert session.grammar_errors == 3
+        assert session.error_breakdown == {'verb': 2, 'spelling': 1}
+
+        analysis = client.get(reverse('chat-session-analysis', args=[session.id])).data
+        assert analysis['most_common_words'][:2] == ['porã', 'che']
+
+        with django_assert_max_num_queries(4):
+            response = client.post(reverse('end-chat-session'), {'session_id': session.id}, format='json')
+
+        assert response.data['analysis']['error_breakdown'] == {'verb': 2, 'spelling': 1}
+        assert response.data['session']['ended_at'] is not None
+
+    def test_fin_de_sesion_no_pisa_correcciones_diferidas(self, test_user):
+        """Una instancia vieja no reescribe los agregados al cerrar la sesión"""
+        from api.models import ChatSession
+        session = ChatSession.start(test_user)
+        stale = ChatSession.objects.get(pk=session.pk)
+
+        session.record_corrections([{'type': 'verb'}, {'type': 'spelling'}])
+        stale.end_session()
+
+        session.refresh_from_db()
+        assert session.grammar_errors == 2
+        assert session.error_breakdown == {'verb': 1, 'spelling': 1}
+        assert session.ended_at is not None
+
+    def test_sketch_acotado(self):
+        from api.sketches import topk_add, topk_most_common
+        counts = {}
+        topk_add(counts, ['a'] * 5 + ['b'] * 3 + list('cdefg'), capacity=3)
+
+        assert len(counts) == 3
+        assert topk_most_common(counts, 1) == [('a', 5)]
+
+
+@pytest.mark.django_db
+class TestConversationStats:
+    """Tests de las estadísticas de conversación"""
+
+    def test_totales_incrementales_y_get_de_solo_lectura(self, authenticated_client, test_user, django_assert_max_num_queries):
+        from api.models import ChatSession, UserConversationLevel
+        user = test_user
+        client = authenticated_client
+
+        for _ in range(2):
+            session = ChatSession.start(user)
+        session.started_at = session.started_at.replace(year=session.started_at.year - 1)
+        session.end_session()
+
+        level = UserConversationLevel.objects.get(user=user)
+        assert level.total_sessions == 2
+        assert level.total_time_minutes == level.total_time_seconds // 60 > 0
+
+        # Autenticación + una lectura
+        with django_assert_max_num_queries(2):
+            response = client.get(reverse('conversation-stats'))
+
+        assert response.data['total_sessions'] == 2
+        assert 'private' in response['Cache-Control']
+
+    def test_mensaje_no_pisa_totales_de_sesion(self, test_user):
+        """Una instancia vieja sólo suma sus columnas al registrar un mensaje"""
+        from api.models import ChatSession, UserConversationLevel
+        level, _ = UserConversationLevel.objects.get_or_create(user=test_user, defaults={'grammar_score': 99.8})
+        ChatSession.start(test_user)
+
+        message = ChatMessage(user=test_user, message='Mba\'éichapa nde ko ára', word_count=5)
+        level.record_message(message)
+
+        level.refresh_from_db()
+        assert level.total_sessions == 1
+        assert level.total_messages == 1
+        assert level.vocabulary_size == 3
+        assert level.grammar_score == 100
+
+    def test_get_sin_datos_no_escribe(self, authenticated_client, test_user):
+        from api.models import UserConversationLevel
+        user = test_user
+        client = authenticated_client
+
+        response = client.get(reverse('conversation-stats'))
+
+        assert response.data['total_sessions'] == 0
+        assert not UserConversationLevel.objects.filter(user=user).exists()
+
+
+@pytest.mark.django_db
+class TestChatSocket:
+    """Tests del canal WebSocket del chatbot"""
+
+    def run_socket(self, query_string, messages):
+        from asgiref.sync import async_to_sync
+        from asgiref.testing import ApplicationCommunicator
+        from api.consumers import chat_socket
+
+        async def talk():
+            communicator = ApplicationCommunicator(chat_socket, {
+                'type': 'websocket',
+                'path': '/ws/chat/',
+                'query_string': query_string.encode(),
+            })
+            await communicator.send_input({'type': 'websocket.connect'})
+            events = [await communicator.receive_output(timeout=5)]
+            if events[0]['type'] == 'websocket.close':
+                return events
+
+            events.append(await communicator.receive_output(timeout=5))
+            for message in messages:
+                await communicator.send_input({
+                    'type': 'websocket.receive',
+                    'text': json.dumps({'message': message})
+                })
+                while True:
+                    event = await communicator.receive_output(timeout=5)
+                    events.append(event)
+                    if json.loads(event['text'])['type'] in ('corrections', 'error'):
+                        break
+            await communicator.send_input({'type': 'websocket.disconnect', 'code': 1000})
+            await communicator.wait(timeout=5)
+            return events
+
+        return async_to_sync(talk)()
+
+    def test_token_invalido(self):
+        events = self.run_socket('token=invalido', [])
+
+        assert events == [{'type': 'websocket.close', 'code': 4401}]
+
+    def test_respuesta_en_partes_y_correcciones(self, test_user, fake_gemini):
+        token = RefreshToken.for_user(test_user).access_token
+
+        events = self.run_socket(f'token={token}', ['Che ahayhu nde rógape', 'Che aguyje'])
+
+        assert events[0] == {'type': 'websocket.accept'}
+        payloads = [json.loads(event['text']) for event in events[1:]]
+        assert payloads[0] == {'type': 'session.ready', 'session_id': None}
+
+        deltas = [p['text'] for p in payloads if p['type'] == 'reply.delta']
+        assert ''.join(deltas) == FakeChat.reply * 2
+
+        done = [p for p in payloads if p['type'] == 'reply.done']
+        assert len(done) == 2
+        assert done[0]['session_id'] == done[1]['session_id']
+        assert done[0]['message']['grammar_status'] == 'pending'
+
+        corrections = [p for p in payloads if p['type'] == 'corrections']
+        assert corrections[0]['grammar_status'] == 'done'
+        assert len(corrections[0]['corrections']) == 1
+
+        # Un solo modelo para toda la conexión
+        assert fake_gemini.instances == 2
+        assert ChatMessage.objects.filter(session_id=done[0]['session_id']).count() == 2
+
+    def test_suma_al_desafio_como_http(self, authenticated_client, test_user, fake_gemini):
+        """Los dos caminos registran el turno igual, desafío diario incluido"""
+        from django.utils import timezone
+        from api.models import DailyChallenge, UserChallengeProgress
+        challenge = DailyChallenge.objects.create(
+            challenge_type='CHATBOT', description='Mandá 3 mensajes',
+            target_value=3, date=timezone.now().date()
+        )
+        token = RefreshToken.for_user(test_user).access_token
+
+        authenticated_client.post(reverse('chatbot'), {'message': 'Che aguyje'}, format='json')
+        self.run_socket(f'token={token}', ['Che aguyje', 'Che ahayhu nde rógape'])
+
+        progress = UserChallengeProgress.objects.get(user=test_user, challenge=challenge)
+        assert progress.current_value == 3
+        assert progress.completed
@@ -0,0 +1,73 @@
+import pytest
+
+from api.grammar import GuaraniChecker, tokenize
+
+
+@pytest.fixture
+def checker():
+    return GuaraniChecker()
+
+
+class TestGuaraniChecker:
+    """Tests del analizador gramatical local"""
+
+    def test_tokenizador_normaliza_puso(self):
+        """Los distintos apóstrofos se unifican en el puso"""
+        assert tokenize("Mba’éichapa, MBA'ÉICHAPA!") == ["mba'éichapa", "mba'éichapa"]
+
+    def test_guarani_sin_tildes_es_detectado(self, checker):
+        """'Che aguyje' no tiene vocales nasales pero es Guaraní"""
+        result = checker.check('Che aguyje')
+
+        assert result['language'] == 'gn'
+        assert result['corrections'] == []
+        assert result['needs_review'] is False
+
+    def test_espanol_no_se_analiza(self, checker):
+        result = checker.check('Hola, ¿cómo estás?')
+
+        assert result['language'] == 'es'
+        assert result['needs_review'] is False
+
+    @pytest.mark.parametrize('message', [
+        'tengo hambre',
+        'mañana voy a ir',
+        'quiero aprender guaraní con mi abuela',
+        'nos vemos el lunes en la plaza',
+        'Tengo sueño y hambre',
+        'Hola, quiero pan y leche',
+        'Ella ha comido',
+    ])
+    def test_espanol_con_palabras_desconocidas(self, checker, message):
+        """Sin rastros de Guaraní no se consulta al LLM"""
+        result = checker.check(message)
+
+        assert result['language'] == 'es'
+        assert result['needs_review'] is False
+
+    def test_error_ortografico_frecuente(self, checker):
+        result = checker.check('mokoi')
+
+        assert result['corrections'][0]['corrected'] == 'mokõi'
+        assert result['corrections'][0]['type'] == 'spelling'
+
+    def test_concordancia_pronombre_verbo(self, checker):
+        result = checker.check('che reiko porã')
+
+        assert result['corrections'][0]['corrected'] == 'che aiko'
+        assert result['needs_review'] is False
+
+    def test_negacion_sin_i_final(self, checker):
+        assert checker.check('ndaikuaái')['corrections'] == []
+        assert checker.check('ndaikuaa')['corrections'][0]['corrected'] == 'ndaikuaai'
+
+    def test_palabras_desconocidas_van_al_llm(self, checker):
+        result = checker.check('Che ahayhu nde rógape')
+
+        assert result['language'] == 'gn'
+        assert result['needs_review'] is True
+
+    def test_lexico_de_lecciones(self):
+        checker = GuaraniChecker(lexicon=['ahayhu', 'rógape'])
+
+        assert checker.check('Che ahayhu nde rógape')['needs_review'] is False
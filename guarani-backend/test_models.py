@@ -116,4 +116,174 @@ class TestUserModel:
             user.save()
             
             user.refresh_from_db()
-            assert user.streak_days == 5
\ No newline at end of file
+            assert user.streak_days == 5
+
+@pytest.mark.django_db
+class TestXPLedger:
+    """Tests del registro de XP"""
+
+    def test_nivel_en_forma_cerrada(self):
+        from api.models import Mascot
+
+        # Mismo resultado que subir de a un nivel (100, 200, 300... XP por nivel)
+        level, current_xp = 1, 0
+        for total_xp in range(0, 20000, 7):
+            assert Mascot.level_for_xp(total_xp) == (level, current_xp)
+            current_xp += 7
+            while current_xp >= 100 * level:
+                current_xp -= 100 * level
+                level += 1
+
+    def test_xp_sincronizada_en_usuario_y_mascota(self):
+        from api.models import Mascot, XPEvent
+        user = User.objects.create_user(username='estudiante', password='Pass123!')
+
+        assert XPEvent.award(user, 60, 'lesson', 'l1') is False
+        assert XPEvent.award(user.id, 60, 'challenge', 3) is True
+
+        user.refresh_from_db()
+        mascot = Mascot.objects.get(user=user)
+        assert user.total_xp == mascot.total_xp == 120
+        assert user.level == mascot.level == 2
+        assert mascot.current_xp == 20
+        assert mascot.state == 'evolving'
+        assert list(XPEvent.objects.filter(user=user).values_list('source', flat=True)) == ['lesson', 'challenge']
+
+    def test_rebuild_xp(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from api.models import Mascot, XPEvent
+        user = User.objects.create_user(username='estudiante', password='Pass123!')
+        XPEvent.award(user, 350, 'lesson')
+        XPEvent.objects.create(user=user, amount=50, source='manual')
+        Mascot.objects.filter(user=user).update(total_xp=1, level=9)
+
+        call_command('rebuild_xp', stdout=StringIO())
+
+        user.refresh_from_db()
+        mascot = Mascot.objects.get(user=user)
+        assert user.total_xp == mascot.total_xp == 400
+        assert (mascot.level, mascot.current_xp) == Mascot.level_for_xp(400) == (3, 100)
+
+
+@pytest.mark.django_db
+class TestAchievementRules:
+    """Tests del catálogo de logros"""
+
+    def test_umbral_superado_en_un_salto(self):
+        from api.achievements import check_achievements
+        from api.models import Achievement, UserProgress
+        user = User.objects.create_user(username='estudiante', password='Pass123!')
+        for lesson in range(6):
+            UserProgress.objects.create(user=user, lesson_id=str(lesson), completed=True)
+
+        new = check_achievements(user, 'lessons')
+
+        assert {a.achievement_type for a in new} == {'first_lesson', 'five_lessons'}
+        assert check_achievements(user, 'lessons') == []
+        assert Achievement.objects.filter(user=user).count() == 2
+
+    def test_sin_reglas_alcanzadas_no_consulta(self, django_assert_num_queries):
+        from api.achievements import check_achievements
+        user = User.objects.create_user(username='estudiante', password='Pass123!')
+
+        with django_assert_num_queries(0):
+            assert check_achievements(user, 'streak', 3) == []
+
+    def test_xp_desbloquea_al_registrar_evento(self):
+        from api.models import Achievement, XPEvent
+        user = User.objects.create_user(username='estudiante', password='Pass123!')
+
+        XPEvent.award(user, 450, 'lesson')
+        assert not Achievement.objects.filter(user=user).exists()
+        XPEvent.award(user, 100, 'challenge')
+
+        assert list(Achievement.objects.filter(user=user).values_list('achievement_type', flat=True)) == ['xp_500']
+
+    def test_backfill_por_tandas(self):
+        from io import StringIO
+        from django.core.management import call_command
+        from api.models import Achievement, UserProgress, UserStreak
+        users = [
+            User.objects.create_user(username=f'u{i}', email=f'u{i}@test.com', password='Pass123!')
+            for i in range(3)
+        ]
+        for lesson in range(5):
+            UserProgress.objects.create(user=users[0], lesson_id=str(lesson), completed=True)
+        UserProgress.objects.create(user=users[1], lesson_id='1', completed=True)
+        UserStreak.objects.create(user=users[2], current_streak=8)
+        Achievement.objects.create(user=users[1], achievement_type='first_lesson', title='-', description='-')
+
+        out = StringIO()
+        call_command('backfill_achievements', '--batch-size', '1', '--dry-run', stdout=out)
+        assert '3 logros' in out.getvalue()
+        assert Achievement.objects.count() == 1
+
+        # Retomar después del primer usuario
+        call_command('backfill_achievements', '--batch-size', '2', '--after-id', str(users[0].id), stdout=StringIO())
+        assert list(Achievement.objects.filter(user=users[2]).values_list('achievement_type', flat=True)) == ['week_streak']
+        assert not Achievement.objects.filter(user=users[0]).exists()
+
+        call_command('backfill_achievements', stdout=StringIO())
+        assert set(Achievement.objects.filter(user=users[0]).values_list('achievement_type', flat=True)) == {
+            'first_lesson', 'five_lessons'
+        }
+
+
+@pytest.mark.django_db
+class TestExerciseStats:
+    """Tests de las estadísticas por ejercicio"""
+
+    def test_incremental_desde_la_marca(self, django_assert_num_queries):
+        from api.item_stats import update_exercise_stats
+        from api.models import ExerciseResult, ExerciseStats
+
+        strong = User.objects.create_user(username='fuerte', email='fuerte@test.com', password='Pass123!')
+        weak = User.objects.create_user(username='debil', email='debil@test.com', password='Pass123!')
+
+        def result(user, exercise_id, is_correct, answer='', latency=None):
+            ExerciseResult.objects.create(
+                user=user, lesson_id='l1', exercise_id=exercise_id, exercise_type='TRANSLATION',
+                is_correct=is_correct, normalized_answer=answer, answer_latency_ms=latency
+            )
+
+        for _ in range(6):
+            result(strong, 'e1', True, 'iporãnte', 1500)
+            result(weak, 'e1', False, 'ipora', 9000)
+        result(weak, 'e2', False, 'aguije', 2500)
+
+        processed, mark = update_exercise_stats(batch_size=5)
+        assert processed == 13
+        stats = ExerciseStats.objects.get(lesson_id='l1', exercise_id='e1')
+        assert (stats.attempts, stats.correct, stats.p_correct) == (12, 6, 0.5)
+        assert stats.wrong_answers == {'ipora': 6}
+        assert stats.median_latency_ms == 2000
+        assert stats.discrimination == 1.0
+        assert stats.last_result_id == mark
+
+        # Sin resultados nuevos no se reprocesa nada
+        with django_assert_num_queries(2):
+            assert update_exercise_stats() == (0, mark)
+
+        result(weak, 'e2', True, 'aguyje', 800)
+        assert update_exercise_stats()[0] == 1
+        stats = ExerciseStats.objects.get(exercise_id='e2')
+        assert (stats.attempts, stats.correct, stats.wrong_answers) == (2, 1, {'aguije': 1})
+        assert ExerciseStats.objects.get(exercise_id='e1').attempts == 12
+
+    def test_corridas_superpuestas_no_duplican(self):
+        """Una corrida que leyó la marca vieja saltea lo que ya sumó la otra"""
+        from api.item_stats import process_batch
+        from api.models import ExerciseResult, ExerciseStats
+
+        user = User.objects.create_user(username='alumno', email='alumno@test.com', password='Pass123!')
+        for is_correct in (True, False, True):
+            ExerciseResult.objects.create(
+                user=user, lesson_id='l1', exercise_id='e1', exercise_type='TRANSLATION', is_correct=is_correct
+            )
+
+        process_batch(0, 2)
+        process_batch(0, 10)
+
+        stats = ExerciseStats.objects.get(exercise_id='e1')
+        assert (stats.attempts, stats.correct) == (3, 2)
@@ -164,4 +164,474 @@ class TestUserProfile:
         
         user.refresh_from_db()
         assert user.first_name == 'Actualizado'
-        assert user.last_name == 'Nombre'
\ No newline at end of file
+        assert user.last_name == 'Nombre'
+
+@pytest.mark.django_db
+class TestExport:
+    """Tests de la exportación en streaming"""
+
+    @pytest.fixture
+    def client_with_data(self):
+        from api.models import ExerciseResult, Translation
+        user = User.objects.create_user(username='testuser', password='Pass123!')
+        other = User.objects.create_user(username='otro', email='otro@test.com', password='Pass123!')
+        for i in range(5):
+            Translation.objects.create(user=user, spanish_text=f'hola {i}', guarani_text=f"mba'éichapa {i}")
+        Translation.objects.create(user=other, spanish_text='ajeno', guarani_text='-')
+        ExerciseResult.objects.create(
+            user=user, lesson_id='1', exercise_id='1', exercise_type='TRANSLATION',
+            is_correct=False, user_answer='a, "b"', correct_answer='c'
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def read(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_ndjson_y_retomar(self, client_with_data):
+        import json
+        response = client_with_data.get(reverse('export', args=['translations']))
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response['Content-Type'] == 'application/x-ndjson'
+        rows = [json.loads(line) for line in self.read(response).decode().splitlines()]
+        assert [row['spanish_text'] for row in rows] == [f'hola {i}' for i in range(5)]
+
+        resumed = client_with_data.get(reverse('export', args=['translations']), {'after_id': rows[2]['id']})
+        assert [json.loads(line)['id'] for line in self.read(resumed).decode().splitlines()] == [
+            rows[3]['id'], rows[4]['id']
+        ]
+
+        by_offset = client_with_data.get(reverse('export', args=['translations']), {'offset': 4})
+        assert len(self.read(by_offset).decode().splitlines()) == 1
+
+    def test_csv_gzip_y_fechas(self, client_with_data):
+        import csv
+        import gzip
+        import io
+        response = client_with_data.get(
+            reverse('export', args=['exercises']),
+            {'output': 'csv', 'gzip': '1', 'date_from': '2000-01-01'}
+        )
+
+        assert response['Content-Disposition'].endswith('guarani-exercises.csv.gz"')
+        rows = list(csv.reader(io.StringIO(gzip.decompress(self.read(response)).decode())))
+        assert rows[0][:3] == ['id', 'created_at', 'lesson_id']
+        assert rows[1][6] == 'a, "b"'
+
+        future = client_with_data.get(reverse('export', args=['exercises']), {'date_from': '2999-01-01'})
+        assert self.read(future) == b''
+
+    @pytest.mark.django_db(transaction=True)
+    def test_streaming_asincrono_bajo_asgi(self, client_with_data, monkeypatch):
+        """Por la app ASGI los bloques salen de a uno, sin juntarlos en memoria"""
+        import json
+        import warnings
+        from asgiref.sync import async_to_sync
+        from asgiref.testing import ApplicationCommunicator
+        from rest_framework_simplejwt.tokens import RefreshToken
+        from api import export
+        from config.asgi import application
+
+        # La vista corre en otro hilo (otra conexión): los datos ya están confirmados
+        monkeypatch.setattr(export, 'encode', lambda lines: (line.encode() for line in lines))
+        token = RefreshToken.for_user(User.objects.get(username='testuser')).access_token
+
+        async def download():
+            communicator = ApplicationCommunicator(application, {
+                'type': 'http', 'method': 'GET', 'path': '/api/export/translations/',
+                'query_string': b'', 'headers': [(b'authorization', f'Bearer {token}'.encode())],
+            })
+            await communicator.send_input({'type': 'http.request', 'body': b''})
+            start = await communicator.receive_output(timeout=5)
+            bodies = []
+            while True:
+                message = await communicator.receive_output(timeout=5)
+                bodies.append(message.get('body', b''))
+                if not message.get('more_body'):
+                    return start, bodies
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            start, bodies = async_to_sync(download)()
+
+        assert start['status'] == 200
+        rows = [json.loads(line) for line in b''.join(bodies).decode().splitlines()]
+        assert [row['spanish_text'] for row in rows] == [f'hola {i}' for i in range(5)]
+        assert len([body for body in bodies if body]) == 5
+
+    def test_parametros_invalidos(self, client_with_data):
+        assert client_with_data.get(reverse('export', args=['otra'])).status_code == 404
+        assert self.read(client_with_data.get(reverse('export', args=['chat']))) == b''
+        assert client_with_data.get(
+            reverse('export', args=['chat']), {'date_from': 'ayer'}
+        ).status_code == 400
+
+
+@pytest.mark.django_db
+class TestMascot:
+    """Tests de la mascota"""
+
+    def test_get_no_escribe_y_deriva_estado(self, django_assert_num_queries):
+        from datetime import timedelta
+        from django.utils import timezone
+        from api.models import Mascot
+        user = User.objects.create_user(username='testuser', password='Pass123!')
+        mascot = Mascot.objects.create(user=user, state='celebrating')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        assert client.get(reverse('mascot')).data['state'] == 'celebrating'
+
+        three_days_ago = timezone.now() - timedelta(days=3)
+        Mascot.objects.filter(id=mascot.id).update(last_interaction=three_days_ago, state_changed_at=three_days_ago)
+        with django_assert_num_queries(1):
+            response = client.get(reverse('mascot'))
+
+        assert response.data['state'] == 'sleeping'
+        assert 'private' in response['Cache-Control']
+        mascot.refresh_from_db()
+        assert mascot.state == 'celebrating'
+
+        # Una interacción real la despierta
+        client.post(reverse('add_xp'), {'amount': 10}, format='json')
+        assert client.get(reverse('mascot')).data['state'] == 'happy'
+
+
+@pytest.mark.django_db
+class TestLeaderboard:
+    """Tests de la tabla de posiciones"""
+
+    def test_top_posicion_y_vecinos(self):
+        from api.models import XPEvent
+        users = [User.objects.create_user(username=f'u{i}', email=f'u{i}@test.com', password='Pass123!') for i in range(7)]
+        for i, user in enumerate(users):
+            XPEvent.award(user, 10 * (i + 1), 'lesson')
+        XPEvent.award(users[0], 5, 'manual')
+        client = APIClient()
+        client.force_authenticate(users[3])
+
+        response = client.get(reverse('leaderboard'), {'period': 'weekly', 'limit': 3})
+
+        assert [row['username'] for row in response.data['top']] == ['u6', 'u5', 'u4']
+        assert response.data['me'] == {'rank': 4, 'user_id': users[3].id, 'username': 'u3', 'xp': 40}
+        assert [(row['rank'], row['username']) for row in response.data['neighbors']] == [
+            (2, 'u5'), (3, 'u4'), (4, 'u3'), (5, 'u2'), (6, 'u1')
+        ]
+        assert client.get(reverse('leaderboard'), {'period': 'all'}).data['top'][-1]['xp'] == 15
+        assert len(client.get(reverse('leaderboard'), {'limit': -1}).data['top']) == 1
+        assert client.get(reverse('leaderboard'), {'limit': 'diez'}).status_code == 400
+
+    def test_posicion_por_rango_del_indice(self):
+        """Los COUNT de la posición acotan xp en el índice, no recorren el período"""
+        from django.db import connection
+        from api.models import LeaderboardEntry
+        if connection.vendor != 'sqlite':
+            pytest.skip('El formato del plan es el de SQLite')
+        entries = LeaderboardEntry.objects.filter(period='weekly', period_start=LeaderboardEntry.period_starts()['weekly'])
+
+        for queryset, bound in ((entries.filter(xp__gt=10), 'xp>?'), (entries.filter(xp=10, user_id__lt=3), 'user_id<?')):
+            plan = queryset.explain()
+            assert 'leaderboard_period_6ca72d_idx' in plan and bound in plan
+
+    def test_por_grupo_y_reconstruccion(self):
+        from io import StringIO
+        from django.contrib.auth.models import Group
+        from django.core.management import call_command
+        from api.models import LeaderboardEntry, XPEvent
+        group = Group.objects.create(name='3er grado')
+        member = User.objects.create_user(username='alumno', email='a@test.com', password='Pass123!')
+        outsider = User.objects.create_user(username='otro', email='o@test.com', password='Pass123!')
+        member.groups.add(group)
+        XPEvent.award(member, 30, 'lesson')
+        XPEvent.award(outsider, 90, 'lesson')
+        XPEvent.objects.create(user=member, amount=1000, source='opening')
+        LeaderboardEntry.objects.filter(user=member).update(xp=1)
+
+        call_command('rebuild_leaderboards', stdout=StringIO())
+
+        client = APIClient()
+        client.force_authenticate(member)
+        weekly = client.get(reverse('leaderboard'), {'group': group.id})
+        assert [(row['username'], row['xp']) for row in weekly.data['top']] == [('alumno', 30)]
+        all_time = client.get(reverse('leaderboard'), {'period': 'all'})
+        assert all_time.data['me']['xp'] == 1030
+
+        client.force_authenticate(outsider)
+        assert client.get(reverse('leaderboard'), {'group': group.id}).status_code == 404
+
+
+@pytest.mark.django_db
+class TestWeaknessAnalysis:
+    """Tests del análisis de puntos débiles"""
+
+    def test_agregados_y_cache(self, django_assert_num_queries):
+        from django.core.cache import cache
+        from api.models import ExerciseResult
+        cache.clear()
+        user = User.objects.create_user(username='testuser', password='Pass123!')
+        client = APIClient()
+        client.force_authenticate(user)
+
+        def result(ex_type, is_correct, direction='', exercise_id='1'):
+            ExerciseResult.objects.create(
+                user=user, lesson_id='1', exercise_id=exercise_id, exercise_type=ex_type,
+                is_correct=is_correct, direction=direction
+            )
+
+        for i in range(7):
+            result('MULTIPLE_CHOICE', i % 2 == 0, exercise_id=str(i))
+        result('TRANSLATION', True, 'ES_TO_GN')
+        result('TRANSLATION', False, 'ES_TO_GN')
+        result('TRANSLATION', True, 'GN_TO_ES')
+
+        # Versión + las dos consultas del análisis
+        with django_assert_num_queries(3):
+            data = client.get(reverse('weakness-analysis')).data
+
+        assert data['total_exercises_completed'] == 10
+        multiple = next(s for s in data['overall_stats'] if s['type'] == 'MULTIPLE_CHOICE')
+        assert (multiple['total_attempts'], multiple['correct_answers'], multiple['accuracy']) == (7, 4, 57)
+        assert [a['exercise_id'] for a in multiple['recent_attempts']] == ['6', '5', '4', '3', '2']
+        assert [(t['type'], t['total_attempts'], t['correct_answers']) for t in data['translation_breakdown']] == [
+            ('ES_TO_GN', 2, 1), ('GN_TO_ES', 1, 1)
+        ]
+
+        with django_assert_num_queries(1):
+            client.get(reverse('weakness-analysis'))
+
+        result('FILL_IN_THE_BLANK', False)
+        assert client.get(reverse('weakness-analysis')).data['total_exercises_completed'] == 11
+
+        # Otro worker no recibe la invalidación: la versión igual detecta el cambio
+        from unittest import mock
+        with mock.patch('api.analytics.invalidate_weakness_analysis'):
+            result('FILL_IN_THE_BLANK', True)
+        assert client.get(reverse('weakness-analysis')).data['total_exercises_completed'] == 12
+
+    def test_resultados_guardan_datos_del_ejercicio(self, authenticated_client):
+        from api.models import ExerciseResult, Lesson
+        Lesson.objects.create(
+            id='l3', title='La Familia', description='Familia',
+            vocabulary=[{'word': 'Sy', 'translation': 'Madre'}, {'word': 'Túva', 'translation': 'Padre'}],
+            exercises=[
+                {'id': 'l3e1', 'type': 'TRANSLATION', 'phraseToTranslate': 'Madre', 'correctAnswer': 'Sy'},
+                {'id': 'l3e2', 'type': 'TRANSLATION', 'phraseToTranslate': 'Túva', 'correctAnswer': 'Padre'},
+            ]
+        )
+
+        response = authenticated_client.post(reverse('progress'), {
+            'lesson_id': 'l3',
+            'score': 50,
+            'exercise_results': [
+                {'exercise_id': 'l3e1', 'exercise_type': 'TRANSLATION', 'is_correct': False,
+                 'user_answer': ' ¡Sý! ', 'correct_answer': 'Sy', 'answer_latency_ms': 4200},
+                {'exercise_id': 'l3e2', 'exercise_type': 'TRANSLATION', 'is_correct': True,
+                 'user_answer': 'Padre', 'correct_answer': 'Padre', 'answer_latency_ms': True},
+            ]
+        }, format='json')
+
+        assert response.status_code == 200
+        results = {r.exercise_id: r for r in ExerciseResult.objects.all()}
+        assert results['l3e1'].direction == 'ES_TO_GN'
+        assert results['l3e1'].normalized_answer == 'sy'
+        assert results['l3e1'].vocabulary_item_id == 'l3:sy'
+        assert results['l3e1'].answer_latency_ms == 4200
+        assert results['l3e2'].direction == 'GN_TO_ES'
+        assert results['l3e2'].vocabulary_item_id == 'l3:tuva'
+        assert results['l3e2'].answer_latency_ms is None
+
+
+@pytest.mark.django_db
+class TestMistakeReview:
+    """Tests de la cola de repaso de errores"""
+
+    def test_cola_se_actualiza_con_cada_resultado(self, authenticated_client, test_user, django_assert_num_queries):
+        from api.models import ExerciseResult, MistakeReviewItem
+
+        def result(exercise_id, is_correct, answer=''):
+            ExerciseResult.objects.create(
+                user=test_user, lesson_id='l1', exercise_id=exercise_id, exercise_type='TRANSLATION',
+                is_correct=is_correct, user_answer=answer, correct_answer='Iporãnte'
+            )
+
+        result('e1', False, 'ipora')
+        result('e1', False, 'iporante')
+        result('e2', False, 'aguije')
+        result('e3', True)
+
+        # Autenticación + una lectura de la cola
+        with django_assert_num_queries(2):
+            data = authenticated_client.get(reverse('mistake-review')).data
+        assert [(item['exercise_id'], item['mistakes']) for item in data] == [('e1', 2), ('e2', 1)]
+        assert data[0]['last_wrong_answer'] == 'iporante'
+
+        # Un acierto baja la prioridad; dos seguidos lo sacan de la cola
+        result('e1', True)
+        assert MistakeReviewItem.objects.get(exercise_id='e1').priority == 1
+        result('e1', True)
+        data = authenticated_client.get(reverse('mistake-review')).data
+        assert [item['exercise_id'] for item in data] == ['e2']
+
+    def test_limit_acotado(self, authenticated_client, test_user):
+        from api.models import ExerciseResult
+        for exercise_id in ('e1', 'e2'):
+            ExerciseResult.objects.create(
+                user=test_user, lesson_id='l1', exercise_id=exercise_id, exercise_type='TRANSLATION',
+                is_correct=False, user_answer='ipora', correct_answer='Iporãnte'
+            )
+
+        assert len(authenticated_client.get(reverse('mistake-review'), {'limit': -1}).data) == 1
+        response = authenticated_client.get(reverse('mistake-review'), {'limit': 'diez'})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+class TestFlashcardSRS:
+    """Tests de la repetición espaciada de flashcards"""
+
+    def test_revision_reprograma_con_sm2(self, authenticated_client, test_user):
+        from api.models import Flashcard
+        card = Flashcard.objects.create(user=test_user, spanish_word='Madre', guarani_word='Sy')
+
+        intervals = []
+        for grade in (5, 4, 4):
+            data = authenticated_client.post(
+                reverse('flashcard-review'), {'flashcard_id': card.id, 'grade': grade}, format='json'
+            ).data
+            intervals.append(data['interval_days'])
+        assert intervals == [1, 6, 16]
+        assert data['ease_factor'] == 2.6
+
+        data = authenticated_client.post(
+            reverse('flashcard-review'), {'flashcard_id': card.id, 'is_correct': False}, format='json'
+        ).data
+        assert (data['repetitions'], data['interval_days'], data['times_reviewed'], data['times_correct']) == (0, 1, 4, 3)
+
+        response = authenticated_client.post(
+            reverse('flashcard-review'), {'flashcard_id': card.id, 'grade': 9}, format='json'
+        )
+        assert response.status_code == 400
+
+    def test_tarjetas_vencidas_en_orden(self, authenticated_client, test_user, django_assert_num_queries):
+        from datetime import timedelta
+        from django.utils import timezone
+        from api.models import Flashcard
+        now = timezone.now()
+        for i, days in enumerate([-3, 2, -1, -5, 0]):
+            Flashcard.objects.create(
+                user=test_user, spanish_word=f'palabra{i}', guarani_word=f'ñe\'ẽ{i}',
+                due_at=now + timedelta(days=days, seconds=-1)
+            )
+
+        # Autenticación + una consulta sobre el índice (user, due_at)
+        with django_assert_num_queries(2):
+            data = authenticated_client.get(reverse('flashcard-due'), {'limit': 3}).data
+        assert [card['spanish_word'] for card in data] == ['palabra3', 'palabra0', 'palabra2']
+        assert len(authenticated_client.get(reverse('flashcard-due')).data) == 4
+        assert len(authenticated_client.get(reverse('flashcard-due'), {'limit': -1}).data) == 1
+        assert authenticated_client.get(reverse('flashcard-due'), {'limit': 'abc'}).status_code == 400
+
+    def test_revision_en_lote(self, authenticated_client, test_user, django_assert_max_num_queries):
+        from datetime import timedelta
+        from django.utils import timezone
+        from api.models import ActivityLog, Flashcard, UserStreak
+        cards = [
+            Flashcard.objects.create(user=test_user, spanish_word=f'palabra{i}', guarani_word=f'ñe\'ẽ{i}')
+            for i in range(30)
+        ]
+        earlier = (timezone.now() - timedelta(hours=1)).isoformat()
+        reviews = [{'flashcard_id': card.id, 'grade': 5} for card in cards]
+        # Misma tarjeta dos veces: primero el olvido (más viejo), después el acierto
+        reviews.append({'flashcard_id': cards[0].id, 'is_correct': False, 'reviewed_at': earlier})
+        reviews.append({'flashcard_id': 999999, 'grade': 4})
+
+        with django_assert_max_num_queries(15):
+            response = authenticated_client.post(
+                reverse('flashcard-review-batch'), {'reviews': reviews}, format='json'
+            )
+
+        assert response.status_code == 200
+        assert (response.data['reviewed'], response.data['not_found']) == (31, [999999])
+        first = Flashcard.objects.get(id=cards[0].id)
+        assert (first.times_reviewed, first.times_correct, first.repetitions, first.interval_days) == (2, 1, 1, 1)
+        assert ActivityLog.objects.get(user=test_user).flashcards_reviewed == 31
+        assert UserStreak.objects.get(user=test_user).current_streak == 1
+
+        response = authenticated_client.post(
+            reverse('flashcard-review-batch'), {'reviews': [{'flashcard_id': cards[1].id, 'grade': 7}]}, format='json'
+        )
+        assert response.status_code == 400
+
+
+@pytest.mark.django_db
+class TestFlashcardBulkCreate:
+    """Tests de la importación masiva de flashcards"""
+
+    def test_importacion_por_tramos(self, authenticated_client, test_user, django_assert_max_num_queries):
+        from api.models import Achievement, Flashcard
+        Flashcard.objects.create(user=test_user, spanish_word='palabra0', guarani_word="ñe'ẽ0")
+
+        items = [{'spanish_word': f'palabra{i}', 'guarani_word': f"ñe'ẽ{i}", 'deck_name': 'Importadas'} for i in range(2500)]
+        items += [items[1], {'spanish_word': '', 'guarani_word': 'sy'}]
+
+        # Antes eran más de 5000; SQLite además parte cada INSERT según su límite de variables
+        with django_assert_max_num_queries(60):
+            response = authenticated_client.post(reverse('flashcard-bulk-create'), {'flashcards': items}, format='json')
+
+        assert response.status_code == 200
+        assert {k: response.data[k] for k in ('created', 'duplicates', 'invalid')} == {
+            'created': 2499, 'duplicates': 2, 'invalid': 1
+        }
+        assert response.data['errors'] == ['(vacía) no es válida', 'palabra0 ya existe']
+        assert Flashcard.objects.filter(user=test_user, deck_name='Importadas').count() == 2499
+        assert Achievement.objects.filter(user=test_user, achievement_type='fifty_flashcards').exists()
+
+    def test_pares_creados_por_otra_importacion(self, authenticated_client, test_user, monkeypatch):
+        """Un par que otra importación creó primero se cuenta como repetido"""
+        from django.db import IntegrityError
+        from api.models import Flashcard
+        manager = Flashcard.objects
+        filter_, bulk_create = manager.filter, manager.bulk_create
+        race = []
+
+        def conflicting_bulk_create(objs, **kwargs):
+            # Otra importación confirmó el primer par entre la lectura y el INSERT
+            if not race:
+                race.append('conflict')
+                raise IntegrityError('UNIQUE constraint failed')
+            return bulk_create(objs, **kwargs)
+
+        def filter_after_race(*args, **kwargs):
+            if race == ['conflict']:
+                race.append('committed')
+                manager.create(user=test_user, spanish_word='sy', guarani_word='madre')
+            return filter_(*args, **kwargs)
+        monkeypatch.setattr(manager, 'bulk_create', conflicting_bulk_create)
+        monkeypatch.setattr(manager, 'filter', filter_after_race)
+
+        items = [{'spanish_word': 'sy', 'guarani_word': 'madre'}, {'spanish_word': 'túva', 'guarani_word': 'padre'}]
+        response = authenticated_client.post(reverse('flashcard-bulk-create'), {'flashcards': items}, format='json')
+
+        assert (response.data['created'], response.data['duplicates']) == (1, 1)
+        assert response.data['errors'] == ['sy ya existe']
+
+    def test_conflicto_persistente_no_queda_en_bucle(self, authenticated_client, test_user, monkeypatch):
+        """Si releer no resuelve el conflicto se responde 409 sin guardar nada"""
+        from django.db import IntegrityError
+        from api.models import Flashcard
+        bulk_create = Flashcard.objects.bulk_create
+
+        def second_chunk_conflicts(objs, **kwargs):
+            # Restricción que el set de pares en Python no ve (p. ej. collation)
+            if any(card.spanish_word == 'palabra1000' for card in objs):
+                raise IntegrityError('UNIQUE constraint failed')
+            return bulk_create(objs, **kwargs)
+        monkeypatch.setattr(Flashcard.objects, 'bulk_create', second_chunk_conflicts)
+
+        items = [{'spanish_word': f'palabra{i}', 'guarani_word': f"ñe'ẽ{i}"} for i in range(1500)]
+        response = authenticated_client.post(reverse('flashcard-bulk-create'), {'flashcards': items}, format='json')
+
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert not Flashcard.objects.filter(user=test_user).exists()
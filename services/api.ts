@@ -14,6 +14,9 @@ import {
   StudySession,
   ConversationMode, 
   ChatSession, 
+  ChatSessionSummary,
+  ChatSearchResult,
+  Leaderboard,
   ChatMessage, 
   SessionAnalysis, 
   UserConversationLevel
@@ -331,6 +334,7 @@ export interface ExerciseResultData {
   is_correct: boolean;
   user_answer: string;
   correct_answer: string;
+  answer_latency_ms?: number;
 }
 
 export interface WeaknessStats {
@@ -388,6 +392,30 @@ export const apiGetWeaknessAnalysis = async (): Promise<WeaknessAnalysis> => {
   }
 };
 
+export interface MistakeReviewItem {
+  id: number;
+  lesson_id: string;
+  exercise_id: string;
+  exercise_type: 'MULTIPLE_CHOICE' | 'TRANSLATION' | 'FILL_IN_THE_BLANK';
+  vocabulary_item_id: string;
+  last_wrong_answer: string;
+  correct_answer: string;
+  mistakes: number;
+  correct_streak: number;
+  priority: number;
+  last_mistake_at: string;
+}
+
+export const apiGetMistakeReview = async (limit = 20): Promise<MistakeReviewItem[]> => {
+  try {
+    const response = await api.get('/review/mistakes/', { params: { limit } });
+    return response.data;
+  } catch (error: any) {
+    console.error('Error getting mistake review:', error);
+    return [];
+  }
+};
+
 // ==================== FLASHCARDS API ====================
 
 export const apiGetAllFlashcards = async (filters?: {
@@ -407,6 +435,16 @@ export const apiGetAllFlashcards = async (filters?: {
   }
 };
 
+export const apiGetDueFlashcards = async (limit = 20, deck?: string): Promise<Flashcard[]> => {
+  try {
+    const response = await api.get('/flashcards/due/', { params: { limit, deck } });
+    return response.data;
+  } catch (error: any) {
+    console.error('Error getting due flashcards:', error);
+    throw new Error(error.response?.data?.detail || 'Error al obtener flashcards para repasar');
+  }
+};
+
 export const apiCreateFlashcard = async (data: FlashcardCreateData): Promise<Flashcard> => {
   try {
     const response = await api.post('/flashcards/', data);
@@ -445,10 +483,31 @@ export const apiReviewFlashcard = async (flashcardId: number, isCorrect: boolean
   }
 };
 
+export interface FlashcardReviewInput {
+  flashcard_id: number;
+  grade?: number;
+  is_correct?: boolean;
+  reviewed_at?: string;
+}
+
+export const apiReviewFlashcardsBatch = async (reviews: FlashcardReviewInput[]): Promise<{
+  reviewed: number;
+  not_found: number[];
+  flashcards: Flashcard[];
+}> => {
+  try {
+    const response = await api.post('/flashcards/review/batch/', { reviews });
+    return response.data;
+  } catch (error: any) {
+    throw new Error(error.response?.data?.error || 'Error al registrar revisiones');
+  }
+};
+
 export const apiBulkCreateFlashcards = async (flashcards: FlashcardCreateData[]): Promise<{
   created: number;
+  duplicates: number;
+  invalid: number;
   errors: string[];
-  flashcards: Flashcard[];
 }> => {
   try {
     const response = await api.post('/flashcards/bulk-create/', { flashcards });
@@ -597,9 +656,13 @@ export const apiSendChatMessage = async (data: {
   }
 };
 
-export const apiGetChatSessions = async (): Promise<ChatSession[]> => {
+export const apiGetChatSessions = async (filters?: {
+  mode?: number | string;
+  date_from?: string;
+  date_to?: string;
+}): Promise<ChatSessionSummary[]> => {
   try {
-    const response = await api.get('/chatbot/sessions/');
+    const response = await api.get('/chatbot/sessions/', { params: filters });
     return response.data;
   } catch (error: any) {
     console.error('Error getting chat sessions:', error);
@@ -607,6 +670,18 @@ export const apiGetChatSessions = async (): Promise<ChatSession[]> => {
   }
 };
 
+export const apiSearchChatHistory = async (
+  q: string,
+  before?: number
+): Promise<{ results: ChatSearchResult[]; next_before: number | null }> => {
+  try {
+    const response = await api.get('/chatbot/search/', { params: { q, before } });
+    return response.data;
+  } catch (error: any) {
+    throw new Error(error.response?.data?.error || 'Error al buscar en el historial');
+  }
+};
+
 export const apiGetChatSession = async (sessionId: number): Promise<ChatSession> => {
   try {
     const response = await api.get(`/chatbot/sessions/${sessionId}/`);
@@ -617,7 +692,7 @@ export const apiGetChatSession = async (sessionId: number): Promise<ChatSession>
 };
 
 export const apiEndChatSession = async (sessionId: number): Promise<{
-  session: ChatSession;
+  session: ChatSessionSummary;
   analysis: SessionAnalysis;
 }> => {
   try {
@@ -650,4 +725,41 @@ export const apiGetConversationStats = async (): Promise<UserConversationLevel>
       overall_score: 0,
     };
   }
-};
\ No newline at end of file
+};
+// ==================== LEADERBOARD API ====================
+
+export const apiGetLeaderboard = async (params?: {
+  period?: 'weekly' | 'monthly' | 'all';
+  group?: number;
+  limit?: number;
+}): Promise<Leaderboard> => {
+  try {
+    const response = await api.get('/leaderboard/', { params });
+    return response.data;
+  } catch (error: any) {
+    throw new Error(error.response?.data?.error || 'Error al obtener la tabla de posiciones');
+  }
+};
+
+// ==================== EXPORT API ====================
+
+export const apiExportHistory = async (
+  kind: 'chat' | 'translations' | 'exercises',
+  params?: {
+    output?: 'ndjson' | 'csv';
+    gzip?: boolean;
+    date_from?: string;
+    date_to?: string;
+    after_id?: number;
+  }
+): Promise<Blob> => {
+  try {
+    const response = await api.get(`/export/${kind}/`, {
+      params: { ...params, gzip: params?.gzip ? 1 : undefined },
+      responseType: 'blob',
+    });
+    return response.data;
+  } catch (error: any) {
+    throw new Error('Error al exportar el historial');
+  }
+};
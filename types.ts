@@ -30,6 +30,7 @@ export interface TranslationExercise extends Exercise {
   prompt: string;
   phraseToTranslate: string;
   correctAnswer: string;
+  direction?: 'ES_TO_GN' | 'GN_TO_ES';
 }
 
 export interface FillInTheBlankExercise extends Exercise {
@@ -135,6 +136,10 @@ export interface Flashcard {
   times_correct: number;
   accuracy: number;
   last_reviewed: string | null;
+  repetitions: number;
+  interval_days: number;
+  ease_factor: number;
+  due_at: string;
   created_at: string;
   updated_at: string;
 }
@@ -273,6 +278,34 @@ export interface ChatSession {
   messages: ChatMessage[];
 }
 
+export interface ChatSessionSummary {
+  id: number;
+  mode: number | null;
+  mode_name: string;
+  mode_icon: string;
+  started_at: string;
+  ended_at: string | null;
+  duration_seconds: number;
+  message_count: number;
+  difficulty_level: string;
+  words_used: number;
+  grammar_errors: number;
+  correction_count: number;
+  first_message: string | null;
+  last_message: string | null;
+}
+
+export interface ChatSearchResult {
+  message_id: number;
+  session_id: number | null;
+  mode_name: string | null;
+  created_at: string;
+  message: string | null;
+  message_highlights: [number, number][];
+  response: string | null;
+  response_highlights: [number, number][];
+}
+
 export interface SessionAnalysis {
   duration_minutes: number;
   messages_sent: number;
@@ -296,4 +329,19 @@ export interface UserConversationLevel {
   fluency_score: number;
   comprehension_score: number;
   overall_score: number;
-}
\ No newline at end of file
+}
+
+export interface LeaderboardRow {
+  rank: number;
+  user_id: number;
+  username: string;
+  xp: number;
+}
+
+export interface Leaderboard {
+  period: 'weekly' | 'monthly' | 'all';
+  period_start: string;
+  top: LeaderboardRow[];
+  me: LeaderboardRow | null;
+  neighbors: LeaderboardRow[];
+}